@@ -1,4 +1,7 @@
 import clickhouse_connect
+import pyarrow as pa
+from src.cpi_calculator.async_executor import AsyncQueryExecutor
+from src.cpi_calculator.pool import get_pool
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import matplotlib.font_manager as fm
@@ -50,37 +53,61 @@ COL_PRODUCT_ID_IN_PRICES = 'product_id' # 价格表中的商品ID列
 COL_EVENT_DATE = 'change_date'  # 日期列 (应为 Date 或 DateTime 类型)
 COL_PRICE = 'price'            # 价格列 (应为数值类型)
 COL_SALES_VOLUME = 'sales_volume' # 销量列 (应为数值类型) # !!! 注意：'daily_price' 表中当前没有此列, 此计算不再使用此列 !!!
+
+# 并发查询配置：同时执行的查询数与单个查询的超时秒数
+QUERY_CONCURRENCY = 2
+QUERY_TIMEOUT = 300
 # --- 用户配置区结束 ---
 
-def get_clickhouse_client():
-    """创建并返回一个 ClickHouse 客户端连接。"""
+# 查询结果的显式类型映射：结果以 Arrow 列式格式返回并按此转换，不构造逐行 Python 对象
+CATEGORY_PRICE_SCHEMA = pa.schema([
+    ('category_name', pa.dictionary(pa.int32(), pa.string())),
+    ('day', pa.date32()),
+    ('product_weighted_average_price', pa.float64()),
+    ('total_product_weight', pa.float64()),
+    ('distinct_products_sold', pa.int64()),
+])
+DAILY_INDEX_SCHEMA = pa.schema([
+    ('day', pa.date32()),
+    ('daily_overall_price_index', pa.float64()),
+    ('total_weight_for_day', pa.float64()),
+    ('distinct_products_for_day', pa.int64()),
+])
+
+
+def create_clickhouse_client():
+    """创建一个 ClickHouse 客户端连接（供连接池调用）。"""
+    return clickhouse_connect.get_client(
+        host=CLICKHOUSE_HOST,
+        port=CLICKHOUSE_PORT,
+        user=CLICKHOUSE_USER,
+        password=CLICKHOUSE_PASSWORD,
+        database=CLICKHOUSE_DATABASE,
+        secure=False, # 因为我们尝试HTTP端口8123，所以这里是False
+        # verify=False # 如果使用自签名证书且需要跳过验证（不推荐生产环境），取消注释
+    )
+
+def get_clickhouse_pool():
+    """获取进程内共享的 ClickHouse 连接池，并借出一个连接测试连通性。"""
     try:
-        client = clickhouse_connect.get_client(
-            host=CLICKHOUSE_HOST,
-            port=CLICKHOUSE_PORT,
-            user=CLICKHOUSE_USER,
-            password=CLICKHOUSE_PASSWORD,
-            database=CLICKHOUSE_DATABASE,
-            secure=False, # 因为我们尝试HTTP端口8123，所以这里是False
-            # verify=False # 如果使用自签名证书且需要跳过验证（不推荐生产环境），取消注释
+        pool = get_pool(
+            ('clickhouse_connect', CLICKHOUSE_HOST, CLICKHOUSE_PORT, CLICKHOUSE_USER, CLICKHOUSE_DATABASE),
+            create_clickhouse_client,
+            min_size=1,
+            max_size=4
         )
-        client.ping() # 测试连接
+        with pool.connection() as client:
+            client.ping() # 测试连接
         print(f"成功连接到 ClickHouse 服务器: {CLICKHOUSE_HOST}:{CLICKHOUSE_PORT}，数据库: {CLICKHOUSE_DATABASE}")
-        return client
+        return pool
     except Exception as e:
         print(f"连接 ClickHouse 失败: {e}")
         print("请检查脚本中的 CLICKHOUSE_* 配置变量是否正确。")
         return None
 
-def calculate_product_weighted_price_per_category(client):
-    """
-    从 ClickHouse 查询数据，计算每日每类商品的商品权重加权平均价格。
-    返回包含结果的列表，每个元素是一个字典。
-    """
-    if not client:
-        return []
-
-    query = f"""
+def build_category_price_query():
+    """每日每类商品权重加权平均价格的查询语句"""
+    return f"""
     SELECT
         c.{COL_CATEGORY_NAME} AS category_name,
         toDate(p.{COL_EVENT_DATE}) AS day, -- 确保按天聚合
@@ -101,36 +128,9 @@ def calculate_product_weighted_price_per_category(client):
         day ASC, c.{COL_CATEGORY_NAME} ASC
     """
 
-    print("\n将执行以下查询:")
-    print("----------------------------------------------------")
-    print(query)
-    print("----------------------------------------------------\n")
-
-    try:
-        result = client.query(query)
-        print("查询成功执行！")
-        if result.result_rows:
-            # 将元组结果转换为字典列表，方便使用
-            column_names = result.column_names
-            data = [dict(zip(column_names, row)) for row in result.result_rows]
-            return data
-        else:
-            print("查询没有返回任何数据。请检查您的数据表是否为空或查询条件是否正确。")
-            return []
-    except Exception as e:
-        print(f"执行查询时出错: {e}")
-        print("请检查您的表名、列名配置以及数据是否存在问题。")
-        return []
-
-def calculate_daily_overall_price_index(client):
-    """
-    从 ClickHouse 查询数据，计算每日的总体商品权重加权平均价格指数。
-    返回包含结果的列表，每个元素是一个字典。
-    """
-    if not client:
-        return []
-
-    query = f"""
+def build_daily_index_query():
+    """每日总体商品权重加权平均价格指数的查询语句"""
+    return f"""
     SELECT
         toDate(p.{COL_EVENT_DATE}) AS day,
         sum(p.{COL_PRICE} * pr.{COL_PRODUCT_WEIGHT}) / sum(pr.{COL_PRODUCT_WEIGHT}) AS daily_overall_price_index,
@@ -148,29 +148,38 @@ def calculate_daily_overall_price_index(client):
         day ASC
     """
 
-    print("\n将执行以下查询计算每日总体价格指数:")
-    print("----------------------------------------------------")
-    print(query)
-    print("----------------------------------------------------\n")
+def run_report_queries(pool):
+    """
+    并发执行分类价格与每日总体指数两个查询，总耗时接近较慢的一个。
+    返回 (分类结果, 每日指数结果)，失败的查询对应 None。
+    """
+    if not pool:
+        return None, None
+
+    queries = {
+        '每日每类商品权重加权平均价格': (build_category_price_query(), CATEGORY_PRICE_SCHEMA),
+        '每日总体价格指数': (build_daily_index_query(), DAILY_INDEX_SCHEMA),
+    }
+    print(f"\n并发执行 {len(queries)} 个查询（并发数 {QUERY_CONCURRENCY}，单查询超时 {QUERY_TIMEOUT}s）...")
+    with AsyncQueryExecutor(pool, max_concurrency=QUERY_CONCURRENCY, timeout=QUERY_TIMEOUT) as executor:
+        results = executor.run_all(queries, return_exceptions=True)
 
-    try:
-        result = client.query(query)
-        print("每日总体价格指数查询成功执行！")
-        if result.result_rows:
-            column_names = result.column_names
-            data = [dict(zip(column_names, row)) for row in result.result_rows]
-            return data
+    tables = []
+    for name, result in results.items():
+        if isinstance(result, BaseException):
+            print(f"执行{name}查询时出错: {result}")
+            tables.append(None)
         else:
-            print("每日总体价格指数查询没有返回任何数据。")
-            return []
-    except Exception as e:
-        print(f"执行每日总体价格指数查询时出错: {e}")
-        return []
+            print(f"{name}查询成功执行！")
+            if result.num_rows == 0:
+                print(f"{name}查询没有返回任何数据。")
+            tables.append(result)
+    return tuple(tables)
 
 def plot_daily_index_trend(index_data, output_filename="daily_price_index_trend.png"):
     """
     根据每日价格指数数据绘制趋势图并保存。
-    :param index_data: 包含每日指数数据的列表，每个元素是字典，需包含 'day' 和 'daily_overall_price_index'。
+    :param index_data: 每日指数数据的 pyarrow.Table，需包含 'day' 和 'daily_overall_price_index' 列。
     :param output_filename: 输出图像文件名。
     """
     if not index_data:
@@ -183,9 +192,9 @@ def plot_daily_index_trend(index_data, output_filename="daily_price_index_trend.
     # plt.rcParams['axes.unicode_minus'] = False
 
     # 提取日期和指数值
-    # ClickHouse 的 Date 类型返回的是 datetime.date 对象，可以直接用于绘图
-    days = [item['day'] for item in index_data]
-    index_values = [item['daily_overall_price_index'] for item in index_data]
+    # date32 列转换为 numpy datetime64[D] 数组，可以直接用于绘图
+    days = index_data.column('day').to_numpy()
+    index_values = index_data.column('daily_overall_price_index').to_numpy()
 
     # 绘图
     plt.figure(figsize=(12, 6))
@@ -218,16 +227,18 @@ if __name__ == "__main__":
         print("\n警告: 您似乎正在使用默认的 ClickHouse 连接配置。请更新脚本中的配置。")
         # exit(1) # 实际使用时建议退出
 
-    client = get_clickhouse_client()
+    pool = get_clickhouse_pool()
+
+    if pool:
+        # 分类价格与每日总体指数两个查询互不依赖，并发执行
+        category_results, daily_index_data = run_report_queries(pool)
 
-    if client:
-        # 1. 计算并打印每日每类商品权重加权平均价格 (原有功能)
-        print("\n--- 1. 计算每日每类商品权重加权平均价格 ---")
-        category_results = calculate_product_weighted_price_per_category(client)
+        # 1. 打印每日每类商品权重加权平均价格 (原有功能)
+        print("\n--- 1. 每日每类商品权重加权平均价格 ---")
         if category_results:
             print(f"\n成功获取 {len(category_results)} 条每日每类商品权重加权平均价格数据:")
             print("====================================================")
-            for row in category_results[:5]: # 打印前5条作为示例
+            for row in category_results.slice(0, 5).to_pylist(): # 打印前5条作为示例
                 print(f"日期: {row['day']}, 分类: {row['category_name']}, "
                       f"商品权重平均价: {row['product_weighted_average_price']:.2f}, "
                       f"总权重: {row['total_product_weight']:.2f}, "
@@ -238,14 +249,13 @@ if __name__ == "__main__":
         else:
             print("\n未能计算出每日每类商品的任何结果。")
 
-        # 2. 计算每日总体价格指数
-        print("\n--- 2. 计算每日总体价格指数 ---")
-        daily_index_data = calculate_daily_overall_price_index(client)
+        # 2. 每日总体价格指数
+        print("\n--- 2. 每日总体价格指数 ---")
 
         if daily_index_data:
             print(f"\n成功获取 {len(daily_index_data)} 条每日总体价格指数数据:")
             print("====================================================")
-            for row in daily_index_data[:5]: # 打印前5条作为示例
+            for row in daily_index_data.slice(0, 5).to_pylist(): # 打印前5条作为示例
                 print(f"日期: {row['day']}, "
                       f"总体价格指数: {row['daily_overall_price_index']:.2f}, "
                       f"当日总权重: {row['total_weight_for_day']:.2f}, "
@@ -260,7 +270,7 @@ if __name__ == "__main__":
         else:
             print("\n未能计算出每日总体价格指数。")
             
-        client.close()
+        pool.close()
         print("\n与 ClickHouse 的连接已关闭。")
 
     print("\n--- 脚本执行结束 ---") 
@@ -3,6 +3,8 @@ import argparse # 保留导入，以防将来恢复命令行功能，但实际
 import os # 导入os模块用于处理文件路径和文件名
 import shutil # 导入shutil模块用于文件操作，例如备份
 
+from src.cpi_calculator.compression import open_binary, open_text # .csv.gz / .csv.zst 流式解压与压缩
+
 def detect_csv_encoding(file_path, sample_size=10240):
     """
     检测 CSV 文件的字符集编码。
@@ -16,7 +18,7 @@ def detect_csv_encoding(file_path, sample_size=10240):
     tuple: (检测到的字符集编码名称, 置信度)，如果无法检测则返回 (None, 0.0)。
     """
     try:
-        with open(file_path, 'rb') as f:
+        with open_binary(file_path) as f:
             raw_data = f.read(sample_size)
             result = chardet.detect(raw_data)
             encoding = result['encoding']
@@ -100,7 +102,7 @@ def convert_file_to_utf8_inplace(original_file_path, chardet_detected_encoding,
     for enc_try_count, encoding_attempt in enumerate(unique_encodings_to_try):
         try:
             print(f"  尝试使用编码 '{encoding_attempt}' (strict模式) 读取...")
-            with open(original_file_path, 'r', encoding=encoding_attempt, errors='strict') as f_original:
+            with open_text(original_file_path, 'r', encoding=encoding_attempt, errors='strict') as f_original:
                 content = f_original.read()
             successfully_read_encoding = encoding_attempt
             print(f"  成功使用编码 '{successfully_read_encoding}' 读取文件内容。")
@@ -113,7 +115,7 @@ def convert_file_to_utf8_inplace(original_file_path, chardet_detected_encoding,
                 if chardet_detected_encoding: # 确保 chardet_detected_encoding 非空
                     print(f"将尝试使用 chardet 最初检测到的编码 '{chardet_detected_encoding}' 配合 errors='replace' 作为最后手段，可能导致数据丢失。")
                     try:
-                        with open(original_file_path, 'r', encoding=chardet_detected_encoding, errors='replace') as f_fallback:
+                        with open_text(original_file_path, 'r', encoding=chardet_detected_encoding, errors='replace') as f_fallback:
                             content = f_fallback.read()
                         successfully_read_encoding = chardet_detected_encoding + " (with errors='replace')"
                         print(f"  成功使用编码 '{successfully_read_encoding}' 读取文件内容 (部分字符可能被替换)。")
@@ -152,7 +154,7 @@ def convert_file_to_utf8_inplace(original_file_path, chardet_detected_encoding,
 
     print(f"准备将文件 '{original_file_path}' (实际读取编码: {successfully_read_encoding}) 直接写入为 UTF-8...")
     try:
-        with open(original_file_path, 'w', encoding='utf-8') as f_new:
+        with open_text(original_file_path, 'w', encoding='utf-8') as f_new:
             f_new.write(content)
         
         print(f"成功！文件 '{original_file_path}' 已直接转换为 UTF-8 编码。")
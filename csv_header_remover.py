@@ -3,6 +3,8 @@ import shutil
 import chardet
 import tempfile
 
+from src.cpi_calculator.compression import is_csv, open_binary, open_text
+
 # --- 用户配置区 ---
 # 请指定包含CSV文件的目标目录路径
 # 例如: TARGET_DIRECTORY = r"D:\\我的文档\\CSV数据" (Windows)
@@ -34,7 +36,7 @@ def robust_detect_encoding(file_path, sample_size=ENCODING_SAMPLE_SIZE):
     返回: (检测到的编码名称 (str) 或 None, 是否应使用errors='replace'读取 (bool))。
     """
     try:
-        with open(file_path, 'rb') as f:
+        with open_binary(file_path) as f:
             sample = f.read(sample_size)
             if not sample:
                 print(f"  文件 '{file_path}' 为空，无法检测编码。")
@@ -128,12 +130,14 @@ def remove_first_line_from_csv(csv_file_path, create_backup=CREATE_BACKUP_FILES)
 
     temp_fd, temp_path = -1, None
     try:
-        temp_fd, temp_path = tempfile.mkstemp(suffix=".tmp", text=False) # text=False for binary mode initially
+        # 临时文件保留原扩展名（如 .zst），open_text 据此按相同格式重新压缩写入
+        temp_fd, temp_path = tempfile.mkstemp(suffix=".tmp" + os.path.splitext(csv_file_path)[1])
+        os.close(temp_fd)
         
         lines_written = 0
         # newline='' is important for csv/text processing to handle line endings correctly
-        with open(csv_file_path, 'r', newline='', **read_encoding_options) as infile, \
-             os.fdopen(temp_fd, 'w', newline='', **write_encoding_options) as outfile:
+        with open_text(csv_file_path, 'r', newline='', **read_encoding_options) as infile, \
+             open_text(temp_path, 'w', newline='', **write_encoding_options) as outfile:
             
             first_line_skipped = False
             for line_number, line in enumerate(infile):
@@ -193,7 +197,7 @@ if __name__ == "__main__":
     failed_modifications_list = []
 
     for filename in os.listdir(TARGET_DIRECTORY):
-        if filename.lower().endswith('.csv'):
+        if is_csv(filename):
             file_path = os.path.join(TARGET_DIRECTORY, filename)
             if os.path.isfile(file_path):
                 processed_files_count += 1
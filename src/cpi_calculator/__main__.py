@@ -1,51 +1,136 @@
 # -*- coding: utf-8 -*-
 """
 CPI 计算器主程序 - 实现数据加载、计算、可视化全流程
+
+各阶段按依赖关系组成流水线，互不依赖的阶段并发执行：
+
+    categories ──────────────────┐
+    prices（流式，边读边筛选）─────┴─> indices ─> store ─> report
+
+分类映射的下载与价格数据的读取同时进行，价格批次经 prefetch 在后台提前拉取，
+筛选基期与报告期价格不必等待整个范围读取完毕，总耗时接近最慢的单个阶段。
+
+指定 --granularity 时改为回填历史指数（见 backfill.py）：按月分区在进程池中并行计算，
+每完成一个分区写入检查点，中断后重新运行同一命令从未完成的分区继续。
+
+用法：
+    python -m cpi_calculator --start 2023-01-01 --end 2025-01-31
+    python -m cpi_calculator --start 2023-01-01 --end 2025-01-31 --granularity day --workers 8
+    python -m cpi_calculator --start 2023-01-01 --end 2025-01-31 --granularity month --restart
 """
+import argparse
 import logging
-from config import settings
-from loader import SecureOSSDataLoader
-from calculator import CPICalculator
-from visualizer import Visualizer
+from pathlib import Path
+
+from .backfill import GRANULARITIES, run_backfill
+from .calculator import CPICalculator
+from .config import settings
+from .loader import LocalDataLoader, SecureOSSDataLoader
+from .pipeline import Pipeline, prefetch
+from .result_store import ResultStore, index_frame
+from .visualizer import Visualizer
 
 # 初始化日志
 LOGGER = logging.getLogger(__name__)
 
-def main():
+
+def build_loader():
+    """按配置创建数据加载器"""
+    if settings.get('LOADER', 'oss') == 'local':
+        return LocalDataLoader(data_dir=settings.LOCAL.DATA_DIR)
+    return SecureOSSDataLoader(
+        oss_conf={
+            'endpoint': settings.OSS.ENDPOINT,
+            'bucket': settings.OSS.BUCKET,
+            'sts_role_arn': settings.OSS.get('STS_ROLE_ARN', ''),
+            'max_concurrency': settings.OSS.get('MAX_CONCURRENCY', 8),
+            'cache_max_age': settings.OSS.get('CACHE_MAX_AGE', 0)
+        },
+        ch_conf={
+            'host': settings.DATABASE.HOST,
+            'port': settings.DATABASE.PORT,
+            'user': settings.DATABASE.USER,
+            'password': settings.DATABASE.get('PASSWORD', '')
+        }
+    )
+
+
+def build_pipeline(loader, calculator, result_store, visualizer, start_date, end_date, formula, output_path):
+    """组装计算流水线，阶段结果以阶段名为键返回"""
+    pipeline = Pipeline()
+    pipeline.add('categories', loader.load_category_mapping)
+    # 价格数据按批次流式读取，后台线程提前拉取，计算阶段边接收边处理
+    # 其他阶段失败时 pipeline.cancelled 被置位，价格流停止读取并关闭连接
+    pipeline.add('prices', lambda: calculator.collect_period_prices(
+        prefetch(loader.iter_price_batches(start_date, end_date), cancel=pipeline.cancelled), start_date, end_date
+    ))
+    pipeline.add('indices', calculator.compute_category_indices, 'prices', 'categories')
+
+    def store(category_cpi):
+        # 总指数与分类指数追加到结果存储，报告与看板直接读取
+        if category_cpi is None:
+            LOGGER.warning("基期或报告期没有可用价格，跳过结果保存")
+            return None
+        cpi_result = float((category_cpi['index'] * category_cpi['weight']).sum())
+        return result_store.append(index_frame(end_date, cpi_result, category_cpi), formula=formula)
+
+    pipeline.add('store', store, 'indices')
+    pipeline.add('report', lambda run_id: visualizer.plot_cpi_trend(
+        result_store.headline(formula=formula), output_path
+    ), 'store')
+    return pipeline
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cpi_calculator', description='CPI 计算')
+    parser.add_argument('--start', default='2023-01-01', help='开始日期（基期）YYYY-MM-DD')
+    parser.add_argument('--end', default='2025-01-31', help='结束日期（报告期）YYYY-MM-DD')
+    parser.add_argument('--granularity', choices=GRANULARITIES,
+                        help='回填粒度：逐日或逐月计算范围内每个报告日的指数；不指定时只计算结束日期')
+    parser.add_argument('--base', help='回填基期，默认为开始日期')
+    parser.add_argument('--workers', type=int, help='回填进程数，默认为 CPU 核数')
+    parser.add_argument('--checkpoint', help='回填检查点文件，默认按回填参数存放在结果目录下')
+    parser.add_argument('--restart', action='store_true', help='忽略已有检查点，重新回填全部分区')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     try:
         # 1. 初始化配置
         LOGGER.info("CPI 计算器启动，运行模式：%s", settings.ENV_FOR_DYNACONF)
-
-        # 2. 数据加载
-        loader = SecureOSSDataLoader(
-            oss_conf={
-                'endpoint': settings.OSS.ENDPOINT,
-                'bucket': settings.OSS.BUCKET,
-                'sts_role_arn': settings.OSS.get('STS_ROLE_ARN', '')
-            },
-            ch_conf={
-                'host': settings.DATABASE.HOST,
-                'port': settings.DATABASE.PORT,
-                'user': settings.DATABASE.USER,
-                'password': settings.DATABASE.get('PASSWORD', '')
-            }
-        )
-
-        # 加载价格数据和分类映射
-        start_date = '2023-01-01'
-        end_date = '2025-01-31'
-        price_data = loader.load_price_data(start_date, end_date)
-        category_mapping = loader.load_category_mapping()
-
-        # 3. 核心计算
-        calculator = CPICalculator(db_config=settings.DATABASE)
-        cpi_result = calculator.compute_cpi(price_data, category_mapping, start_date, end_date)
-
-        # 4. 结果输出
-        LOGGER.debug("生成可视化报告...")
+        start_date, end_date = args.start, args.end
+        # 计算始终为定基几何平均，结果按实际口径标记，而不是配置的 ALGORITHM
+        formula = CPICalculator.FORMULA
+        if settings.get('ALGORITHM', 'fixed') != 'fixed':
+            LOGGER.warning("ALGORITHM=%s 尚未实现，按定基几何平均计算（%s）", settings.ALGORITHM, formula)
+        result_store = ResultStore(settings.OUTPUT.get('RESULT_DIR', './results'))
         visualizer = Visualizer(engine=settings.OUTPUT.PLOT_ENGINE)
         output_path = settings.OUTPUT.REPORT.format(date=end_date)
-        visualizer.plot_cpi_trend(cpi_result, output_path)
+
+        if args.granularity:
+            # 2. 回填：按月分区并行计算，完成后由结果存储输出报告
+            checkpoint = args.checkpoint or Path(result_store.root) / (
+                f'.backfill-{formula}-{args.granularity}-{start_date}-{end_date}.json'
+            )
+            run_backfill(build_loader, settings.DATABASE, result_store, start_date, end_date, args.granularity,
+                         formula, checkpoint, base_date=args.base, max_workers=args.workers, restart=args.restart)
+            visualizer.plot_cpi_trend(result_store.headline(formula=formula), output_path)
+        else:
+            # 2. 组装流水线：数据加载、核心计算、结果保存与可视化输出
+            pipeline = build_pipeline(
+                loader=build_loader(),
+                calculator=CPICalculator(db_config=settings.DATABASE),
+                result_store=result_store,
+                visualizer=visualizer,
+                start_date=start_date,
+                end_date=end_date,
+                formula=formula,
+                output_path=output_path,
+            )
+
+            # 3. 执行
+            pipeline.run()
 
         LOGGER.info("处理成功 | 报告路径: %s | 可视化引擎: %s",
                     output_path, settings.OUTPUT.PLOT_ENGINE)
@@ -56,4 +141,5 @@ def main():
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     main()
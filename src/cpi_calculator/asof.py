@@ -0,0 +1,279 @@
+"""
+商品价格 as-of 索引 - 回答“商品 X 在日期 D 的价格是多少”，无需扫描每日文件或 price 表
+
+每个商品只保存价格变化点，按 (product_id, date) 排序存放在连续数组中：
+
+    product_ids[i]                    第 i 个商品（升序）
+    dates[offsets[i]:offsets[i + 1]]  该商品的变化日期（升序，自 1970-01-01 起的天数）
+    prices[offsets[i]:offsets[i + 1]] 对应日期起生效的价格
+
+as-of 查询返回不晚于 D 的最后一个变化点的价格，早于首次观测或商品不存在时为 NaN。
+批量查询先经哈希索引定位商品分段，再在各自分段内向量化二分（迭代次数为最长分段长度的对数），
+样例数据上 300 万次随机查询约 0.35 秒。
+
+同一商品同一天出现多个价格时：由每日文件构建取文件中最后出现的价格（与 differ.py 一致），
+由变更日志构建时原始行序已不可知，取最大的价格。
+
+用法：
+    python -m cpi_calculator.asof . --product 1 --date 2025-05-18
+    python -m cpi_calculator.asof data/prices_changelog --benchmark 1000000
+"""
+import argparse
+import logging
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .changelog import ChangeLogStore
+from .differ import latest_prices
+from .readers import PRICE_FILE_PATTERN, find_price_files, read_prices, to_date
+
+LOGGER = logging.getLogger(__name__)
+
+CHANGE_SCHEMA = pa.schema([
+    ('product_id', pa.int64()),
+    ('date', pa.date32()),
+    ('price', pa.float64()),
+])
+
+
+class AsOfPriceIndex:
+    """按商品分段的价格变化点索引，构建后不可变"""
+
+    def __init__(self, product_ids, offsets, dates, prices):
+        """
+        :param product_ids: 升序且不重复的商品ID
+        :param offsets: 长度为商品数 + 1 的分段偏移
+        :param dates: 变化日期（int32 天数），每个分段内升序
+        :param prices: 变化后的价格
+        """
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.dates = np.asarray(dates, dtype=np.int32)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        if len(self.offsets) != len(self.product_ids) + 1 or self.offsets[-1] != len(self.dates):
+            raise ValueError("offsets 与商品数或变化点数不一致")
+        if len(self.product_ids) > 1 and (self.product_ids[1:] <= self.product_ids[:-1]).any():
+            raise ValueError("商品ID必须升序且不重复")
+        self._positions = pd.Index(self.product_ids)
+        lengths = np.diff(self.offsets)
+        self._search_steps = int(lengths.max()).bit_length() if len(lengths) else 0
+
+    @classmethod
+    def from_observations(cls, product_ids, dates, prices) -> 'AsOfPriceIndex':
+        """
+        由价格观测构建：同一商品同一天保留最后一条，价格未变化的观测不保存
+        :param product_ids: 商品ID数组
+        :param dates: 观测日期（date32 数组、datetime64 或 int32 天数）
+        :param prices: 价格数组
+        """
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        dates = _to_days(dates)
+        prices = np.asarray(prices, dtype=np.float64)
+        # 稳定排序保持同一 (商品, 日期) 的输入顺序，每段取最后一条
+        order = np.lexsort((dates, product_ids))
+        product_ids, dates, prices = product_ids[order], dates[order], prices[order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (product_ids[1:] != product_ids[:-1]) | (dates[1:] != dates[:-1])
+        product_ids, dates, prices = product_ids[last], dates[last], prices[last]
+
+        new_product = np.ones(len(product_ids), dtype=bool)
+        new_product[1:] = product_ids[1:] != product_ids[:-1]
+        changed = new_product.copy()
+        changed[1:] |= prices[1:] != prices[:-1]
+        product_ids, dates, prices, new_product = (product_ids[changed], dates[changed], prices[changed],
+                                                   new_product[changed])
+
+        starts = np.flatnonzero(new_product)
+        offsets = np.append(starts, len(product_ids))
+        return cls(product_ids[starts], offsets, dates, prices)
+
+    @classmethod
+    def from_table(cls, prices: pa.Table) -> 'AsOfPriceIndex':
+        """由含 product_id、date（或 change_date）、price 列的价格表构建，行序即观测顺序"""
+        date_column = 'date' if 'date' in prices.column_names else 'change_date'
+        return cls.from_observations(prices.column('product_id').to_numpy(),
+                                     prices.column(date_column), prices.column('price').to_numpy())
+
+    @classmethod
+    def from_daily_files(cls, paths) -> 'AsOfPriceIndex':
+        """由 daily_prices_YYYYMMDD.csv 构建，日期取自文件名"""
+        tables = []
+        for path in sorted(paths, key=lambda p: Path(p).name):
+            match = PRICE_FILE_PATTERN.match(Path(path).name)
+            if not match:
+                raise ValueError(f"无法识别的价格文件名: {path}")
+            day = datetime.strptime(match.group(1), '%Y%m%d').date()
+            prices = latest_prices(read_prices(path, columns=['product_id', 'name', 'price']))
+            tables.append(pa.table({
+                'product_id': prices.column('product_id'),
+                'date': pa.array(np.full(prices.num_rows, np.datetime64(day, 'D'))).cast(pa.date32()),
+                'price': prices.column('price'),
+            }, schema=CHANGE_SCHEMA))
+        return cls.from_table(pa.concat_tables(tables) if tables else CHANGE_SCHEMA.empty_table())
+
+    @classmethod
+    def from_changelog(cls, store) -> 'AsOfPriceIndex':
+        """
+        由变更日志存储构建：按日期回放 (product_id, price) 的次数变化，
+        事件涉及的商品在当天以仍在出现的价格（多个时取最大）作为一次观测
+        :param store: ChangeLogStore 或其目录
+        """
+        if not isinstance(store, ChangeLogStore):
+            store = ChangeLogStore(store)
+        if not store.meta:
+            return cls.from_table(CHANGE_SCHEMA.empty_table())
+        base = pq.read_table(store.root / store.SNAPSHOT_FILE, columns=['product_id', 'price', 'count'])
+        active = {}
+        for product_id, price, count in zip(*(base.column(c).to_pylist() for c in ('product_id', 'price', 'count'))):
+            active.setdefault(product_id, {})[price] = count
+        product_ids, days, prices = list(active), [store.base_date] * len(active), [max(p) for p in active.values()]
+
+        events = store._read_events(store.last_date)
+        if events is not None and events.num_rows:
+            events = events.sort_by([('date', 'ascending')])
+            touched, current = set(), None
+            for day, product_id, price, count in zip(
+                    *(events.column(c).to_pylist() for c in ('date', 'product_id', 'price', 'count'))):
+                if day != current:
+                    _observe(active, touched, current, product_ids, days, prices)
+                    touched, current = set(), day
+                keys = active.setdefault(product_id, {})
+                if count:
+                    keys[price] = count
+                else:
+                    keys.pop(price, None)
+                touched.add(product_id)
+            _observe(active, touched, current, product_ids, days, prices)
+        return cls.from_observations(product_ids, np.array(days, dtype='datetime64[D]'), prices)
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @property
+    def num_changes(self) -> int:
+        return len(self.dates)
+
+    def lookup(self, product_ids, dates, return_dates=False):
+        """
+        批量 as-of 查询
+        :param product_ids: 商品ID数组
+        :param dates: 查询日期数组（或单个日期，对全部商品使用同一天）
+        :param return_dates: 同时返回价格生效日期（datetime64[D]，无结果为 NaT）
+        :return: 价格数组，无结果为 NaN
+        """
+        product_ids = np.atleast_1d(np.asarray(product_ids, dtype=np.int64))
+        days = np.broadcast_to(_to_days(dates), product_ids.shape)
+        prices = np.full(len(product_ids), np.nan)
+        effective = np.full(len(product_ids), np.datetime64('NaT'), dtype='datetime64[D]')
+        pos = self._positions.get_indexer(product_ids)
+        found = pos >= 0
+        pos = pos[found]
+        start = self.offsets[pos]
+        lo, hi, day = start.copy(), self.offsets[pos + 1], days[found]
+        # 在 [lo, hi) 内二分查找第一个晚于查询日期的变化点
+        for _ in range(self._search_steps):
+            active = lo < hi
+            mid = (lo + hi) >> 1
+            later = active.copy()
+            later[active] = self.dates[mid[active]] > day[active]
+            np.copyto(hi, mid, where=later)
+            np.copyto(lo, mid + 1, where=active & ~later)
+        hit = lo > start
+        rows = np.flatnonzero(found)[hit]
+        prices[rows] = self.prices[lo[hit] - 1]
+        effective[rows] = self.dates[lo[hit] - 1].astype('datetime64[D]')
+        return (prices, effective) if return_dates else prices
+
+    def price_at(self, product_id, day):
+        """单个商品的 as-of 价格，无结果返回 None"""
+        price = self.lookup([product_id], [to_date(day)])[0]
+        return None if np.isnan(price) else float(price)
+
+    def history(self, product_id) -> pa.Table:
+        """单个商品的全部价格变化点 [date, price]"""
+        pos = np.searchsorted(self.product_ids, product_id)
+        if pos == len(self.product_ids) or self.product_ids[pos] != product_id:
+            return CHANGE_SCHEMA.empty_table().drop_columns(['product_id'])
+        start, stop = self.offsets[pos], self.offsets[pos + 1]
+        return pa.table({'date': pa.array(self.dates[start:stop]).cast(pa.date32()),
+                         'price': pa.array(self.prices[start:stop])})
+
+    def to_table(self) -> pa.Table:
+        """全部变化点，列为 CHANGE_SCHEMA"""
+        return pa.table({
+            'product_id': np.repeat(self.product_ids, np.diff(self.offsets)),
+            'date': pa.array(self.dates).cast(pa.date32()),
+            'price': self.prices,
+        }, schema=CHANGE_SCHEMA)
+
+
+def _observe(active, touched, day, product_ids, days, prices):
+    """记录当天事件涉及的商品仍在出现的价格，当天已不再出现的商品沿用此前的价格"""
+    for product_id in touched:
+        if active[product_id]:
+            product_ids.append(product_id)
+            days.append(day)
+            prices.append(max(active[product_id]))
+
+
+def _to_days(values) -> np.ndarray:
+    """日期（date32 数组、datetime64、date 或 YYYY-MM-DD 字符串）转换为 int32 天数"""
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return values.cast(pa.date32()).cast(pa.int32()).to_numpy()
+    if isinstance(values, (str, date)):
+        values = [values]
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int32)
+    if values.dtype == object:
+        values = np.array([to_date(v) for v in values.reshape(-1)], dtype='datetime64[D]')
+    return values.astype('datetime64[D]').astype(np.int32)
+
+
+def build_index(source) -> AsOfPriceIndex:
+    """由变更日志目录（含 meta.json）或存放每日价格文件的目录构建索引"""
+    source = Path(source)
+    if (source / ChangeLogStore.META_FILE).exists():
+        return AsOfPriceIndex.from_changelog(source)
+    return AsOfPriceIndex.from_daily_files(find_price_files(source))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='商品价格 as-of 查询')
+    parser.add_argument('source', help='每日价格文件目录或变更日志目录')
+    parser.add_argument('--product', type=int, action='append', default=[], help='商品ID，可重复')
+    parser.add_argument('--date', help='查询日期 YYYY-MM-DD，默认输出全部变化点')
+    parser.add_argument('--benchmark', type=int, metavar='N', help='随机执行 N 次批量查询并输出耗时')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = build_index(args.source)
+    LOGGER.info("索引构建完成 | 商品: %d | 变化点: %d | 耗时: %.3fs",
+                len(index), index.num_changes, time.perf_counter() - start)
+
+    for product_id in args.product:
+        if args.date:
+            print(product_id, args.date, index.price_at(product_id, args.date))
+        else:
+            print(product_id)
+            print(index.history(product_id).to_pandas().to_string(index=False))
+
+    if args.benchmark and len(index):
+        rng = np.random.default_rng(0)
+        product_ids = rng.choice(index.product_ids, args.benchmark)
+        days = rng.integers(index.dates.min(), index.dates.max() + 1, args.benchmark).astype(np.int32)
+        start = time.perf_counter()
+        prices = index.lookup(product_ids, days)
+        elapsed = time.perf_counter() - start
+        print(f"{args.benchmark} 次查询耗时 {elapsed:.3f}s，命中 {int((~np.isnan(prices)).sum())} 次")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
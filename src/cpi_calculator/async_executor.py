@@ -0,0 +1,158 @@
+"""
+异步并发查询 - 在 asyncio 中并发执行互不依赖的 ClickHouse 查询，限制并发数，支持单查询超时与取消
+
+同步驱动的查询在专用线程池中执行，连接从 pool.py 的连接池按查询借还（连接池 max_size 应大于并发数，
+留出发送 KILL QUERY 的连接）。超时或被取消的查询按 query_id 通知服务器终止，尚未开始的查询直接跳过。
+
+    executor = AsyncQueryExecutor(pool, max_concurrency=4, timeout=60)
+    results = executor.run_all({'category': (CATEGORY_SQL, CATEGORY_SCHEMA), 'daily': DAILY_SQL})
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+
+from .columnar import cast_table, fetch_arrow
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryTimeoutError(TimeoutError):
+    """查询超过单查询超时时间"""
+
+
+class QueryCancelledError(RuntimeError):
+    """查询在开始执行前已被取消"""
+
+
+def run_query(client, query: str, schema: pa.Schema = None, query_id=None) -> pa.Table:
+    """以 Arrow 格式执行查询，兼容 clickhouse_connect（query_arrow）与 clickhouse_driver 客户端"""
+    if hasattr(client, 'query_arrow'):
+        settings = {'query_id': query_id} if query_id else None
+        table = client.query_arrow(query, settings=settings, use_strings=True)
+        return cast_table(table, schema) if schema is not None else table
+    return fetch_arrow(client, query, schema=schema, query_id=query_id)
+
+
+def kill_query(client, query_id: str):
+    """通知服务器终止查询"""
+    statement = f"KILL QUERY WHERE query_id = '{query_id}' ASYNC"
+    if hasattr(client, 'command'):
+        client.command(statement)
+    else:
+        client.execute(statement)
+
+
+def _query_spec(spec) -> tuple:
+    """查询描述：SQL，或 (SQL, schema)，或 (SQL, schema, timeout)"""
+    if isinstance(spec, str):
+        return spec, None, None
+    spec = tuple(spec)
+    return spec + (None,) * (3 - len(spec))
+
+
+class AsyncQueryExecutor:
+    """有界并发的异步查询执行器"""
+
+    def __init__(self, pool, max_concurrency=4, timeout=None, runner=run_query, killer=kill_query):
+        """
+        :param pool: ConnectionPool，每个查询借用一个连接
+        :param max_concurrency: 同时在服务器上执行的最大查询数
+        :param timeout: 默认的单查询超时秒数，None 表示不限
+        :param runner: 执行查询的函数 (client, query, schema, query_id) -> pyarrow.Table
+        :param killer: 终止查询的函数 (client, query_id)
+        """
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.runner = runner
+        self.killer = killer
+        self._threads = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='cpi-query')
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio.Semaphore 绑定事件循环，每次 asyncio.run 使用新的信号量
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._semaphore = loop, asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _execute(self, query, schema, query_id):
+        with self._lock:
+            if query_id in self._cancelled:
+                self._cancelled.discard(query_id)
+                raise QueryCancelledError(query_id)
+        with self.pool.connection() as client:
+            return self.runner(client, query, schema, query_id)
+
+    def _cancel(self, loop, query_id):
+        """标记查询已取消（未开始的直接跳过），并在后台通知服务器终止"""
+        with self._lock:
+            self._cancelled.add(query_id)
+        loop.run_in_executor(None, self._kill, query_id)
+
+    def _kill(self, query_id):
+        try:
+            with self.pool.connection() as client:
+                self.killer(client, query_id)
+        except Exception as e:
+            LOGGER.warning("终止查询 %s 失败: %s", query_id, e)
+
+    async def query(self, query: str, schema: pa.Schema = None, timeout=None, name=None) -> pa.Table:
+        """
+        执行单条查询
+        :param schema: 显式类型映射
+        :param timeout: 超时秒数，默认使用执行器的 timeout
+        :param name: 查询名称，用于日志与异常信息
+        """
+        timeout = self.timeout if timeout is None else timeout
+        query_id = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            future = loop.run_in_executor(self._threads, self._execute, query, schema, query_id)
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._cancel(loop, query_id)
+                raise QueryTimeoutError(f"查询超时（{timeout}s）: {name or query_id}") from None
+            except asyncio.CancelledError:
+                self._cancel(loop, query_id)
+                raise
+
+    async def gather(self, queries: dict, return_exceptions=False) -> dict:
+        """
+        并发执行多条互不依赖的查询
+        :param queries: {名称: SQL 或 (SQL, schema) 或 (SQL, schema, timeout)}
+        :param return_exceptions: True 时失败的查询以异常对象作为结果；否则任一失败即取消其余查询并抛出
+        :return: {名称: pyarrow.Table}
+        """
+        names = list(queries)
+        tasks = [asyncio.ensure_future(self.query(*_query_spec(queries[name]), name=name)) for name in names]
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return dict(zip(names, results))
+
+    def run_all(self, queries: dict, return_exceptions=False) -> dict:
+        """gather 的同步入口"""
+        return asyncio.run(self.gather(queries, return_exceptions=return_exceptions))
+
+    def close(self):
+        """关闭线程池，未开始的查询被丢弃"""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,192 @@
+"""
+历史指数回填 - 按月分区在进程池中并行计算，每完成一个分区写入检查点，中断后从未完成的分区继续
+
+每个分区为一个自然月（首尾按回填范围截断），分区内按粒度选取报告日：
+    day    分区内每一天
+    month  分区的最后一天
+
+报告日的指数相对基期（默认为回填开始日期）计算，结果以 run_id = backfill-<公式>-<基期>-<粒度>-<YYYY-MM> 追加到
+ResultStore；同一分区以相同参数重新计算时覆盖同名文件，检查点与结果之间中断也不会产生重复结果，
+公式或基期不同的回填互不覆盖。
+工作进程以 spawn 方式启动，不继承主进程中的连接池、凭证缓存与后台刷新线程，各自创建加载器。
+检查点为 JSON 文件，记录回填参数与已完成的分区，参数不一致时拒绝续跑。
+
+    completed = run_backfill(build_loader, settings.DATABASE, ResultStore('results'),
+                             '2023-01-01', '2025-01-31', 'month', 'fixed', 'results/.backfill.json')
+"""
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .calculator import CPICalculator
+from .compression import write_text_atomic
+from .readers import to_date
+from .result_store import index_frame
+
+LOGGER = logging.getLogger(__name__)
+
+GRANULARITIES = ('day', 'month')
+ONE_DAY = timedelta(days=1)
+
+# 工作进程内的加载器、计算器与分类数据，由 _init_worker 创建
+_WORKER = {}
+
+
+def month_partitions(start_date, end_date) -> list:
+    """将闭区间 [start_date, end_date] 按自然月切分为 [(分区开始, 分区结束)]"""
+    start, end = to_date(start_date), to_date(end_date)
+    partitions = []
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        partitions.append((start, min(end, next_month - ONE_DAY)))
+        start = next_month
+    return partitions
+
+
+def report_days(start: date, end: date, granularity: str) -> list:
+    """分区内的报告日"""
+    if granularity == 'day':
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if granularity == 'month':
+        return [end]
+    raise ValueError(f"不支持的粒度: {granularity}，可选 {', '.join(GRANULARITIES)}")
+
+
+def partition_name(partition) -> str:
+    return f'{partition[0]:%Y-%m}'
+
+
+def partition_run_id(formula: str, base_date: date, granularity: str, name: str) -> str:
+    """分区结果的 run_id，包含决定结果的全部回填参数"""
+    return f'backfill-{formula}-{base_date:%Y%m%d}-{granularity}-{name}'
+
+
+class Checkpoint:
+    """回填检查点：回填参数与已完成的分区，每次更新原子写入"""
+
+    def __init__(self, path, params: dict, restart=False):
+        """
+        :param path: 检查点文件路径
+        :param params: 回填参数，续跑时须与检查点中记录的一致
+        :param restart: 忽略已有的检查点重新开始
+        """
+        self.path = Path(path)
+        self.params = params
+        self.completed = set()
+        if self.path.exists() and not restart:
+            state = json.loads(self.path.read_text(encoding='utf-8'))
+            if state['params'] != params:
+                raise ValueError(f"检查点 {self.path} 的回填参数 {state['params']} 与本次 {params} 不一致，"
+                                 f"可使用 restart 重新开始")
+            self.completed = set(state['completed'])
+
+    def mark(self, name: str):
+        self.completed.add(name)
+        write_text_atomic(self.path, json.dumps({'params': self.params, 'completed': sorted(self.completed)}))
+
+
+def _init_worker(loader_factory, db_config, category_mapping):
+    _WORKER['loader'] = loader_factory()
+    _WORKER['calculator'] = CPICalculator(db_config=db_config)
+    _WORKER['category_mapping'] = category_mapping
+
+
+def compute_partition(start: date, end: date, base_date: date, granularity: str) -> pd.DataFrame:
+    """
+    在工作进程中计算一个分区的全部报告日
+    :return: DataFrame [date, category_id, level, cpi_index]，总指数的 category_id 与 level 为 0
+    """
+    loader, calculator = _WORKER['loader'], _WORKER['calculator']
+    days = [day for day in report_days(start, end, granularity) if day > base_date]
+    if not days:
+        return pd.DataFrame(columns=['date', 'category_id', 'level', 'cpi_index'])
+    base_batches = list(loader.iter_price_batches(f'{base_date}', f'{base_date}'))
+
+    # 分区内的价格只读取一次，只保留报告日的行
+    wanted = pa.array(days, type=pa.date32())
+    kept = []
+    for batch in loader.iter_price_batches(f'{days[0]}', f'{days[-1]}'):
+        kept.append(batch.filter(pc.is_in(pc.cast(batch.column('date'), pa.date32()), value_set=wanted)))
+    reports = pa.Table.from_batches(kept) if kept else None
+
+    frames = []
+    for day in days:
+        day_batches = []
+        if reports is not None:
+            on_day = pc.equal(pc.cast(reports.column('date'), pa.date32()), pa.scalar(day, pa.date32()))
+            day_batches = reports.filter(on_day).to_batches()
+        period_prices = calculator.collect_period_prices(base_batches + day_batches, base_date, day)
+        category_cpi = calculator.compute_category_indices(period_prices, _WORKER['category_mapping'])
+        if category_cpi is None:
+            LOGGER.warning("%s 没有可用价格，跳过", day)
+            continue
+        headline = float((category_cpi['index'] * category_cpi['weight']).sum())
+        frames.append(index_frame(day, headline, category_cpi))
+    if not frames:
+        return pd.DataFrame(columns=['date', 'category_id', 'level', 'cpi_index'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_backfill(loader_factory, db_config, result_store, start_date, end_date, granularity, formula,
+                 checkpoint_path, base_date=None, max_workers=None, restart=False) -> list:
+    """
+    回填 [start_date, end_date] 的指数
+    :param loader_factory: 创建数据加载器的函数，在每个工作进程中调用一次（须可被 spawn 启动的子进程导入）
+    :param db_config: CPICalculator 的数据库配置
+    :param result_store: ResultStore，结果在主进程中按分区追加
+    :param granularity: 报告日粒度，day 或 month
+    :param formula: 计算公式/口径标识
+    :param checkpoint_path: 检查点文件路径
+    :param base_date: 基期，默认为 start_date
+    :param max_workers: 最大进程数，默认为 CPU 核数
+    :param restart: 忽略已有的检查点重新开始
+    :return: 本次完成的分区名列表
+    """
+    start, end = to_date(start_date), to_date(end_date)
+    base = to_date(base_date) if base_date else start
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"不支持的粒度: {granularity}，可选 {', '.join(GRANULARITIES)}")
+    params = {'start': f'{start}', 'end': f'{end}', 'base': f'{base}', 'granularity': granularity,
+              'formula': formula}
+    checkpoint = Checkpoint(checkpoint_path, params, restart=restart)
+    todo = [p for p in month_partitions(start, end) if partition_name(p) not in checkpoint.completed]
+    LOGGER.info("回填 %s ~ %s | 粒度: %s | 待计算分区: %d | 已完成: %d",
+                start, end, granularity, len(todo), len(checkpoint.completed))
+    if not todo:
+        return []
+
+    # 分类数据在主进程中读取一次，随进程初始化分发给各工作进程；
+    # 读取时创建的连接池、凭证缓存与后台刷新线程不能被 fork 复制到子进程，工作进程以 spawn 方式启动
+    category_mapping = loader_factory().load_category_mapping()
+    completed, failed = [], []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(loader_factory, db_config, category_mapping)) as executor:
+        futures = {executor.submit(compute_partition, p[0], p[1], base, granularity): p for p in todo}
+        for future in as_completed(futures):
+            name = partition_name(futures[future])
+            try:
+                results = future.result()
+            except Exception:
+                LOGGER.exception("分区 %s 计算失败", name)
+                failed.append(name)
+                continue
+            if len(results):
+                result_store.append(results, formula=formula,
+                                    run_id=partition_run_id(formula, base, granularity, name))
+            checkpoint.mark(name)
+            completed.append(name)
+            LOGGER.info("分区 %s 完成（%d/%d）| 已用时: %.1fs",
+                        name, len(completed), len(todo), time.perf_counter() - started)
+    if failed:
+        raise RuntimeError(f"{len(failed)} 个分区计算失败: {', '.join(sorted(failed))}，重新运行将从未完成的分区继续")
+    return sorted(completed)
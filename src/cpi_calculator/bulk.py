@@ -0,0 +1,166 @@
+"""
+关系库批量写入 - 以 SQLAlchemy Core 分批 executemany 写入 category 与 price 表，主键冲突时更新
+
+不为每行构造 ORM 对象：每批行以字典列表交给一条 INSERT 语句执行。
+SQLite 与 PostgreSQL 使用 INSERT ... ON CONFLICT (主键) DO UPDATE，MySQL 使用 ON DUPLICATE KEY UPDATE，
+其他方言退化为普通 INSERT。同一批中主键重复的行只保留最后一行（PostgreSQL 不允许一条语句更新同一行两次）。
+
+用法：
+    python -m cpi_calculator.bulk sqlite:///cpi.db --categories categories.csv --prices daily_prices_*.csv
+    python -m cpi_calculator.bulk sqlite:///cpi.db --prices daily_prices_*.csv --compare-orm
+"""
+import argparse
+import logging
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import create_engine, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .readers import read_categories, read_prices
+from .schemas import Base, Category, Price
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 10_000
+
+# 数据文件列名 -> 表列名
+PRICE_COLUMNS = {'change_date': 'date', 'product_id': 'product_id', 'category_id': 'category_id',
+                 'name': 'name', 'price': 'price'}
+CATEGORY_COLUMNS = {'id': 'id', 'name': 'name', 'weight': 'weight', 'hierarchy': 'hierarchy',
+                    'parent': 'parent_id'}
+
+
+def upsert_statement(connection, model):
+    """按连接的方言生成主键冲突时更新其余列的 INSERT 语句"""
+    table = model.__table__
+    primary_key = [c.name for c in table.primary_key.columns]
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = (sqlite if dialect == 'sqlite' else postgresql).insert(table)
+        updates = {c.name: stmt.excluded[c.name] for c in table.columns if c.name not in primary_key}
+        return stmt.on_conflict_do_update(index_elements=primary_key, set_=updates)
+    if dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update({c.name: stmt.inserted[c.name] for c in table.columns
+                                             if c.name not in primary_key})
+    return insert(table)
+
+
+def _dedupe(rows: list, primary_key: list) -> list:
+    """同一批中主键重复的行只保留最后一行"""
+    return list({tuple(row[k] for k in primary_key): row for row in rows}.values())
+
+
+def bulk_upsert(connection, model, rows, batch_size=DEFAULT_BATCH_SIZE) -> int:
+    """
+    分批写入行，主键冲突时更新
+    :param connection: SQLAlchemy Connection（调用方负责事务）
+    :param model: schemas.py 中的模型类
+    :param rows: 列名与表列一致的 pyarrow.Table，或字典的可迭代对象
+    :param batch_size: 每条 INSERT 语句的行数
+    :return: 写入的行数（去重后）
+    """
+    stmt = upsert_statement(connection, model)
+    primary_key = [c.name for c in model.__table__.primary_key.columns]
+    if isinstance(rows, pa.Table):
+        batches = (batch.to_pylist() for batch in rows.to_batches(max_chunksize=batch_size))
+    else:
+        batches = _chunked(rows, batch_size)
+
+    written = 0
+    for batch in batches:
+        batch = _dedupe(batch, primary_key)
+        if batch:
+            connection.execute(stmt, batch)
+            written += len(batch)
+    return written
+
+
+def _chunked(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _select(table: pa.Table, columns: dict) -> pa.Table:
+    names = [name for name in columns if name in table.column_names]
+    table = table.select(names).rename_columns([columns[name] for name in names])
+    if 'name' in table.column_names:
+        table = table.set_column(table.schema.get_field_index('name'), 'name', table.column('name').cast(pa.string()))
+    return table
+
+
+def price_rows(prices: pa.Table) -> pa.Table:
+    """将 read_prices 的结果转换为 price 表的列"""
+    return _select(prices, PRICE_COLUMNS)
+
+
+def category_rows(categories: pa.Table) -> pa.Table:
+    """将 read_categories 的结果转换为 category 表的列，按层级排序保证父分类先写入"""
+    return _select(categories, CATEGORY_COLUMNS).sort_by([('hierarchy', 'ascending'), ('id', 'ascending')])
+
+
+def upsert_prices(connection, prices: pa.Table, batch_size=DEFAULT_BATCH_SIZE) -> int:
+    """写入每日价格数据"""
+    return bulk_upsert(connection, Price, price_rows(prices), batch_size)
+
+
+def upsert_categories(connection, categories: pa.Table, batch_size=DEFAULT_BATCH_SIZE) -> int:
+    """写入分类数据"""
+    return bulk_upsert(connection, Category, category_rows(categories), batch_size)
+
+
+def orm_insert_prices(session: Session, prices: pa.Table) -> int:
+    """逐行构造 ORM 对象写入（仅用于基准对比），主键重复的行由 merge 更新"""
+    rows = price_rows(prices).to_pylist()
+    for row in rows:
+        session.merge(Price(**row))
+        session.flush()
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量写入分类与价格数据到关系库')
+    parser.add_argument('url', help='SQLAlchemy 数据库 URL，如 sqlite:///cpi.db')
+    parser.add_argument('--categories', help='categories.csv 路径')
+    parser.add_argument('--prices', nargs='*', default=[], help='daily_prices_YYYYMMDD.csv 路径')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--compare-orm', action='store_true', help='另建内存 SQLite 库以 ORM 逐行写入第一个价格文件作对比')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        if args.categories:
+            started = time.perf_counter()
+            rows = upsert_categories(connection, read_categories(args.categories), args.batch_size)
+            LOGGER.info("分类 %d 行，%.2fs", rows, time.perf_counter() - started)
+        for path in args.prices:
+            started = time.perf_counter()
+            rows = upsert_prices(connection, read_prices(path), args.batch_size)
+            seconds = time.perf_counter() - started
+            LOGGER.info("%s: %d 行，%.2fs，%.0f 行/秒", path, rows, seconds, rows / seconds if seconds else 0)
+
+    if args.compare_orm and args.prices:
+        orm_engine = create_engine('sqlite://')
+        Base.metadata.create_all(orm_engine)
+        prices = read_prices(args.prices[0])
+        with Session(orm_engine) as session:
+            started = time.perf_counter()
+            rows = orm_insert_prices(session, prices)
+            session.commit()
+            seconds = time.perf_counter() - started
+        LOGGER.info("ORM 逐行写入 %s: %d 行，%.2fs，%.0f 行/秒", args.prices[0], rows, seconds, rows / seconds)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
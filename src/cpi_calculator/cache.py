@@ -0,0 +1,196 @@
+"""
+OSS 对象本地磁盘缓存 - 按内容哈希存放解析后的 Arrow 快照，ETag/Last-Modified 条件校验，按容量 LRU 淘汰
+"""
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from pathlib import Path
+
+import pyarrow as pa
+
+from .compression import atomic_path, write_text_atomic
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'cpi_calculator' / 'oss'
+
+
+class ObjectCache:
+    """
+    OSS 对象读取缓存
+
+    目录结构：
+        index.json             # 对象 key -> {etag, last_modified, digest, size, checked_at, used_at}
+        objects/<digest>.arrow # 对象内容 sha256 对应的解析结果（Arrow IPC 文件）
+
+    同一内容只解析、存储一次；对象未变化时直接内存映射读取快照，不下载也不解析 CSV。
+    命中只在内存中更新使用与校验时间，索引在写入新快照（含淘汰）、close() 或进程退出时落盘。
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=256 * 1024 * 1024, max_age=0.0):
+        """
+        :param root: 缓存目录
+        :param max_bytes: 快照文件总大小上限，超出时淘汰最久未使用的对象
+        :param max_age: 距上次校验不超过该秒数时不再向 OSS 发起条件校验
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self._dirty = False
+        _OPEN_CACHES.add(self)
+
+    def _load_index(self) -> dict:
+        try:
+            return json.loads((self.root / self.INDEX_FILE).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            LOGGER.warning("缓存索引损坏，已重建: %s", e)
+            return {}
+
+    def _save_index(self):
+        write_text_atomic(self.root / self.INDEX_FILE, json.dumps(self._index, ensure_ascii=False, indent=1))
+        self._dirty = False
+
+    def _snapshot_path(self, digest) -> Path:
+        return self.root / 'objects' / f'{digest}.arrow'
+
+    def get_table(self, client, key, parse) -> pa.Table:
+        """
+        读取 OSS 对象并返回解析后的表，优先使用本地快照
+        :param client: OSS 客户端，需提供 head_object(key) 与 get_object(key)
+        :param key: 对象 key
+        :param parse: 将对象字节解析为 pyarrow.Table 的函数
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and not self._snapshot_path(entry['digest']).exists():
+                entry = None
+
+            if entry is not None and time.time() - entry['checked_at'] <= self.max_age:
+                return self._hit(key, entry)
+
+            try:
+                meta = client.head_object(key)
+            except Exception as e:
+                if entry is None:
+                    raise
+                # 网络不可用时使用已缓存的快照
+                LOGGER.warning("OSS 对象校验失败，使用本地缓存 %s: %s", key, e)
+                return self._hit(key, entry)
+
+            etag, last_modified = _validators(meta)
+            if entry is not None and _matches(entry, etag, last_modified):
+                entry['checked_at'] = time.time()
+                return self._hit(key, entry)
+
+            data = client.get_object(key).read()
+            digest = hashlib.sha256(data).hexdigest()
+            path = self._snapshot_path(digest)
+            if path.exists():
+                table = _read_snapshot(path)
+            else:
+                table = parse(data)
+                _write_snapshot(table, path)
+            LOGGER.debug("OSS 对象已更新缓存 %s (etag=%s)", key, etag)
+
+            self._index[key] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'digest': digest,
+                'size': path.stat().st_size,
+                'checked_at': time.time(),
+                'used_at': time.time(),
+            }
+            self._evict(keep=key)
+            self._save_index()
+            return table
+
+    def _hit(self, key, entry) -> pa.Table:
+        entry['used_at'] = time.time()
+        self._dirty = True
+        LOGGER.debug("OSS 对象命中缓存 %s", key)
+        return _read_snapshot(self._snapshot_path(entry['digest']))
+
+    def _evict(self, keep=None):
+        """按最近使用时间淘汰，直至快照总大小不超过 max_bytes（多个 key 共享的快照只计一次，刚写入的 keep 不淘汰）"""
+        sizes = {e['digest']: e['size'] for e in self._index.values()}
+        total = sum(sizes.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['used_at']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            del self._index[key]
+            digest = entry['digest']
+            if all(e['digest'] != digest for e in self._index.values()):
+                total -= sizes[digest]
+                self._snapshot_path(digest).unlink(missing_ok=True)
+                LOGGER.debug("淘汰缓存对象 %s", key)
+
+    def clear(self):
+        """删除全部缓存"""
+        with self._lock:
+            for entry in self._index.values():
+                self._snapshot_path(entry['digest']).unlink(missing_ok=True)
+            self._index = {}
+            self._save_index()
+
+    def close(self):
+        """将内存中更新的使用与校验时间写回索引"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_OPEN_CACHES = weakref.WeakSet()
+
+
+@atexit.register
+def close_all_caches():
+    """进程退出时写回全部缓存实例的索引"""
+    for cache in list(_OPEN_CACHES):
+        try:
+            cache.close()
+        except OSError as e:
+            LOGGER.warning("缓存索引写回失败 %s: %s", cache.root, e)
+
+
+def _validators(meta):
+    """从 head_object 结果中取出 ETag 与 Last-Modified"""
+    etag = getattr(meta, 'etag', None)
+    last_modified = getattr(meta, 'last_modified', None)
+    return (str(etag) if etag is not None else None,
+            str(last_modified) if last_modified is not None else None)
+
+
+def _matches(entry, etag, last_modified) -> bool:
+    # 优先比较 ETag，缺失时退化为 Last-Modified；两者都没有时视为已变化
+    if etag is not None:
+        return entry['etag'] == etag
+    return last_modified is not None and entry['last_modified'] == last_modified
+
+
+def _read_snapshot(path) -> pa.Table:
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _write_snapshot(table, path):
+    with atomic_path(path) as tmp:
+        with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
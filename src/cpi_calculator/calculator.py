@@ -1,24 +1,59 @@
-import clickhouse_driver
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from .category_tree import CategoryTree
+from .columnar import fetch_arrow
 from .schemas import Category, Price
 from .config import settings
+from .pool import get_clickhouse_pool
+
+# 构建分类树读取的 category 表列，须与 ddl.py 生成的建表语句一致
+CATEGORY_TREE_COLUMNS = ('id', 'parent', 'weight')
 
 class CPICalculator:
+    # 结果的口径标识：各末级分类为基期与报告期价格比的几何平均（Jevons），再按权重加总，均相对固定基期
+    FORMULA = 'jevons_fixed_base'
+
     def __init__(self, db_config):
         self.db_config = db_config
-        self.clickhouse_client = self._connect_clickhouse()
-        self.sqlalchemy_engine = self._connect_sqlalchemy()
-        self.Session = sessionmaker(bind=self.sqlalchemy_engine)
+
+    # 连接在首次使用时创建，只用到其中一种后端时不必承担另一种的初始化开销
+    @cached_property
+    def clickhouse_pool(self):
+        return self._connect_clickhouse()
+
+    @cached_property
+    def sqlalchemy_engine(self):
+        return self._connect_sqlalchemy()
+
+    @cached_property
+    def Session(self):
+        return sessionmaker(bind=self.sqlalchemy_engine)
+
+    @property
+    def category_tree(self):
+        """
+        由 ClickHouse 的 category 表构建的分类树索引
+        每次访问重新读取分类表（只有 id/parent/weight 三列），内容版本未变化时复用已构建的实例，
+        长期运行的计算器在分类表更新后即使用新版本
+        """
+        with self.clickhouse_pool.connection() as client:
+            query = f"SELECT {', '.join(CATEGORY_TREE_COLUMNS)} FROM category"
+            return CategoryTree.from_table(fetch_arrow(client, query))
 
     def _connect_clickhouse(self):
-        """连接到 ClickHouse 数据库"""
-        return clickhouse_driver.Client(
-            host=self.db_config['CLICKHOUSE_HOST'],
-            port=self.db_config['CLICKHOUSE_PORT'],
-            user=self.db_config['CLICKHOUSE_USER'],
-            password=self.db_config['CLICKHOUSE_PASSWORD']
-        )
+        """获取进程内共享的 ClickHouse 连接池"""
+        return get_clickhouse_pool({
+            'host': self.db_config['CLICKHOUSE_HOST'],
+            'port': self.db_config['CLICKHOUSE_PORT'],
+            'user': self.db_config['CLICKHOUSE_USER'],
+            'password': self.db_config['CLICKHOUSE_PASSWORD']
+        })
 
     def _connect_sqlalchemy(self):
         """连接到 SQLAlchemy 引擎"""
@@ -29,15 +64,11 @@ class CPICalculator:
         # 使用 ClickHouse SQL 查询计算 CPI
         sql_query = f"""
         WITH 
-        -- 获取所有叶子类别的ID和权重（没有子类别的类别）
+        -- 叶子类别（没有子类别的类别）的ID和权重，ID 由分类树索引预先算出
         leaf_categories AS (
             SELECT id, weight
             FROM category
-            WHERE NOT EXISTS (
-                SELECT 1 
-                FROM category c2 
-                WHERE c2.parent = category.id
-            )
+            WHERE id IN %(leaf_ids)s
         ),
         -- 获取基期和报告期的价格（假设基期为上月，报告期为本月）
         price_data AS (
@@ -68,12 +99,80 @@ class CPICalculator:
         JOIN leaf_categories lc ON cc.category_id = lc.id;
         """
         
-        result = self._execute_clickhouse_query(sql_query)
+        result = self._execute_clickhouse_query(sql_query, {'leaf_ids': tuple(self.category_tree.leaf_ids.tolist())})
         return result[0][0] if result else None
 
-    def _execute_clickhouse_query(self, query):
-        """执行 ClickHouse 查询"""
-        return self.clickhouse_client.execute(query)
+    def compute_cpi_from_batches(self, batches, category_mapping: pd.DataFrame, start_date, end_date):
+        """
+        流式消费价格批次计算 CPI，口径与 compute_cpi 的 SQL 一致
+        每个批次只保留基期和报告期两天的价格，内存占用与加载的数据总量无关
+        :param batches: 产出 pyarrow.RecordBatch 的可迭代对象，需包含 [product_id, category_id, date, price]
+        :param category_mapping: 分类数据，需包含 [id, parent, weight]
+        """
+        category_cpi = self.compute_category_indices_from_batches(batches, category_mapping, start_date, end_date)
+        if category_cpi is None:
+            return None
+        return float((category_cpi['index'] * category_cpi['weight']).sum())
+
+    def compute_category_indices_from_batches(self, batches, category_mapping: pd.DataFrame, start_date, end_date):
+        """
+        流式消费价格批次计算每个末级分类的价格指数（几何平均），参数同 compute_cpi_from_batches
+        :return: DataFrame [category_id, level, index, weight]，无可用价格时返回 None
+        """
+        period_prices = self.collect_period_prices(batches, start_date, end_date)
+        return self.compute_category_indices(period_prices, category_mapping)
+
+    def collect_period_prices(self, batches, start_date, end_date):
+        """
+        流式消费价格批次，只保留基期和报告期两天的价格，不依赖分类数据，可与分类加载并行执行
+        :return: DataFrame [product_id, category_id, base_price, report_price]，无可用价格时返回 None
+        """
+        base_day = pd.Timestamp(start_date).date()
+        report_day = pd.Timestamp(end_date).date()
+        wanted = pa.array([base_day, report_day], type=pa.date32())
+
+        kept = []
+        for batch in batches:
+            batch = batch.select(['product_id', 'category_id', 'date', 'price'])
+            dates = pc.cast(batch.column('date'), pa.date32())
+            kept.append(batch.filter(pc.is_in(dates, value_set=wanted)).set_column(2, 'date', dates))
+        if not kept:
+            return None
+        prices = pa.Table.from_batches(kept).to_pandas()
+
+        # 获取基期和报告期的价格
+        prices['period'] = np.where(prices['date'] == base_day, 'base_price', 'report_price')
+        price_data = prices.pivot_table(
+            index=['product_id', 'category_id'], columns='period', values='price', aggfunc='max'
+        ).reset_index()
+        if not {'base_price', 'report_price'} <= set(price_data.columns):
+            return None
+        return price_data[(price_data['base_price'] > 0) & price_data['report_price'].notna()]
+
+    def compute_category_indices(self, period_prices, category_mapping: pd.DataFrame):
+        """
+        由基期与报告期价格计算每个末级分类的价格指数
+        :param period_prices: collect_period_prices 的结果
+        :param category_mapping: 分类数据，需包含 [id, parent, weight]
+        :return: DataFrame [category_id, level, index, weight]，无可用价格时返回 None
+        """
+        if period_prices is None:
+            return None
+        # 叶子类别：没有子类别的类别
+        leaf_categories = CategoryTree.from_table(category_mapping).leaf_table().to_pandas()
+
+        # 每个叶子类别的几何平均价格指数，再按权重求和
+        price_data = period_prices.merge(leaf_categories, left_on='category_id', right_on='id')
+        price_data['log_ratio'] = np.log(price_data['report_price'] / price_data['base_price'])
+        category_cpi = price_data.groupby('category_id').agg(
+            log_ratio=('log_ratio', 'mean'), level=('level', 'first'), weight=('weight', 'first')
+        ).reset_index()
+        category_cpi['index'] = np.exp(category_cpi['log_ratio'])
+        return category_cpi[['category_id', 'level', 'index', 'weight']]
+
+    def _execute_clickhouse_query(self, query, params=None):
+        """借用连接池中的连接执行 ClickHouse 查询"""
+        return self.clickhouse_pool.execute(query, params)
 
 # 示例用法
 if __name__ == "__main__":
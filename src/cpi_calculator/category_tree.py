@@ -0,0 +1,218 @@
+"""
+分类树索引 - 由 categories.csv 或 category 表一次构建：末级标记、层级、祖先数组与闭包表
+
+    tree = CategoryTree.from_table(read_categories('categories.csv'))
+    tree.is_leaf_id(1101010001)              # O(1)
+    tree.ancestors_of(1101010001)            # [1101000000, 1101010000]，自顶向下
+    tree.ancestor_at(product_category_ids, 1)  # 批量取一级分类
+
+祖先数组 paths[i, d-1] 为第 i 个分类在第 d 层的祖先位置（自身位于 depth[i]-1，之后为 -1），
+逐层汇总只需一次按列取值。构建结果按内容版本（id/parent/weight 的哈希）缓存，
+相同内容的分类数据重复构建直接返回缓存的实例。闭包表可按版本持久化到 ClickHouse 供 SQL 关联。
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .columnar import insert_arrow
+
+LOGGER = logging.getLogger(__name__)
+
+CLOSURE_TABLE = 'category_closure'
+CLOSURE_SCHEMA = pa.schema([
+    ('version', pa.string()),
+    ('ancestor_id', pa.int64()),
+    ('descendant_id', pa.int64()),
+    ('distance', pa.int8()),
+    ('descendant_is_leaf', pa.bool_()),
+])
+# 缓存的树版本数
+MAX_CACHED_TREES = 8
+_TREES = OrderedDict()
+
+
+class CategoryTree:
+    """不可变的分类树索引，节点按输入顺序编号"""
+
+    def __init__(self, ids, parents, weights=None, names=None, version=None):
+        """
+        :param ids: 分类ID数组
+        :param parents: 父分类ID数组，顶级分类为空（None/NaN）
+        :param weights: 权重数组
+        :param names: 名称数组
+        :param version: 内容版本，默认由 ids/parents/weights 计算
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        parents = pd.array(parents, dtype='Int64')
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.names = None if names is None else np.asarray(names, dtype=object)
+        self.version = version or tree_version(self.ids, parents, self.weights)
+
+        n = len(self.ids)
+        order = np.argsort(self.ids, kind='stable')
+        self._sorted_ids, self._sorted_pos = self.ids[order], order
+        if n and (self._sorted_ids[1:] == self._sorted_ids[:-1]).any():
+            raise ValueError("分类ID重复")
+        self._index = {int(category_id): i for i, category_id in enumerate(self.ids)}
+
+        # 父分类位置，顶级分类与父分类不存在时为 -1
+        has_parent = ~pd.isna(parents)
+        parent_ids = np.asarray(parents.fillna(0), dtype=np.int64)
+        positions, found = self._lookup(parent_ids)
+        self.parent_pos = np.where(has_parent & found, positions, -1)
+        if (has_parent & ~found).any():
+            LOGGER.warning("%d 个分类的父分类不存在，按顶级分类处理", int((has_parent & ~found).sum()))
+
+        self.is_leaf = np.ones(n, dtype=bool)
+        self.is_leaf[self.parent_pos[self.parent_pos >= 0]] = False
+        self.depth = self._compute_depth()
+        self.paths = self._compute_paths()
+
+    @classmethod
+    def from_table(cls, categories) -> 'CategoryTree':
+        """
+        由分类数据构建（相同内容返回缓存的实例）
+        :param categories: 含 id 与 parent（或 parent_id）列的 pyarrow.Table 或 DataFrame，可选 weight/name
+        """
+        if isinstance(categories, pa.Table):
+            categories = categories.to_pandas()
+        parent_column = 'parent' if 'parent' in categories.columns else 'parent_id'
+        ids = categories['id'].to_numpy(dtype=np.int64)
+        parents = pd.array(categories[parent_column], dtype='Int64')
+        weights = categories['weight'].to_numpy(dtype=np.float64) if 'weight' in categories.columns else None
+        version = tree_version(ids, parents, weights)
+        tree = _TREES.get(version)
+        if tree is None:
+            names = categories['name'].to_numpy() if 'name' in categories.columns else None
+            tree = _TREES[version] = cls(ids, parents, weights, names, version=version)
+            while len(_TREES) > MAX_CACHED_TREES:
+                _TREES.popitem(last=False)
+        else:
+            _TREES.move_to_end(version)
+        return tree
+
+    def _lookup(self, category_ids: np.ndarray):
+        """批量查找分类位置，返回 (位置, 是否存在)"""
+        category_ids = np.asarray(category_ids, dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.zeros(len(category_ids), dtype=np.int64), np.zeros(len(category_ids), dtype=bool)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, category_ids), len(self._sorted_ids) - 1)
+        return self._sorted_pos[pos], self._sorted_ids[pos] == category_ids
+
+    def _compute_depth(self) -> np.ndarray:
+        if len(self.ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        depth = np.where(self.parent_pos < 0, 1, 0)
+        for _ in range(len(self.ids)):
+            pending = depth == 0
+            if not pending.any():
+                return depth
+            ready = pending & (depth[self.parent_pos] > 0)
+            depth[ready] = depth[self.parent_pos[ready]] + 1
+        raise ValueError("分类父子关系存在环")
+
+    def _compute_paths(self) -> np.ndarray:
+        max_depth = int(self.depth.max()) if len(self.ids) else 0
+        paths = np.full((len(self.ids), max_depth), -1, dtype=np.int64)
+        rows = np.arange(len(self.ids))
+        current, level = rows.copy(), self.depth - 1
+        while len(rows):
+            paths[rows, level] = current
+            keep = level > 0
+            rows, current, level = rows[keep], self.parent_pos[current[keep]], level[keep] - 1
+        return paths
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def leaf_ids(self) -> np.ndarray:
+        return self.ids[self.is_leaf]
+
+    def leaf_table(self) -> pa.Table:
+        """末级分类的 id、weight 与所在层级 level"""
+        weights = self.weights[self.is_leaf] if self.weights is not None else None
+        return pa.table({'id': self.leaf_ids, 'weight': pa.array(weights, pa.float64()),
+                         'level': self.depth[self.is_leaf].astype(np.int8)})
+
+    def is_leaf_id(self, category_id) -> bool:
+        return bool(self.is_leaf[self._index[int(category_id)]])
+
+    def depth_of(self, category_id) -> int:
+        return int(self.depth[self._index[int(category_id)]])
+
+    def parent_of(self, category_id):
+        parent = self.parent_pos[self._index[int(category_id)]]
+        return int(self.ids[parent]) if parent >= 0 else None
+
+    def ancestors_of(self, category_id) -> list:
+        """自顶向下的祖先ID列表（不含自身）"""
+        pos = self._index[int(category_id)]
+        return self.ids[self.paths[pos, :self.depth[pos] - 1]].tolist()
+
+    def ancestor_at(self, category_ids, level: int) -> np.ndarray:
+        """
+        批量取第 level 层的祖先ID（level 不小于自身层级时为自身），未知分类或层级不足时为 -1
+        :param category_ids: 分类ID数组（如每个商品的 category_id）
+        """
+        pos, found = self._lookup(category_ids)
+        level = min(level, self.paths.shape[1])
+        ancestors = self.paths[pos, np.minimum(self.depth[pos], level) - 1]
+        return np.where(found & (ancestors >= 0), self.ids[ancestors], -1)
+
+    def closure_table(self) -> pa.Table:
+        """闭包表：每个 (祖先, 后代) 对一行，含自身（distance=0）"""
+        rows, levels = np.nonzero(self.paths >= 0)
+        ancestors = self.paths[rows, levels]
+        return pa.table({
+            'version': pa.array([self.version] * len(rows), pa.string()),
+            'ancestor_id': self.ids[ancestors],
+            'descendant_id': self.ids[rows],
+            'distance': (self.depth[rows] - 1 - levels).astype(np.int8),
+            'descendant_is_leaf': self.is_leaf[rows],
+        }, schema=CLOSURE_SCHEMA)
+
+
+def tree_version(ids, parents, weights=None) -> str:
+    """分类树内容版本：id/parent/weight 的哈希"""
+    digest = hashlib.sha256(np.asarray(ids, dtype=np.int64).tobytes())
+    digest.update(np.asarray(pd.array(parents, dtype='Int64').fillna(-1), dtype=np.int64).tobytes())
+    if weights is not None:
+        digest.update(np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=-1.0).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def closure_ddl(table_name=CLOSURE_TABLE, database=None) -> str:
+    """闭包表的 ClickHouse 建表语句，按版本与祖先排序，便于按祖先展开后代"""
+    qualified = f'{database}.{table_name}' if database else table_name
+    return f"""
+        CREATE TABLE IF NOT EXISTS {qualified}
+        (
+            version LowCardinality(String),
+            ancestor_id UInt64,
+            descendant_id UInt64,
+            distance UInt8,
+            descendant_is_leaf Bool
+        )
+        ENGINE = MergeTree
+        ORDER BY (version, ancestor_id, descendant_id)
+    """
+
+
+def save_closure(client, tree: CategoryTree, table_name=CLOSURE_TABLE) -> bool:
+    """
+    将闭包表写入 ClickHouse，同一版本只写一次
+    :param client: clickhouse_driver.Client
+    :return: 是否写入了新版本
+    """
+    client.execute(closure_ddl(table_name))
+    existing = client.execute(f'SELECT count() FROM {table_name} WHERE version = %(version)s',
+                              {'version': tree.version})
+    if existing and existing[0][0]:
+        return False
+    insert_arrow(client, table_name, tree.closure_table())
+    return True
@@ -0,0 +1,226 @@
+"""
+每日价格变更日志存储 - 首日快照 + 每日变更事件，按需重建任意一天的完整价格表
+
+每日价格文件中同一商品可能出现多次（按权重有放回抽样），同一商品同一天也可能有两个价格，
+因此以 (product_id, price) 为键记录出现次数 count，事件记录键的新次数：
+
+    <root>/meta.json                       # {"base_date": ..., "last_date": ...}
+    <root>/snapshot.parquet                # 首日：product_id, price, category_id, name, count
+    <root>/events/YYYY-MM.parquet          # 每月一个文件：date, product_id, price, category_id, name, count, kind
+
+kind 为 added（新出现的键）、removed（count 变为 0）或 count（仅次数变化）；
+商品调价表现为旧价格键 removed 与新价格键 added。
+
+用法：
+    python -m cpi_calculator.changelog convert . data/prices_changelog
+    python -m cpi_calculator.changelog snapshot data/prices_changelog 2025-05-18 out.csv
+"""
+import argparse
+import json
+import logging
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from .compression import atomic_path, write_text_atomic
+from .readers import PRICE_FILE_PATTERN, PRICE_FILE_SCHEMA, find_price_files, read_prices, to_date
+
+LOGGER = logging.getLogger(__name__)
+
+KEY = ['product_id', 'price']
+STATE_SCHEMA = pa.schema([
+    ('product_id', pa.int64()),
+    ('price', pa.float64()),
+    ('category_id', pa.int64()),
+    ('name', pa.string()),
+    ('count', pa.int32()),
+])
+EVENT_SCHEMA = pa.schema([('date', pa.date32())] + list(STATE_SCHEMA) + [('kind', pa.string())])
+
+
+def to_state(prices: pa.Table) -> pa.Table:
+    """将每日价格表聚合为 (product_id, price) -> count 的状态表"""
+    prices = prices.set_column(prices.schema.get_field_index('name'), 'name', prices.column('name').cast(pa.string()))
+    state = prices.group_by(KEY).aggregate([
+        ('category_id', 'first'), ('name', 'first'), ('product_id', 'count'),
+    ]).rename_columns(['product_id', 'price', 'category_id', 'name', 'count'])
+    return state.cast(STATE_SCHEMA).sort_by([(k, 'ascending') for k in KEY])
+
+
+def diff_states(old: pa.Table, new: pa.Table, day) -> pa.Table:
+    """比较前后两天的状态表，返回 count 变化的事件"""
+    joined = new.join(old.select(KEY + ['count']).rename_columns(KEY + ['old_count']), KEY, join_type='full outer')
+    # 仅存在于旧状态的键：名称与分类从旧状态补齐
+    removed_keys = joined.filter(pc.is_null(joined.column('count')))
+    joined = joined.filter(pc.is_valid(joined.column('count')))
+    removed = old.join(removed_keys.select(KEY), KEY, join_type='inner')
+
+    old_count = pc.fill_null(joined.column('old_count'), 0)
+    changed = joined.filter(pc.not_equal(joined.column('count'), old_count))
+    changed_old = pc.fill_null(changed.column('old_count'), 0)
+    kinds = pc.if_else(pc.equal(changed_old, 0), 'added', 'count')
+
+    events = pa.concat_tables([
+        changed.select(STATE_SCHEMA.names).append_column('kind', kinds),
+        removed.select(STATE_SCHEMA.names).set_column(4, 'count', pa.array(np.zeros(removed.num_rows, np.int32)))
+               .append_column('kind', pa.array(['removed'] * removed.num_rows, pa.string())),
+    ])
+    day = to_date(day)
+    events = events.add_column(0, 'date', pa.array([day] * events.num_rows, pa.date32()))
+    return events.cast(EVENT_SCHEMA).sort_by([(k, 'ascending') for k in KEY])
+
+
+def expand_state(state: pa.Table, day) -> pa.Table:
+    """按 count 展开状态表，得到与每日价格文件列一致的价格表（按 category_id, product_id 排序）"""
+    state = state.sort_by([('category_id', 'ascending'), ('product_id', 'ascending'), ('price', 'ascending')])
+    indices = np.repeat(np.arange(state.num_rows), state.column('count').to_numpy())
+    rows = state.take(pa.array(indices))
+    table = pa.table({
+        'product_id': rows.column('product_id'),
+        'category_id': rows.column('category_id'),
+        'name': rows.column('name'),
+        'price': rows.column('price'),
+        'change_date': pa.array(np.full(rows.num_rows, np.datetime64(to_date(day), 'D'))),
+    })
+    return table.cast(PRICE_FILE_SCHEMA)
+
+
+class ChangeLogStore:
+    """变更日志价格存储，按日期顺序追加，按需重建任意一天"""
+
+    META_FILE = 'meta.json'
+    SNAPSHOT_FILE = 'snapshot.parquet'
+
+    def __init__(self, root):
+        self.root = Path(root)
+        try:
+            self.meta = json.loads((self.root / self.META_FILE).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            self.meta = {}
+        # 最近一天的状态，连续追加时无需重建
+        self._last_state = None
+
+    @property
+    def base_date(self) -> date | None:
+        return to_date(self.meta['base_date']) if self.meta else None
+
+    @property
+    def last_date(self) -> date | None:
+        return to_date(self.meta['last_date']) if self.meta else None
+
+    def _event_path(self, day: date) -> Path:
+        return self.root / 'events' / f'{day:%Y-%m}.parquet'
+
+    def _save_meta(self):
+        write_text_atomic(self.root / self.META_FILE, json.dumps(self.meta))
+
+    def append(self, day, prices: pa.Table) -> int:
+        """
+        追加一天的完整价格表
+        :param day: 日期，必须晚于已存储的最后一天
+        :param prices: read_prices 读取的每日价格表
+        :return: 写入的事件数（首日返回快照行数）
+        """
+        day = to_date(day)
+        state = to_state(prices)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not self.meta:
+            _write_parquet(state, self.root / self.SNAPSHOT_FILE)
+            self.meta = {'base_date': day.isoformat(), 'last_date': day.isoformat()}
+            self._save_meta()
+            self._last_state = state
+            return state.num_rows
+
+        if day <= self.last_date:
+            raise ValueError(f"只能按日期顺序追加: {day} 不晚于已存储的 {self.last_date}")
+        previous = self._last_state if self._last_state is not None else self.state(self.last_date)
+        events = diff_states(previous, state, day)
+        path = self._event_path(day)
+        if path.exists():
+            events = pa.concat_tables([pq.read_table(path), events])
+        _write_parquet(events, path)
+        self.meta['last_date'] = day.isoformat()
+        self._save_meta()
+        self._last_state = state
+        return events.num_rows
+
+    def state(self, day) -> pa.Table:
+        """重建某一天的 (product_id, price) -> count 状态"""
+        day = to_date(day)
+        if not self.meta or not self.base_date <= day <= self.last_date:
+            raise KeyError(f"日期不在存储范围内: {day}")
+        base = pq.read_table(self.root / self.SNAPSHOT_FILE)
+        events = self._read_events(day)
+        if events is None or events.num_rows == 0:
+            return base
+
+        # 快照视为最早的事件，按键与日期排序后每个键取最后一条
+        base = base.add_column(0, 'date', pa.array([self.base_date] * base.num_rows, pa.date32()))
+        combined = pa.concat_tables([base, events.select(base.column_names)])
+        combined = combined.sort_by([(k, 'ascending') for k in KEY] + [('date', 'ascending')])
+        product_ids, prices = combined.column('product_id').to_numpy(), combined.column('price').to_numpy()
+        last = np.ones(combined.num_rows, dtype=bool)
+        last[:-1] = (product_ids[1:] != product_ids[:-1]) | (prices[1:] != prices[:-1])
+        latest = combined.filter(pa.array(last)).drop_columns(['date'])
+        return latest.filter(pc.greater(latest.column('count'), 0))
+
+    def snapshot(self, day) -> pa.Table:
+        """重建某一天的完整价格表，列与 daily_prices_YYYYMMDD.csv 一致"""
+        return expand_state(self.state(day), day)
+
+    def _read_events(self, day: date):
+        """读取截至 day（含）的全部事件，只打开所需月份的文件"""
+        paths = sorted(p for p in (self.root / 'events').glob('*.parquet') if p.stem <= f'{day:%Y-%m}')
+        if not paths:
+            return None
+        events = pa.concat_tables([pq.read_table(p) for p in paths])
+        return events.filter(pc.less_equal(events.column('date'), pa.scalar(day, pa.date32())))
+
+
+def convert_daily_csv(csv_paths, root) -> ChangeLogStore:
+    """将按日期排序的每日价格 CSV 依次追加到变更日志存储，已存储的日期跳过"""
+    store = ChangeLogStore(root)
+    for path in csv_paths:
+        day = datetime.strptime(PRICE_FILE_PATTERN.match(Path(path).name).group(1), '%Y%m%d').date()
+        if store.last_date is not None and day <= store.last_date:
+            continue
+        written = store.append(day, read_prices(path))
+        LOGGER.info("已追加 %s（%d 条）", day, written)
+    return store
+
+
+def _write_parquet(table: pa.Table, path: Path):
+    with atomic_path(path) as tmp:
+        pq.write_table(table, tmp, compression='zstd', use_dictionary=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='每日价格变更日志存储')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='将每日价格 CSV 追加到变更日志')
+    convert_parser.add_argument('source', help='存放 daily_prices_YYYYMMDD.csv 的目录')
+    convert_parser.add_argument('store', help='变更日志目录')
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='重建某一天的每日价格 CSV')
+    snapshot_parser.add_argument('store', help='变更日志目录')
+    snapshot_parser.add_argument('date', help='日期 YYYY-MM-DD')
+    snapshot_parser.add_argument('output', help='输出 CSV 路径')
+
+    args = parser.parse_args(argv)
+    if args.command == 'convert':
+        paths = find_price_files(args.source)
+        convert_daily_csv(paths, args.store)
+    else:
+        table = ChangeLogStore(args.store).snapshot(args.date)
+        pa_csv.write_csv(table.set_column(2, 'name', table.column('name').cast(pa.string())), args.output)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
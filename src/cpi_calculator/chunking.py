@@ -0,0 +1,152 @@
+"""
+长日期范围自适应分段读取 - 按估计行数切分子区间，在内存预算内并行读取，失败的分段单独重试
+
+    loader = AdaptiveRangeLoader(fetch, target_rows=2_000_000, memory_budget=1 << 30)
+    table = loader.load('2023-01-01', '2025-01-31')
+
+fetch(start, end) 读取闭区间 [start, end]（'YYYY-MM-DD'）的数据并返回 pyarrow.Table。
+不超过 min_split_days 天的范围直接读取；更长的范围先读取首日，得到每日行数与每行字节数的估计，
+之后每段天数按 target_rows 计算，并随已完成分段的实际行数修正。已提交和已完成但尚未按序交付的分段，
+估计内存合计不超过 memory_budget。分段失败时先按指数退避重试，仍失败且跨多天时拆成两半分别读取。
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+import pyarrow as pa
+
+from .readers import to_date
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TARGET_ROWS = 2_000_000
+DEFAULT_MEMORY_BUDGET = 1024 ** 3
+ONE_DAY = timedelta(days=1)
+
+
+class AdaptiveRangeLoader:
+    """按日期分段并行读取，结果按日期顺序交付"""
+
+    def __init__(self, fetch, target_rows=DEFAULT_TARGET_ROWS, memory_budget=DEFAULT_MEMORY_BUDGET,
+                 max_workers=4, min_split_days=7, max_chunk_days=92, max_retries=2, backoff=0.5):
+        """
+        :param fetch: 读取函数 (start, end) -> pyarrow.Table，日期为 'YYYY-MM-DD'，闭区间
+        :param target_rows: 每段的目标行数
+        :param memory_budget: 同时在途的分段估计字节数上限；至少保证一个分段在途
+        :param max_workers: 最大并行分段数
+        :param min_split_days: 不超过该天数的范围不分段
+        :param max_chunk_days: 单段最大天数（尚无估计时也按此切分）
+        :param max_retries: 单个分段失败后的最大重试次数
+        :param backoff: 重试等待基数（秒），按指数退避
+        """
+        self.fetch = fetch
+        self.target_rows = target_rows
+        self.memory_budget = memory_budget
+        self.max_workers = max_workers
+        self.min_split_days = min_split_days
+        self.max_chunk_days = max_chunk_days
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # 已读取数据的累计统计，用于估计后续分段的行数与内存
+        self._days = self._rows = self._bytes = 0
+
+    @property
+    def rows_per_day(self) -> float | None:
+        return self._rows / self._days if self._days else None
+
+    @property
+    def bytes_per_row(self) -> float:
+        return self._bytes / self._rows if self._rows else 0.0
+
+    def _observe(self, start: date, end: date, table: pa.Table):
+        self._days += (end - start).days + 1
+        self._rows += table.num_rows
+        self._bytes += table.nbytes
+
+    def _chunk_days(self) -> int:
+        if not self.rows_per_day:
+            return self.max_chunk_days
+        return int(min(max(self.target_rows // self.rows_per_day, 1), self.max_chunk_days))
+
+    def _estimate_bytes(self, days: int) -> float:
+        return days * (self.rows_per_day or 0) * self.bytes_per_row
+
+    def _fetch(self, start: date, end: date) -> pa.Table:
+        """读取一个分段：失败时指数退避重试，仍失败且跨多天时拆成两半"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.fetch(start.isoformat(), end.isoformat())
+            except Exception as e:
+                if attempt < self.max_retries:
+                    delay = self.backoff * 2 ** attempt
+                    LOGGER.warning("分段读取失败，%.1fs 后重试 | %s ~ %s | 错误: %s", delay, start, end, e)
+                    time.sleep(delay)
+                    continue
+                if start == end:
+                    LOGGER.error("分段读取失败 | %s | 已重试 %d 次", start, attempt)
+                    raise
+                middle = start + timedelta(days=(end - start).days // 2)
+                LOGGER.warning("分段 %s ~ %s 重试后仍失败，拆分为 %s ~ %s 与 %s ~ %s",
+                               start, end, start, middle, middle + ONE_DAY, end)
+                return pa.concat_tables([self._fetch(start, middle), self._fetch(middle + ONE_DAY, end)],
+                                        promote_options='permissive')
+
+    def iter_chunks(self, start_date, end_date):
+        """
+        按日期顺序逐段产出 (分段开始日期, 分段结束日期, pyarrow.Table)
+        调用方消费变慢时，已完成未交付的分段计入内存预算，不再提交新的分段
+        """
+        start, end = to_date(start_date), to_date(end_date)
+        if start > end:
+            raise ValueError(f"开始日期晚于结束日期: {start_date} > {end_date}")
+        if (end - start).days + 1 <= self.min_split_days:
+            yield start, end, self._fetch(start, end)
+            return
+        if self.rows_per_day is None:
+            # 读取首日作为探测，得到每日行数与每行字节数的估计
+            table = self._fetch(start, start)
+            self._observe(start, start, table)
+            yield start, start, table
+            start += ONE_DAY
+
+        cursor = start
+        pending = {}    # future -> (序号, 开始, 结束, 估计字节数)
+        finished = {}   # 序号 -> (开始, 结束, table)，等待按序交付
+        submitted = delivered = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while cursor <= end or pending or finished:
+                    while cursor <= end and len(pending) < self.max_workers:
+                        days = min(self._chunk_days(), (end - cursor).days + 1)
+                        estimate = self._estimate_bytes(days)
+                        in_flight = sum(p[3] for p in pending.values()) + sum(f[2].nbytes for f in finished.values())
+                        if (pending or finished) and in_flight + estimate > self.memory_budget:
+                            break
+                        chunk_end = cursor + timedelta(days=days - 1)
+                        pending[executor.submit(self._fetch, cursor, chunk_end)] = (submitted, cursor, chunk_end,
+                                                                                    estimate)
+                        submitted += 1
+                        cursor = chunk_end + ONE_DAY
+
+                    while delivered in finished:
+                        yield finished.pop(delivered)
+                        delivered += 1
+                    if not pending:
+                        continue
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, chunk_start, chunk_end, _ = pending.pop(future)
+                        table = future.result()
+                        self._observe(chunk_start, chunk_end, table)
+                        finished[index] = (chunk_start, chunk_end, table)
+            finally:
+                # 调用方提前退出或出错时取消尚未开始的分段
+                for future in pending:
+                    future.cancel()
+
+    def load(self, start_date, end_date) -> pa.Table:
+        """读取整个范围并按日期顺序合并"""
+        tables = [table for _, _, table in self.iter_chunks(start_date, end_date)]
+        return pa.concat_tables(tables, promote_options='permissive')
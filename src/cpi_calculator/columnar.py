@@ -0,0 +1,84 @@
+"""
+ClickHouse 列式结果读取 - 结果直接落入 NumPy/Arrow 缓冲区，不构造逐行 Python 对象
+"""
+import pyarrow as pa
+
+# 价格查询结果的显式类型映射
+# 价格保留 float64：数据中最高价约 26 万元，float32 只有约 7 位有效数字，无法精确到分
+PRICE_SCHEMA = pa.schema([
+    ('product_id', pa.int64()),
+    ('category_id', pa.int64()),
+    ('price', pa.float64()),
+    ('date', pa.date32()),
+])
+
+
+def cast_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """按显式类型映射转换列类型，schema 中未声明的列保持原样"""
+    for i, name in enumerate(table.column_names):
+        if name in schema.names:
+            field = schema.field(name)
+            table = table.set_column(i, field, table.column(i).cast(field.type))
+    return table
+
+
+def fetch_arrow(client, query: str, params=None, schema: pa.Schema = None, settings=None,
+                query_id=None) -> pa.Table:
+    """
+    以列式 + NumPy 模式执行 clickhouse_driver 查询，结果直接构造为 pyarrow.Table
+    :param client: clickhouse_driver.Client
+    :param schema: 显式类型映射，默认保留驱动返回的类型
+    :param settings: 额外的查询设置
+    :param query_id: 查询ID，可用于 KILL QUERY
+    """
+    kwargs = {'query_id': query_id} if query_id else {}
+    columns, column_types = client.execute(
+        query,
+        params,
+        with_column_types=True,
+        columnar=True,
+        settings={'use_numpy': True, **(settings or {})},
+        **kwargs
+    )
+    names = [name for name, _ in column_types]
+    if not columns:
+        columns = [[] for _ in names]
+    table = pa.table([pa.array(column) for column in columns], names=names)
+    return cast_table(table, schema) if schema is not None else table
+
+
+def iter_arrow_batches(client, query: str, params=None, schema: pa.Schema = None, settings=None,
+                       max_rows=None):
+    """
+    流式执行查询，服务端每返回一个数据块即产出 pyarrow.RecordBatch，块内各列直接构造为 Arrow 数组
+    :param client: clickhouse_driver.Client，须提供 query_arrow_stream
+    :param schema: 显式类型映射，默认保留驱动返回的类型
+    :param settings: 查询设置，如 {'max_block_size': 65536}
+    :param max_rows: 单个批次的最大行数，服务端数据块更大时拆分
+    """
+    with client.query_arrow_stream(query, params, settings=settings) as batches:
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            table = pa.Table.from_batches([batch])
+            if schema is not None:
+                table = cast_table(table, schema)
+            yield from table.to_batches(max_chunksize=max_rows)
+
+
+def insert_arrow(client, table_name: str, table: pa.Table, settings=None) -> None:
+    """
+    以原生列式块写入 pyarrow.Table，不构造逐行 Python 对象
+    :param client: clickhouse_connect 客户端（Arrow 格式写入）或 clickhouse_driver.Client（NumPy 列写入）
+    :param table_name: 目标表名，列按 table 的列名对应
+    """
+    if hasattr(client, 'insert_arrow'):
+        client.insert_arrow(table_name, table, settings=settings)
+        return
+    columns = ', '.join(table.column_names)
+    client.execute(
+        f'INSERT INTO {table_name} ({columns}) VALUES',
+        [column.to_numpy() for column in table.columns],
+        columnar=True,
+        settings={'use_numpy': True, **(settings or {})}
+    )
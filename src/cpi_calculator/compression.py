@@ -0,0 +1,86 @@
+"""
+压缩文件透明读写 - 按扩展名识别 .gz / .zst，流式压缩与解压，未压缩文件行为与内置 open 一致
+
+    with open_text('daily_prices_20250517.csv.zst', 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+pyarrow.csv.read_csv 读取路径时同样按扩展名自动解压，无需经过本模块。
+atomic_path / write_text_atomic 先写同目录下的临时文件再替换目标文件，读取方不会看到写了一半的文件。
+"""
+import io
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pyarrow as pa
+
+# 扩展名 -> pyarrow 压缩编码
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+
+
+def compression_of(path) -> str | None:
+    """根据扩展名返回压缩编码（gzip/zstd），未压缩返回 None"""
+    return COMPRESSION_SUFFIXES.get(Path(path).suffix.lower())
+
+
+def strip_compression_suffix(path) -> str:
+    """去掉压缩扩展名：'a.csv.zst' -> 'a.csv'"""
+    name = str(path)
+    return name[:-len(Path(name).suffix)] if compression_of(name) else name
+
+
+def is_csv(path) -> bool:
+    """是否为 CSV 文件（含压缩的 .csv.gz / .csv.zst）"""
+    return strip_compression_suffix(path).lower().endswith('.csv')
+
+
+def open_binary(path, mode='rb', compression='infer'):
+    """
+    以二进制方式打开文件，压缩文件边读边解压 / 边写边压缩
+    :param compression: 压缩编码（gzip/zstd/None），默认按扩展名判断；写入临时文件时传入目标文件的编码
+    """
+    if mode not in ('rb', 'wb'):
+        raise ValueError(f"不支持的模式: {mode}")
+    codec = compression_of(path) if compression == 'infer' else compression
+    if codec is None:
+        return open(path, mode)
+    if mode == 'rb':
+        return pa.input_stream(str(path), compression=codec)
+    return pa.output_stream(str(path), compression=codec)
+
+
+def open_text(path, mode='r', encoding='utf-8', errors='strict', newline=None, compression='infer'):
+    """以文本方式打开文件，参数与内置 open 一致，压缩文件流式处理；compression 同 open_binary"""
+    if mode not in ('r', 'w'):
+        raise ValueError(f"不支持的模式: {mode}")
+    codec = compression_of(path) if compression == 'infer' else compression
+    if codec is None:
+        return open(path, mode, encoding=encoding, errors=errors, newline=newline)
+    return io.TextIOWrapper(open_binary(path, mode + 'b', codec), encoding=encoding, errors=errors, newline=newline)
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    原子地写出文件：产出同目录下的临时路径供写入，正常退出后替换为 path，异常时删除临时文件
+    临时文件名以 . 开头（pyarrow 数据集发现时忽略），带进程与线程标识，并发写入同一文件互不覆盖；
+    临时文件不带目标文件的扩展名，按扩展名压缩时须显式传入 compression_of(path)
+
+        with atomic_path('part.parquet') as tmp:
+            pq.write_table(table, tmp)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}-{threading.get_ident()}.tmp')
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_text_atomic(path, text: str, encoding='utf-8'):
+    """原子地写出文本文件（如 JSON 索引、清单与检查点）"""
+    with atomic_path(path) as tmp:
+        tmp.write_text(text, encoding=encoding)
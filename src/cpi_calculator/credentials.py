@@ -0,0 +1,115 @@
+"""
+STS 临时凭证缓存 - 进程内按角色共享，过期前后台刷新
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from aliyun.sts import StsClient  # 阿里云STS SDK
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CachedCredentials:
+    """按需获取并缓存临时凭证，在过期前 refresh_margin 秒于后台线程刷新"""
+
+    def __init__(self, fetch, refresh_margin=300.0, default_ttl=3600.0, retry_interval=30.0):
+        """
+        :param fetch: 获取新凭证的无参函数
+        :param refresh_margin: 提前刷新的秒数
+        :param default_ttl: 凭证未携带过期时间时使用的有效期（秒）
+        :param retry_interval: 后台刷新失败后的重试间隔（秒）
+        """
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.retry_interval = retry_interval
+
+        self._credentials = None
+        self._expires_at = 0.0  # time.monotonic() 时间
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def get(self):
+        """返回当前有效凭证；首次调用或已过期时同步获取"""
+        with self._lock:
+            if self._credentials is None or time.monotonic() >= self._expires_at:
+                self._refresh_locked()
+            return self._credentials
+
+    def _refresh_locked(self):
+        self._install(self.fetch())
+
+    def _install(self, credentials):
+        """在锁内替换凭证并安排下一次后台刷新"""
+        self._credentials = credentials
+        self._expires_at = time.monotonic() + _seconds_until_expiry(credentials, self.default_ttl)
+        self._schedule(max(self._expires_at - time.monotonic() - self.refresh_margin, self.retry_interval))
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        # STS 请求在锁外进行，刷新期间 get() 仍可立即返回旧凭证
+        timer = threading.current_thread()
+        try:
+            credentials = self.fetch()
+        except Exception as e:
+            # 旧凭证仍可用时稍后重试，过期后由 get() 同步获取
+            LOGGER.warning("STS 凭证后台刷新失败，%.0fs 后重试: %s", self.retry_interval, e)
+            with self._lock:
+                if self._timer is timer:
+                    self._schedule(self.retry_interval)
+            return
+        with self._lock:
+            # 刷新期间已关闭或已由 get() 同步刷新时丢弃本次结果
+            if self._timer is timer:
+                self._install(credentials)
+                LOGGER.debug("STS 凭证已在后台刷新")
+
+    def close(self):
+        """停止后台刷新"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+def _seconds_until_expiry(credentials, default_ttl) -> float:
+    """解析凭证的过期时间（datetime 或 ISO8601 字符串），返回剩余秒数"""
+    expiration = getattr(credentials, 'expiration', None)
+    if expiration is None:
+        return default_ttl
+    if isinstance(expiration, str):
+        expiration = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return (expiration - datetime.now(timezone.utc)).total_seconds()
+
+
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_sts_credentials(role_arn: str, session_name: str = 'cpi-loader-session') -> CachedCredentials:
+    """获取进程内共享的角色凭证缓存，同一角色的多个加载器复用同一份凭证"""
+    key = (role_arn, session_name)
+    with _CACHE_LOCK:
+        cache = _CACHE.get(key)
+        if cache is None:
+            cache = _CACHE[key] = CachedCredentials(lambda: StsClient().assume_role(role_arn, session_name))
+        return cache
+
+
+def clear_credentials_cache():
+    """停止全部后台刷新并清空缓存"""
+    with _CACHE_LOCK:
+        caches = list(_CACHE.values())
+        _CACHE.clear()
+    for cache in caches:
+        cache.close()
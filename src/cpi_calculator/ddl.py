@@ -0,0 +1,121 @@
+"""
+ClickHouse 建表语句生成 - 由 schemas.py 的 SQLAlchemy 模型生成 MergeTree 物理布局
+
+price 表按月分区、按 (category_id, product_id, date) 排序：
+日期范围查询只读取涉及月份的分区，按分类过滤时主键索引只命中相关 granule。
+
+用法：
+    python -m cpi_calculator.ddl              # 输出全部建表语句
+    python -m cpi_calculator.ddl --database cpi
+"""
+import argparse
+import re
+
+from sqlalchemy import DECIMAL, Date, Integer, String
+
+from .schemas import Category, Price
+
+# 物理布局：排序键、分区键、列类型/编码覆盖与跳数索引
+LAYOUTS = {
+    'price': {
+        'order_by': ('category_id', 'product_id', 'date'),
+        'partition_by': 'toYYYYMM(date)',
+        'codecs': {
+            # 同一商品的日期连续递增、价格变化稀疏，Delta/Gorilla 后再 ZSTD 压缩效果最好
+            'date': 'DoubleDelta, ZSTD(1)',
+            'category_id': 'Delta, ZSTD(1)',
+            'product_id': 'Delta, ZSTD(1)',
+            'price': 'Gorilla, ZSTD(1)',
+            'name': 'ZSTD(1)',
+        },
+        'low_cardinality': ('name',),
+        # product_id 不是排序键前缀，单独按商品查询时由 bloom filter 跳过无关 granule
+        'indexes': (('idx_product_id', 'product_id', 'bloom_filter(0.01)', 4),),
+    },
+    'category': {
+        'order_by': ('id',),
+        # 模型的外键列为 parent_id，ClickHouse 表沿用 parent（CPICalculator.category_tree 读取 id, parent, weight）
+        'rename': {'parent_id': 'parent'},
+        'types': {'hierarchy': 'UInt8'},
+        'low_cardinality': ('name',),
+    },
+}
+
+
+def _column_type(column) -> str:
+    # 商品ID超过 Int32 范围；金额与权重参与和浮点数的乘法，使用 Float64 避免 Decimal 与浮点混算报错
+    if isinstance(column.type, Integer):
+        return 'UInt64'
+    if isinstance(column.type, Date):
+        return 'Date'
+    if isinstance(column.type, DECIMAL):
+        return 'Float64'
+    if isinstance(column.type, String):
+        return 'String'
+    raise TypeError(f"不支持的列类型: {column.name} {column.type!r}")
+
+
+def _rename(expression: str, rename: dict) -> str:
+    for old, new in rename.items():
+        expression = re.sub(rf'\b{re.escape(old)}\b', new, expression)
+    return expression
+
+
+def table_ddl(model, table_name=None, rename=None, database=None, engine='MergeTree') -> str:
+    """
+    生成单张表的 CREATE TABLE 语句
+    :param model: schemas.py 中的模型类
+    :param table_name: 表名，默认使用模型的 __tablename__
+    :param rename: 列名映射（如 {'date': 'change_date'}），同时作用于分区键、排序键与索引；在布局默认的映射之上生效
+    :param database: 数据库名
+    :param engine: 表引擎，默认 MergeTree
+    """
+    table = model.__table__
+    layout = LAYOUTS.get(table.name, {})
+    rename = {**layout.get('rename', {}), **(rename or {})}
+    types = layout.get('types', {})
+    codecs = layout.get('codecs', {})
+    low_cardinality = layout.get('low_cardinality', ())
+    order_by = layout.get('order_by') or tuple(c.name for c in table.primary_key.columns)
+
+    lines = []
+    for column in table.columns:
+        column_type = types.get(column.name) or _column_type(column)
+        # 排序键列不能为 Nullable
+        if column.nullable and column.name not in order_by:
+            column_type = f'Nullable({column_type})'
+        if column.name in low_cardinality:
+            column_type = f'LowCardinality({column_type})'
+        line = f'{rename.get(column.name, column.name)} {column_type}'
+        if column.name in codecs:
+            line += f' CODEC({codecs[column.name]})'
+        if column.comment:
+            line += " COMMENT '{}'".format(column.comment.replace("'", "\\'"))
+        lines.append(line)
+    for name, expression, index_type, granularity in layout.get('indexes', ()):
+        lines.append(f'INDEX {name} {_rename(expression, rename)} TYPE {index_type} GRANULARITY {granularity}')
+
+    name = table_name or table.name
+    qualified = f'{database}.{name}' if database else name
+    ddl = [f'CREATE TABLE IF NOT EXISTS {qualified}', '(', ',\n'.join(f'    {line}' for line in lines), ')',
+           f'ENGINE = {engine}']
+    if layout.get('partition_by'):
+        ddl.append(f"PARTITION BY {_rename(layout['partition_by'], rename)}")
+    ddl.append(f"ORDER BY ({', '.join(rename.get(c, c) for c in order_by)})")
+    return '\n'.join(ddl)
+
+
+def schema_ddl(database=None) -> list:
+    """生成 category 与 price 的建表语句"""
+    return [table_ddl(model, database=database) for model in (Category, Price)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='由 schemas.py 生成 ClickHouse 建表语句')
+    parser.add_argument('--database', help='数据库名')
+    args = parser.parse_args(argv)
+    print(';\n\n'.join(schema_ddl(args.database)) + ';')
+
+
+if __name__ == '__main__':
+    main()
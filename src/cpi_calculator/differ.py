@@ -0,0 +1,187 @@
+"""
+每日价格快照比较 - 按 product_id 排序归并两天的价格文件，输出变更事件并增量维护 products.csv
+
+事件类型：
+    price_change  两天都出现且价格不同
+    added         仅出现在新的一天
+    removed       仅出现在旧的一天
+
+同一商品在一天内可能出现多次（按权重有放回抽样），少数商品同一天有两个价格，
+以文件中最后出现的价格作为当天价格。products.csv 的 price 为最近一次观测到的价格，
+change_count 为观测到的调价次数；同一组事件重复应用不会重复计数。
+
+用法：
+    python -m cpi_calculator.differ daily_prices_20250517.csv daily_prices_20250518.csv
+    python -m cpi_calculator.differ old.csv new.csv --products products.csv --events events.csv
+"""
+import argparse
+import csv
+import logging
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .compression import atomic_path, compression_of, open_text
+from .readers import PRODUCT_FILE_SCHEMA, read_prices, read_products
+
+LOGGER = logging.getLogger(__name__)
+
+PRICE_CHANGE, ADDED, REMOVED = 'price_change', 'added', 'removed'
+EVENT_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('product_id', pa.int64()),
+    ('category_id', pa.int64()),
+    ('name', pa.string()),
+    ('kind', pa.string()),
+    ('old_price', pa.float64()),
+    ('new_price', pa.float64()),
+])
+DIFF_COLUMNS = ['product_id', 'category_id', 'name', 'price', 'change_date']
+
+
+def latest_prices(prices: pa.Table) -> pa.Table:
+    """每个商品保留当天最后出现的一行，结果按 product_id 升序"""
+    ids = prices.column('product_id').to_numpy()
+    # 稳定排序保持同一商品的文件顺序，每段取最后一行
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    last = np.ones(len(ids), dtype=bool)
+    last[:-1] = sorted_ids[1:] != sorted_ids[:-1]
+    rows = prices.take(pa.array(order[last]))
+    return rows.set_column(rows.schema.get_field_index('name'), 'name', rows.column('name').cast(pa.string()))
+
+
+def _match(sorted_ids: np.ndarray, ids: np.ndarray):
+    """在升序数组 sorted_ids 中查找 ids，返回 (位置, 是否命中)"""
+    pos = np.searchsorted(sorted_ids, ids)
+    if len(sorted_ids) == 0:
+        return pos, np.zeros(len(ids), dtype=bool)
+    clipped = np.minimum(pos, len(sorted_ids) - 1)
+    return clipped, sorted_ids[clipped] == ids
+
+
+def _events(rows: pa.Table, kind: str, old_price, new_price, day) -> pa.Table:
+    n = rows.num_rows
+    return pa.table({
+        'date': pa.array([day] * n, pa.date32()),
+        'product_id': rows.column('product_id'),
+        'category_id': rows.column('category_id'),
+        'name': rows.column('name'),
+        'kind': pa.array([kind] * n, pa.string()),
+        'old_price': pa.array(old_price, pa.float64()),
+        'new_price': pa.array(new_price, pa.float64()),
+    }, schema=EVENT_SCHEMA)
+
+
+def diff_prices(old: pa.Table, new: pa.Table, day=None) -> pa.Table:
+    """
+    比较两天的价格表
+    :param old: 前一天的价格表（read_prices 的结果）
+    :param new: 后一天的价格表
+    :param day: 事件日期，默认取新价格表的 change_date
+    :return: EVENT_SCHEMA 事件表，按 product_id 排序
+    """
+    old, new = latest_prices(old), latest_prices(new)
+    if day is None and new.num_rows:
+        day = new.column('change_date')[0].as_py()
+    old_ids, new_ids = old.column('product_id').to_numpy(), new.column('product_id').to_numpy()
+    old_prices, new_prices = old.column('price').to_numpy(), new.column('price').to_numpy()
+
+    pos, matched = _match(old_ids, new_ids)
+    changed = matched & (old_prices[pos] != new_prices) if len(old_ids) else matched
+    _, kept = _match(new_ids, old_ids)
+    changed_pos = pos[changed]
+
+    events = pa.concat_tables([
+        _events(new.filter(pa.array(changed)), PRICE_CHANGE, old_prices[changed_pos], new_prices[changed], day),
+        _events(new.filter(pa.array(~matched)), ADDED, [None] * int((~matched).sum()), new_prices[~matched], day),
+        _events(old.filter(pa.array(~kept)), REMOVED, old_prices[~kept], [None] * int((~kept).sum()), day),
+    ])
+    return events.sort_by('product_id')
+
+
+def apply_events(products: pa.Table, events: pa.Table) -> tuple:
+    """
+    将事件中的新价格写入商品表
+    :param products: read_products 读取的商品表
+    :param events: diff_prices 的结果；removed 事件不影响商品表
+    :return: (更新后的商品表, 调价的商品数)；商品表中不存在的商品追加在末尾，权重为空
+    """
+    observed = events.filter(pc.is_valid(events.column('new_price')))
+    ids, prices = observed.column('product_id').to_numpy(), observed.column('new_price').to_numpy()
+
+    product_ids = products.column('product_id').to_numpy()
+    order = np.argsort(product_ids, kind='stable')
+    pos, matched = _match(product_ids[order], ids)
+    rows = order[pos[matched]]
+
+    price = products.column('price').to_numpy(zero_copy_only=False).copy()
+    change_count = products.column('change_count').to_numpy(zero_copy_only=False).copy()
+    # 价格为空表示尚未观测过，首次写入不计为调价
+    differs = price[rows] != prices[matched]
+    counted = differs & ~np.isnan(price[rows])
+    price[rows] = prices[matched]
+    np.add.at(change_count, rows[counted], 1)
+
+    updated = products.set_column(products.schema.get_field_index('price'), 'price', pa.array(price))
+    updated = updated.set_column(updated.schema.get_field_index('change_count'), 'change_count',
+                                 pa.array(change_count, pa.int32()))
+    new_rows = observed.filter(pa.array(~matched))
+    if new_rows.num_rows:
+        updated = pa.concat_tables([updated, pa.table({
+            'product_id': new_rows.column('product_id'),
+            'category_id': new_rows.column('category_id'),
+            'name': new_rows.column('name'),
+            'weight': pa.nulls(new_rows.num_rows, pa.float64()),
+            'price': new_rows.column('new_price'),
+            'change_count': pa.array(np.zeros(new_rows.num_rows, np.int32)),
+        }, schema=PRODUCT_FILE_SCHEMA)])
+    return updated, int(counted.sum())
+
+
+def diff_files(old_path, new_path) -> pa.Table:
+    """比较两个每日价格文件"""
+    return diff_prices(read_prices(old_path, columns=DIFF_COLUMNS), read_prices(new_path, columns=DIFF_COLUMNS))
+
+
+def write_csv(table: pa.Table, path):
+    """原子地写出 CSV，格式与现有数据文件一致（不加引号、浮点数保留 .0、空值为空串）"""
+    # 临时文件名不带 .gz / .zst 扩展名，压缩编码取自目标路径
+    with atomic_path(path) as tmp, open_text(tmp, 'w', newline='', compression=compression_of(path)) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(table.column_names)
+        writer.writerows(zip(*(column.to_pylist() for column in table.columns)))
+
+
+def update_products_file(products_path, events: pa.Table) -> int:
+    """将事件应用到 products.csv 并写回，返回调价的商品数"""
+    products, changed = apply_events(read_products(products_path), events)
+    write_csv(products, products_path)
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='比较两天的每日价格文件')
+    parser.add_argument('old', help='前一天的 daily_prices_YYYYMMDD.csv')
+    parser.add_argument('new', help='后一天的 daily_prices_YYYYMMDD.csv')
+    parser.add_argument('--products', help='要更新的 products.csv')
+    parser.add_argument('--events', help='事件输出 CSV 路径')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    events = diff_files(args.old, args.new)
+    kinds = pc.value_counts(events.column('kind')).to_pylist()
+    LOGGER.info("比较完成（%.3fs）: %s", time.perf_counter() - started,
+                ', '.join(f"{k['values']}={k['counts']}" for k in kinds) or '无变化')
+    if args.events:
+        write_csv(events, args.events)
+    if args.products:
+        changed = update_products_file(args.products, events)
+        LOGGER.info("已更新 %s：%d 个商品调价", args.products, changed)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,119 @@
+"""
+OSS 对象并发下载 - 有界并发、失败重试与背压
+
+不存在的对象（如节假日没有当天的价格文件）由 is_missing 判断，不重试，按“无数据”跳过。
+"""
+import hashlib
+import io
+import logging
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from types import SimpleNamespace
+
+LOGGER = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def is_missing_object(exc: Exception) -> bool:
+    """对象不存在的错误：OSS 的 NoSuchKey / HTTP 404，或本地存储的 FileNotFoundError"""
+    if isinstance(exc, FileNotFoundError):
+        return True
+    return type(exc).__name__ == 'NoSuchKey' or getattr(exc, 'status', None) == 404
+
+
+class ConcurrentFetcher:
+    """并发下载并解析多个对象，按完成顺序交给调用方"""
+
+    def __init__(self, get_object, parse=None, max_workers=8, max_pending=None,
+                 max_retries=3, backoff=0.5, is_missing=None):
+        """
+        :param get_object: 下载函数，接收对象键返回 bytes
+        :param parse: 解析函数，接收 (key, bytes) 返回解析结果，默认直接返回 bytes
+        :param max_workers: 最大并发下载数
+        :param max_pending: 已提交但未被消费的最大任务数（背压），默认 2 倍并发数
+        :param max_retries: 单个对象失败后的最大重试次数
+        :param backoff: 重试等待基数（秒），按指数退避
+        :param is_missing: 判断异常是否表示对象不存在的函数，命中时不重试并跳过该对象；默认不跳过
+        """
+        self.get_object = get_object
+        self.parse = parse or (lambda key, data: data)
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 2
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.is_missing = is_missing
+
+    def _fetch_one(self, key):
+        """下载并解析单个对象，失败时指数退避重试"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.parse(key, self.get_object(key))
+            except Exception as e:
+                if self.is_missing is not None and self.is_missing(e):
+                    LOGGER.info("对象不存在，按无数据跳过 | key: %s", key)
+                    return _MISSING
+                if attempt == self.max_retries:
+                    LOGGER.error("对象下载失败 | key: %s | 已重试 %d 次", key, attempt)
+                    raise
+                delay = self.backoff * 2 ** attempt
+                LOGGER.warning("对象下载失败，%.1fs 后重试 | key: %s | 错误: %s", delay, key, e)
+                time.sleep(delay)
+
+    def iter_fetch(self, keys):
+        """
+        按完成顺序逐个产出 (key, result)，不存在的对象不产出
+        调用方消费变慢时停止提交新任务，内存中最多保留 max_pending 个结果
+        """
+        keys = iter(keys)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            try:
+                for key in keys:
+                    pending[executor.submit(self._fetch_one, key)] = key
+                    if len(pending) >= self.max_pending:
+                        break
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = pending.pop(future)
+                        result = future.result()
+                        if result is not _MISSING:
+                            yield key, result
+                        next_key = next(keys, None)
+                        if next_key is not None:
+                            pending[executor.submit(self._fetch_one, next_key)] = next_key
+            finally:
+                # 调用方提前退出或出错时取消尚未开始的任务
+                for future in pending:
+                    future.cancel()
+
+    def fetch_all(self, keys) -> dict:
+        """并发下载全部对象，返回 {key: result}"""
+        return dict(self.iter_fetch(keys))
+
+
+class LocalObjectStore:
+    """以本地目录模拟 OSS 存储，用于开发环境与测试"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def get_object(self, key):
+        """与 OSS 客户端一致，返回可 read() 的对象"""
+        return io.BytesIO((self.root / key).read_bytes())
+
+    def head_object(self, key):
+        """与 OSS 一致，返回对象的 etag（内容 MD5）与 last_modified"""
+        path = self.root / key
+        return SimpleNamespace(
+            etag=hashlib.md5(path.read_bytes()).hexdigest().upper(),
+            last_modified=int(path.stat().st_mtime)
+        )
+
+    def put_object_from_file(self, key, filename) -> None:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(filename, target)
@@ -0,0 +1,303 @@
+"""
+价格数据批量导入 ClickHouse - 列式解析、大块原生写入、多文件有界并行
+
+    daily_prices_YYYYMMDD.csv -> daily_price
+    products.csv              -> products
+
+导入清单（默认 <source>/.ingest_manifest.json）记录每个已导入文件的大小、修改时间、sha256、行数与日期，
+以及每张表的日期水位线。每日价格文件按日期记录，sha256 按解压后的内容计算，同一天的文件改为压缩存放不会重新导入。
+再次运行时大小与修改时间未变的文件直接跳过，内容未变的文件只更新清单，
+内容变化的每日文件先删除该日已有数据再写入，避免同一天被重复导入。
+
+用法：
+    python -m cpi_calculator.ingest . --host localhost --create-tables
+    python -m cpi_calculator.ingest . --embedded ./chdb_data --create-tables   # 嵌入式 ClickHouse（chdb）
+"""
+import argparse
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .columnar import insert_arrow
+from .compression import open_binary, write_text_atomic
+from .ddl import table_ddl
+from .pool import get_clickhouse_pool
+from .readers import find_price_files, price_file_date, read_categories, read_prices, read_products
+from .schemas import Price
+from .validation import check_prices
+
+LOGGER = logging.getLogger(__name__)
+
+PRICE_TABLE = 'daily_price'
+PRODUCT_TABLE = 'products'
+PRODUCT_FILE = 'products.csv'
+MANIFEST_FILE = '.ingest_manifest.json'
+# 单次 INSERT 的最大行数，ClickHouse 偏好少量大块写入
+DEFAULT_BATCH_ROWS = 1_000_000
+
+TABLE_DDL = {
+    # 与 price 模型布局一致，日期列沿用 CSV 中的 change_date
+    PRICE_TABLE: table_ddl(Price, PRICE_TABLE, rename={'date': 'change_date'}),
+    PRODUCT_TABLE: f"""
+        CREATE TABLE IF NOT EXISTS {PRODUCT_TABLE} (
+            product_id UInt64,
+            category_id UInt64,
+            name String,
+            weight Float64,
+            price Float64,
+            change_count UInt32
+        ) ENGINE = MergeTree
+        ORDER BY (category_id, product_id)
+    """,
+}
+
+
+class ClickHouseSink:
+    """通过共享连接池写入 ClickHouse 服务器"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, query: str):
+        return self.pool.execute(query)
+
+    def insert(self, table_name: str, table: pa.Table) -> None:
+        with self.pool.connection() as client:
+            insert_arrow(client, table_name, table)
+
+
+class EmbeddedSink:
+    """写入进程内嵌入式 ClickHouse（chdb），用于本地开发与无服务器环境"""
+
+    def __init__(self, path):
+        try:
+            from chdb import session
+        except ImportError as e:
+            raise ImportError("嵌入式模式需要安装 chdb：pip install chdb") from e
+        self.session = session.Session(str(path))
+        # chdb 会话不支持并发查询，解析仍可并行，写入串行
+        self._lock = threading.Lock()
+
+    def execute(self, query: str):
+        with self._lock:
+            return self.session.query(query)
+
+    def insert(self, table_name: str, table: pa.Table) -> None:
+        columns = ', '.join(table.column_names)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'batch.parquet'
+            pq.write_table(table, path, compression='none')
+            self.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM file('{path}', Parquet)")
+
+
+class IngestManifest:
+    """已导入文件清单与各表日期水位线，每个文件导入完成后立即原子落盘；每日价格文件以日期为键，其他文件以文件名为键"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            data = {}
+        # 旧版清单以文件名为键，读取时转换为日期键
+        self.files = {_manifest_key(Path(name)): entry for name, entry in data.get('files', {}).items()}
+        self.watermarks = data.get('watermarks', {})
+        self._lock = threading.Lock()
+
+    def save(self):
+        with self._lock:
+            content = json.dumps({'files': self.files, 'watermarks': self.watermarks},
+                                 ensure_ascii=False, indent=1, sort_keys=True)
+            write_text_atomic(self.path, content)
+
+    def is_unchanged(self, path: Path) -> bool:
+        """判断文件是否已导入且未变化：先比较文件名、大小与修改时间，不一致时再比较解压后内容的 sha256"""
+        entry = self.files.get(_manifest_key(path))
+        if entry is None or entry['status'] != 'done':
+            return False
+        stat = path.stat()
+        if (entry.get('file', path.name) == path.name and entry['size'] == stat.st_size
+                and entry['mtime_ns'] == stat.st_mtime_ns):
+            return True
+        if entry['sha256'] != _file_checksum(path):
+            return False
+        # 仅修改时间或压缩格式变化（如重新拷贝、改为 .csv.zst），更新指纹避免下次重复计算校验和
+        with self._lock:
+            entry.update(file=path.name, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return True
+
+    def needs_replace(self, path: Path) -> bool:
+        """文件（或同一天的其他编码）曾经（部分）导入过，写入前需先删除旧数据"""
+        return _manifest_key(path) in self.files
+
+    def mark(self, table_name, path: Path, status, rows=None, day=None):
+        stat = path.stat()
+        with self._lock:
+            self.files[_manifest_key(path)] = {
+                'file': path.name,
+                'table': table_name,
+                'status': status,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': _file_checksum(path) if status == 'done' else None,
+                'rows': rows,
+                'date': day,
+            }
+            if status == 'done' and day is not None and day > self.watermarks.get(table_name, ''):
+                self.watermarks[table_name] = day
+        self.save()
+
+
+def _manifest_key(path: Path) -> str:
+    """清单键：每日价格文件为日期（YYYY-MM-DD），其他文件为文件名"""
+    return _file_date(path) or path.name
+
+
+def _file_checksum(path) -> str:
+    """解压后内容的 sha256，同一内容的 .csv 与 .csv.gz / .csv.zst 校验和相同"""
+    digest = hashlib.sha256()
+    with open_binary(path) as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_date(path: Path) -> str | None:
+    """每日价格文件名中的日期（YYYY-MM-DD），其他文件返回 None"""
+    day = price_file_date(path)
+    return day.isoformat() if day else None
+
+
+def create_tables(sink) -> None:
+    """创建 daily_price 与 products 表（已存在时跳过）"""
+    for ddl in TABLE_DDL.values():
+        sink.execute(ddl)
+
+
+def find_source_files(source_dir) -> list:
+    """返回目录下待导入的 (表名, 文件路径) 列表，每日价格文件按日期排序，同一天有多种编码时报错"""
+    source_dir = Path(source_dir)
+    files = [(PRICE_TABLE, p) for p in find_price_files(source_dir)]
+    if (source_dir / PRODUCT_FILE).exists():
+        files.append((PRODUCT_TABLE, source_dir / PRODUCT_FILE))
+    return files
+
+
+def _delete_existing(sink, table_name, day):
+    """删除文件此前导入的数据：每日价格按日期删除，商品表整体替换"""
+    if table_name == PRICE_TABLE:
+        sink.execute(f"ALTER TABLE {PRICE_TABLE} DELETE WHERE change_date = toDate('{day}') "
+                     f"SETTINGS mutations_sync = 1")
+    else:
+        sink.execute(f"TRUNCATE TABLE {table_name}")
+
+
+def _ingest_file(sink, table_name, path, batch_rows, manifest=None, categories=None, allow=()) -> int:
+    reader = read_products if table_name == PRODUCT_TABLE else read_prices
+    table = reader(path)
+    if categories is not None and table_name == PRICE_TABLE:
+        # 校验在写入前完成，未通过的文件不会部分写入
+        report = check_prices(table, categories, allow)
+        if report['violations']:
+            LOGGER.warning("%s 存在允许的违规: %s", path.name,
+                           {name: v['count'] for name, v in report['violations'].items()})
+
+    day = _file_date(path)
+    if manifest is not None:
+        if manifest.needs_replace(path):
+            LOGGER.info("文件已变化或上次导入未完成，替换已有数据: %s", path.name)
+            _delete_existing(sink, table_name, day)
+        elif day is not None and day <= manifest.watermarks.get(table_name, ''):
+            LOGGER.info("补录水位线之前的日期: %s", path.name)
+        manifest.mark(table_name, path, 'pending', day=day)
+
+    for offset in range(0, table.num_rows, batch_rows):
+        sink.insert(table_name, table.slice(offset, batch_rows))
+    LOGGER.debug("已导入 %s -> %s（%d 行）", path, table_name, table.num_rows)
+
+    if manifest is not None:
+        manifest.mark(table_name, path, 'done', rows=table.num_rows, day=day)
+    return table.num_rows
+
+
+def ingest_files(sink, files, max_workers=4, batch_rows=DEFAULT_BATCH_ROWS, manifest=None,
+                 categories=None, allow=()) -> dict:
+    """
+    并行导入多个文件，每个文件整体列式解析后按 batch_rows 分块写入
+    :param sink: ClickHouseSink/EmbeddedSink
+    :param files: (表名, 文件路径) 列表
+    :param max_workers: 同时处理的文件数
+    :param manifest: IngestManifest，提供时跳过已导入且未变化的文件，并在导入后更新清单与水位线
+    :param categories: 分类数据，提供时每日价格文件在写入前校验，未通过时抛出 ValidationError
+    :param allow: 校验中允许存在的检查项
+    :return: 导入统计 {'files', 'skipped', 'rows', 'seconds', 'rows_per_sec', 'watermarks'}
+    """
+    started = time.perf_counter()
+    pending = [(t, p) for t, p in files if manifest is None or not manifest.is_unchanged(p)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = sum(executor.map(lambda item: _ingest_file(
+            sink, item[0], item[1], batch_rows, manifest, categories, allow), pending))
+    if manifest is not None:
+        manifest.save()
+    seconds = time.perf_counter() - started
+    report = {
+        'files': len(pending),
+        'skipped': len(files) - len(pending),
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else 0.0,
+        'watermarks': dict(manifest.watermarks) if manifest is not None else {},
+    }
+    LOGGER.info("导入完成 | 文件: %d（跳过 %d）| 行数: %d | 耗时: %.2fs | %.0f 行/秒 | 水位线: %s",
+                report['files'], report['skipped'], report['rows'], report['seconds'],
+                report['rows_per_sec'], report['watermarks'])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='将每日价格与商品 CSV 批量导入 ClickHouse')
+    parser.add_argument('source', help='存放 daily_prices_YYYYMMDD.csv 与 products.csv 的目录')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--user', default='default')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='default')
+    parser.add_argument('--embedded', metavar='PATH', help='使用嵌入式 ClickHouse（chdb）数据目录代替服务器')
+    parser.add_argument('--workers', type=int, default=4, help='并行导入的文件数')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS, help='单次 INSERT 的最大行数')
+    parser.add_argument('--create-tables', action='store_true', help='导入前创建目标表')
+    parser.add_argument('--manifest', help=f'导入清单路径，默认 <source>/{MANIFEST_FILE}')
+    parser.add_argument('--no-manifest', action='store_true', help='不使用清单，导入全部文件')
+    parser.add_argument('--validate', metavar='CATEGORIES_CSV', help='写入前按分类文件校验每日价格数据')
+    parser.add_argument('--allow', action='append', default=[], help='校验中允许的检查项，如 duplicate_key')
+
+    args = parser.parse_args(argv)
+    if args.embedded:
+        sink = EmbeddedSink(args.embedded)
+    else:
+        conf = {'host': args.host, 'port': args.port, 'user': args.user,
+                'password': args.password, 'database': args.database}
+        sink = ClickHouseSink(get_clickhouse_pool(conf, min_size=0, max_size=args.workers))
+    if args.create_tables:
+        create_tables(sink)
+    manifest = None if args.no_manifest else IngestManifest(args.manifest or Path(args.source) / MANIFEST_FILE)
+    categories = None
+    if args.validate:
+        categories = read_categories(args.validate)
+    report = ingest_files(sink, find_source_files(args.source), args.workers, args.batch_rows, manifest,
+                          categories, args.allow)
+    print(f"{report['files']} 个文件（跳过 {report['skipped']}），{report['rows']} 行，"
+          f"{report['seconds']:.2f}s，{report['rows_per_sec']:.0f} 行/秒")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
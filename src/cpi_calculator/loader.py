@@ -1,76 +1,324 @@
-from clickhouse_driver import Client
 from aliyun.oss import OssClient
-from aliyun.sts import StsClient  # 阿里云STS SDK
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import pandas as pd
 import ssl
 
+from .cache import DEFAULT_CACHE_DIR, ObjectCache
+from .chunking import DEFAULT_MEMORY_BUDGET, DEFAULT_TARGET_ROWS, AdaptiveRangeLoader
+from .columnar import PRICE_SCHEMA, fetch_arrow, iter_arrow_batches
+from .compression import compression_of
+from .credentials import get_sts_credentials
+from .fetcher import ConcurrentFetcher, is_missing_object
+from .parquet_store import iter_price_dataset_batches, read_daily_csv, read_price_dataset
+from .pool import get_clickhouse_pool
+from .readers import PRICE_FILE_PATTERN, find_price_files, read_categories, read_prices, to_date, to_pandas
+
+DEFAULT_BATCH_ROWS = 65536
+
+
 class SecureOSSDataLoader:
     def __init__(self, oss_conf: dict, ch_conf: dict):
         """
         :param oss_conf: {
             'endpoint': 'oss-cn-hangzhou-internal.aliyuncs.com',
             'bucket': 'your-bucket',
-            'sts_role_arn': 'acs:ram::123456:role/cpi-reader'
+            'sts_role_arn': 'acs:ram::123456:role/cpi-reader',
+            # 可选：长日期范围分段读取
+            'chunk_target_rows': 2000000,     # 每段目标行数
+            'memory_budget': 1073741824,      # 同时在途分段的内存上限（字节）
+            'chunk_workers': 4                # 并行分段数
         }
         :param ch_conf: ClickHouse连接配置
         """
-        # 1. 获取临时安全凭证
-        sts_client = StsClient()
-        credentials = sts_client.assume_role(
-            oss_conf['sts_role_arn'],
-            'cpi-loader-session'
+        self.oss_conf = oss_conf
+        # 凭证、OSS 客户端与 ClickHouse 连接均在首次使用时创建
+        self._oss_client = None
+        self._oss_credentials = None
+
+        # 获取进程内共享的ClickHouse连接池（与计算器共用，首次查询时才建立连接）
+        self.ch_pool = get_clickhouse_pool(ch_conf, min_size=3, max_size=10)
+
+        # 多对象并发下载器
+        self.fetcher = ConcurrentFetcher(
+            self._get_object_bytes,
+            parse=_parse_price_object,
+            max_workers=oss_conf.get('max_concurrency', 8),
+            max_retries=oss_conf.get('max_retries', 3),
+            is_missing=is_missing_object
         )
 
-        # 2. 初始化OSS客户端（带SSL加密）
-        self.oss_client = OssClient(
-            endpoint=oss_conf['endpoint'],
-            bucket_name=oss_conf['bucket'],
-            access_key_id=credentials.access_key_id,
-            access_key_secret=credentials.access_key_secret,
-            security_token=credentials.security_token,
-            ssl_verify=ssl.CERT_REQUIRED
+        # 长日期范围按估计行数分段，在内存预算内并行查询
+        self.range_loader = AdaptiveRangeLoader(
+            self._query_price_table,
+            target_rows=oss_conf.get('chunk_target_rows', DEFAULT_TARGET_ROWS),
+            memory_budget=oss_conf.get('memory_budget', DEFAULT_MEMORY_BUDGET),
+            max_workers=oss_conf.get('chunk_workers', 4),
+            max_retries=oss_conf.get('max_retries', 3)
         )
 
-        # 3. 初始化ClickHouse连接池
-        self.ch_pool = Client(
-            **ch_conf,
-            # 启用连接池（默认5个连接）
-            connections_min=3,
-            connections_max=10
+        # 元数据对象本地缓存，未变化时跳过下载与解析
+        self.object_cache = ObjectCache(
+            oss_conf.get('cache_dir', DEFAULT_CACHE_DIR),
+            max_bytes=oss_conf.get('cache_max_bytes', 256 * 1024 * 1024),
+            max_age=oss_conf.get('cache_max_age', 0)
         )
 
-        # 4. 预编译常用查询
+        # 预编译常用查询
         self._prepare_queries()
 
+    @property
+    def credentials(self):
+        """STS 临时安全凭证，同一角色在进程内共享缓存，过期前后台刷新"""
+        return get_sts_credentials(self.oss_conf['sts_role_arn'], 'cpi-loader-session').get()
+
+    @property
+    def oss_client(self):
+        """首次使用时创建OSS客户端（带SSL加密），凭证轮换后重建"""
+        credentials = self.credentials
+        if self._oss_client is None or self._oss_credentials is not credentials:
+            self._oss_client = OssClient(
+                endpoint=self.oss_conf['endpoint'],
+                bucket_name=self.oss_conf['bucket'],
+                access_key_id=credentials.access_key_id,
+                access_key_secret=credentials.access_key_secret,
+                security_token=credentials.security_token,
+                ssl_verify=ssl.CERT_REQUIRED
+            )
+            self._oss_credentials = credentials
+        return self._oss_client
+
     def _prepare_queries(self):
-        """预编译SQL模板提升性能"""
-        self.price_query = self.ch_pool.compile(
-            """
-            SELECT product_id, date, price, sales_volume 
+        """预置SQL模板，s3() 对象路径在查询时按日期范围生成"""
+        self.price_query_template = """
+            SELECT product_id, category_id, price, change_date AS date
             FROM s3(
-                'https://{bucket}.{endpoint}/data/prices.csv',
+                'https://{bucket}.{endpoint}/{path}',
                 'CSVWithNames',
-                'AccessKeyId={ak}', 
+                'AccessKeyId={ak}',
                 'AccessKeySecret={sk}'
             )
-            WHERE date BETWEEN %(start)s AND %(end)s
+            WHERE change_date BETWEEN %(start)s AND %(end)s
             """
+
+    def _build_price_query(self, start_date: str, end_date: str) -> str:
+        """按日期范围生成只匹配对应分区对象的查询"""
+        return self.price_query_template.format(
+            bucket=self.oss_conf['bucket'],
+            endpoint=self.oss_conf['endpoint'],
+            path=price_path_pattern(start_date, end_date),
+            ak=self.credentials.access_key_id,
+            sk=self.credentials.access_key_secret
         )
 
     def load_price_data(self, start_date: str, end_date: str) -> pd.DataFrame:
-        """安全加载价格数据"""
-        # 使用预编译查询+参数化
-        return self.ch_pool.query_dataframe(
-            self.price_query,
-            params={'start': start_date, 'end': end_date},
-            # 自动转换日期类型
-            types_check=True
-        )
+        """安全加载价格数据，ClickHouse 只拉取日期范围内的每日对象"""
+        return self.load_price_table(start_date, end_date).to_pandas(date_as_object=False)
+
+    def load_price_table(self, start_date: str, end_date: str) -> pa.Table:
+        """以列式结果读取价格数据，长日期范围分段并行查询后按日期顺序合并"""
+        return self.range_loader.load(start_date, end_date)
+
+    def iter_price_chunks(self, start_date: str, end_date: str):
+        """按日期顺序逐段产出 (分段开始日期, 分段结束日期, pyarrow.Table)，失败的分段单独重试"""
+        return self.range_loader.iter_chunks(start_date, end_date)
+
+    def _query_price_table(self, start_date: str, end_date: str) -> pa.Table:
+        """单条查询读取日期范围内的价格数据，按 PRICE_SCHEMA 转换类型，不构造逐行 Python 对象"""
+        with self.ch_pool.connection() as client:
+            return fetch_arrow(
+                client,
+                self._build_price_query(start_date, end_date),
+                params={'start': start_date, 'end': end_date},
+                schema=PRICE_SCHEMA
+            )
+
+    def iter_price_batches(self, start_date: str, end_date: str, batch_rows: int = DEFAULT_BATCH_ROWS):
+        """
+        流式读取价格数据，服务端每返回一个数据块（最多 batch_rows 行）即产出一个 pyarrow.RecordBatch
+        数据块按列直接转换为 Arrow 数组，不构造逐行 Python 对象；客户端内存只保留一个批次
+        """
+        # 流式读取期间独占一个连接，读取结束或被中途放弃时归还/丢弃
+        with self.ch_pool.connection() as client:
+            yield from iter_arrow_batches(
+                client,
+                self._build_price_query(start_date, end_date),
+                {'start': start_date, 'end': end_date},
+                schema=PRICE_SCHEMA,
+                settings={'max_block_size': batch_rows},
+                max_rows=batch_rows
+            )
+
+    def _get_object_bytes(self, key) -> bytes:
+        return self.oss_client.get_object(key).read()
+
+    def iter_price_objects(self, start_date: str, end_date: str):
+        """
+        直接从 OSS 并发下载日期范围内的每日价格对象，不存在的日期（节假日等）视为无数据跳过
+        :return: 按完成顺序产出 (对象键, pyarrow.Table)
+        """
+        start, end = to_date(start_date), to_date(end_date)
+        keys = [price_object_key(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+        return self.fetcher.iter_fetch(keys)
+
+    def load_price_objects(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """并发下载日期范围内的每日价格对象，按日期顺序合并"""
+        results = dict(self.iter_price_objects(start_date, end_date))
+        if not results:
+            return pd.DataFrame(columns=['product_id', 'category_id', 'name', 'price', 'date'])
+        # 对象键中包含 ISO 日期，按键排序即按日期排序
+        table = pa.concat_tables([results[key] for key in sorted(results)])
+        return table.to_pandas(date_as_object=False)
+
+    def upload_price_files(self, paths) -> list:
+        """
+        按分区对象布局上传每日价格文件
+        :param paths: daily_prices_YYYYMMDD.csv 文件路径列表
+        :return: 上传的对象键列表
+        """
+        keys = []
+        for path in map(Path, paths):
+            match = LocalDataLoader.PRICE_FILE_PATTERN.match(path.name)
+            if not match:
+                raise ValueError(f"无法从文件名解析日期: {path.name}")
+            if compression_of(path):
+                # 对象键固定为 prices.csv，s3() 按扩展名判断是否解压
+                raise ValueError(f"OSS 价格对象需为未压缩的 CSV: {path.name}")
+            key = price_object_key(datetime.strptime(match.group(1), '%Y%m%d').date())
+            self.oss_client.put_object_from_file(key, str(path))
+            keys.append(key)
+        return keys
 
     def load_category_mapping(self) -> pd.DataFrame:
-        """加载分类映射表"""
-        # 使用OSS分块下载提升大文件性能
-        return self.oss_client.get_object_as_df(
-            'meta/category_mapping.csv',
-            chunk_size=1024*1024  # 1MB分块
-        )
+        """加载分类映射表，对象未变化时直接读取本地 Arrow 快照"""
+        table = self.object_cache.get_table(self.oss_client, CATEGORY_MAPPING_KEY, _parse_csv_object)
+        return table.to_pandas()
+
+
+class LocalDataLoader:
+    """本地文件系统数据加载器，接口与 SecureOSSDataLoader 保持一致"""
+
+    # 每日价格文件命名：daily_prices_YYYYMMDD.csv
+    PRICE_FILE_PATTERN = PRICE_FILE_PATTERN
+
+    def __init__(self, data_dir='.', category_file='categories.csv', max_workers=None):
+        """
+        :param data_dir: 存放 daily_prices_YYYYMMDD.csv 的目录
+        :param category_file: 分类文件路径（相对路径基于 data_dir）
+        :param max_workers: 并行解析文件的线程数，默认由线程池决定
+        """
+        self.data_dir = Path(data_dir)
+        self.category_path = self.data_dir / category_file
+        self.max_workers = max_workers
+
+    def _select_price_files(self, start_date: str, end_date: str) -> list:
+        """根据文件名中的日期筛选 [start_date, end_date] 范围内的文件，按日期排序，同一天有多种编码时报错"""
+        return find_price_files(self.data_dir, start_date, end_date)
+
+    def _read_price_file(self, path: Path) -> pa.Table:
+        """使用 pyarrow 多线程 CSV 解析器按声明类型读取单个价格文件"""
+        return read_prices(path)
+
+    def load_price_data(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """并行加载日期范围内的每日价格文件"""
+        paths = self._select_price_files(start_date, end_date)
+        if not paths:
+            return pd.DataFrame(columns=['product_id', 'category_id', 'name', 'price', 'date'])
+
+        # 文件间并行，文件内由 pyarrow 多线程解析；map 保证结果按日期顺序返回
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            tables = list(executor.map(self._read_price_file, paths))
+
+        table = pa.concat_tables(tables).unify_dictionaries()
+        return to_pandas(table).rename(columns={'change_date': 'date'})
+
+    def iter_price_batches(self, start_date: str, end_date: str, batch_rows: int = DEFAULT_BATCH_ROWS):
+        """按日期顺序逐个文件读取，每次产出最多 batch_rows 行的 pyarrow.RecordBatch"""
+        for path in self._select_price_files(start_date, end_date):
+            table = self._read_price_file(path)
+            table = table.rename_columns(['date' if c == 'change_date' else c for c in table.column_names])
+            yield from table.to_batches(max_chunksize=batch_rows)
+
+    def load_category_mapping(self) -> pd.DataFrame:
+        """加载本地分类文件"""
+        return read_categories(self.category_path).to_pandas()
+
+
+class ParquetDataLoader(LocalDataLoader):
+    """日期分区 Parquet 数据集加载器，日期范围与列选择下推到存储层"""
+
+    def __init__(self, dataset_dir, data_dir='.', category_file='categories.csv'):
+        """
+        :param dataset_dir: parquet_store 生成的分区数据集目录
+        :param data_dir: 分类文件所在目录
+        """
+        super().__init__(data_dir=data_dir, category_file=category_file)
+        self.dataset_dir = Path(dataset_dir)
+
+    def load_price_data(self, start_date: str, end_date: str, columns=None) -> pd.DataFrame:
+        """
+        只读取日期范围覆盖的分区及所需列
+        :param columns: 需要的列（如 ['product_id', 'date', 'price']），默认全部
+        """
+        table = read_price_dataset(self.dataset_dir, start_date, end_date, columns=columns)
+        if table.num_columns == 0:
+            return pd.DataFrame(columns=columns or ['product_id', 'category_id', 'name', 'price', 'date'])
+        return table.to_pandas(date_as_object=False)
+
+    def iter_price_batches(self, start_date: str, end_date: str, batch_rows: int = DEFAULT_BATCH_ROWS, columns=None):
+        """按批次流式读取分区数据集，日期范围与列选择同样下推"""
+        return iter_price_dataset_batches(self.dataset_dir, start_date, end_date, batch_rows, columns)
+
+
+# 每日价格对象按日期分区存放：data/prices/date=YYYY-MM-DD/prices.csv
+CATEGORY_MAPPING_KEY = 'meta/category_mapping.csv'
+PRICE_OBJECT_TEMPLATE = 'data/prices/date={date}/prices.csv'
+
+
+def price_object_key(day) -> str:
+    """每日价格文件在 OSS 中的对象键"""
+    return PRICE_OBJECT_TEMPLATE.format(date=to_date(day).isoformat())
+
+
+def price_path_pattern(start_date, end_date) -> str:
+    """
+    生成 s3() 表函数的路径模式，只匹配 [start_date, end_date] 内的每日对象
+    不含整月时逐日列出，例如 data/prices/date={2025-05-17,2025-05-18}/prices.csv；
+    含整月时整月以月份前缀加通配匹配、首尾不完整的月份仍逐日列出，备选项数不超过月数 + 60，
+    例如 data/prices/date={2025-01,2025-02,2025-03-01}*/prices.csv
+    """
+    start, end = to_date(start_date), to_date(end_date)
+    if start > end:
+        raise ValueError(f"开始日期晚于结束日期: {start_date} > {end_date}")
+    if start == end:
+        return PRICE_OBJECT_TEMPLATE.format(date=start.isoformat())
+
+    alternatives, has_full_month = [], False
+    month_start = start
+    while month_start <= end:
+        next_month = (month_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        month_end = min(end, next_month - timedelta(days=1))
+        if month_start.day == 1 and month_end == next_month - timedelta(days=1):
+            alternatives.append(f'{month_start:%Y-%m}')
+            has_full_month = True
+        else:
+            alternatives += [(month_start + timedelta(days=i)).isoformat()
+                             for i in range((month_end - month_start).days + 1)]
+        month_start = next_month
+    # 通配 * 不匹配 /，日期前缀后加 * 只匹配该日的对象
+    suffix = '*' if has_full_month else ''
+    pattern = alternatives[0] if len(alternatives) == 1 else '{' + ','.join(alternatives) + '}'
+    return PRICE_OBJECT_TEMPLATE.format(date=pattern + suffix)
+
+
+def _parse_price_object(key, data: bytes) -> pa.Table:
+    """解析每日价格对象"""
+    return read_daily_csv(pa.BufferReader(data))
+
+
+def _parse_csv_object(data: bytes) -> pa.Table:
+    """解析带表头的 CSV 对象"""
+    return pa_csv.read_csv(pa.BufferReader(data))
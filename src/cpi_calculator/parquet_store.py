@@ -0,0 +1,191 @@
+"""
+日期分区 Parquet 价格存储 - 每日 CSV 转换、按月压实与分区裁剪读取
+
+目录布局（Hive 风格）：
+    按日: <dataset>/date=YYYY-MM-DD/part-0.parquet  （文件内不含 date 列，由分区目录提供）
+    按月: <dataset>/month=YYYY-MM/part-0.parquet    （文件内包含 date 列）
+分区内数据按 category_id, product_id(, date) 排序，使用 zstd 压缩。
+"""
+import argparse
+import logging
+import shutil
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .compression import atomic_path
+from .readers import find_price_files, read_prices, to_date
+
+LOGGER = logging.getLogger(__name__)
+
+PARTITION_KEYS = {'day': 'date', 'month': 'month'}
+PART_FILE = 'part-0.parquet'
+
+
+def read_daily_csv(path) -> pa.Table:
+    """读取单个每日价格 CSV，统一列名为 date"""
+    table = read_prices(path)
+    return table.rename_columns(['date' if c == 'change_date' else c for c in table.column_names])
+
+
+def detect_granularity(dataset_dir) -> str | None:
+    """根据已有分区目录名判断数据集粒度，空数据集返回 None"""
+    dataset_dir = Path(dataset_dir)
+    if not dataset_dir.exists():
+        return None
+    for child in dataset_dir.iterdir():
+        for granularity, key in PARTITION_KEYS.items():
+            if child.is_dir() and child.name.startswith(f'{key}='):
+                return granularity
+    return None
+
+
+def _sort_partition(table: pa.Table) -> pa.Table:
+    keys = [('category_id', 'ascending'), ('product_id', 'ascending')]
+    if 'date' in table.column_names:
+        keys.append(('date', 'ascending'))
+    return table.sort_by(keys)
+
+
+def _write_partition(table: pa.Table, partition_dir: Path) -> None:
+    """原子地写入单个分区文件（先写临时文件再替换）"""
+    with atomic_path(partition_dir / PART_FILE) as tmp:
+        pq.write_table(_sort_partition(table), tmp, compression='zstd')
+
+
+def write_partitions(table: pa.Table, dataset_dir, granularity: str = 'day') -> list:
+    """
+    将价格数据按日期写入分区数据集
+    :param table: 包含 date 列的价格数据
+    :param granularity: day/month；按月时与分区内已有数据合并，相同日期的数据被替换
+    :return: 写入的分区目录列表
+    """
+    if granularity not in PARTITION_KEYS:
+        raise ValueError(f"不支持的分区粒度: {granularity}")
+    dataset_dir = Path(dataset_dir)
+    dates = table.column('date')
+    written = []
+
+    if granularity == 'day':
+        for day in pc.unique(dates).to_pylist():
+            part = table.filter(pc.equal(dates, day)).drop_columns(['date'])
+            partition_dir = dataset_dir / f'date={day.isoformat()}'
+            _write_partition(part, partition_dir)
+            written.append(partition_dir)
+        return written
+
+    months = pc.strftime(dates, format='%Y-%m')
+    for month in pc.unique(months).to_pylist():
+        part = table.filter(pc.equal(months, month))
+        partition_dir = dataset_dir / f'month={month}'
+        existing_path = partition_dir / PART_FILE
+        if existing_path.exists():
+            existing = pq.read_table(existing_path)
+            keep = pc.invert(pc.is_in(existing.column('date'), value_set=pc.unique(part.column('date'))))
+            part = pa.concat_tables([existing.filter(keep), part.select(existing.column_names).cast(existing.schema)])
+        _write_partition(part, partition_dir)
+        written.append(partition_dir)
+    return written
+
+
+def convert_daily_csv(csv_paths, dataset_dir, granularity: str | None = None) -> list:
+    """
+    将每日价格 CSV 转换写入分区数据集
+    :param granularity: 未指定时沿用数据集已有粒度，新数据集默认按日
+    """
+    granularity = granularity or detect_granularity(dataset_dir) or 'day'
+    tables = [read_daily_csv(path) for path in csv_paths]
+    if not tables:
+        return []
+    written = write_partitions(pa.concat_tables(tables), dataset_dir, granularity)
+    LOGGER.info("已写入 %d 个分区 | 粒度: %s | 目录: %s", len(written), granularity, dataset_dir)
+    return written
+
+
+def compact_dataset(dataset_dir) -> list:
+    """将按日分区压实为按月分区，完成后删除原按日分区目录"""
+    dataset_dir = Path(dataset_dir)
+    if detect_granularity(dataset_dir) != 'day':
+        return []
+    day_dirs = sorted(p for p in dataset_dir.iterdir() if p.is_dir() and p.name.startswith('date='))
+    table = ds.dataset(dataset_dir, format='parquet', partitioning=_partitioning('day')).to_table()
+    # 分区字段读出为 date32，与按月文件中的 date 列类型一致
+    written = write_partitions(table, dataset_dir, 'month')
+    for day_dir in day_dirs:
+        shutil.rmtree(day_dir)
+    LOGGER.info("已压实 %d 个按日分区为 %d 个按月分区", len(day_dirs), len(written))
+    return written
+
+
+def _partitioning(granularity: str) -> ds.Partitioning:
+    if granularity == 'day':
+        return ds.partitioning(pa.schema([('date', pa.date32())]), flavor='hive')
+    return ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+
+
+def _price_scan(dataset_dir, start_date, end_date, columns=None):
+    """构造带日期条件与列选择的扫描参数，数据集为空时返回 None"""
+    granularity = detect_granularity(dataset_dir)
+    if granularity is None:
+        return None
+    start, end = to_date(start_date), to_date(end_date)
+
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning=_partitioning(granularity))
+    condition = (ds.field('date') >= start) & (ds.field('date') <= end)
+    if granularity == 'month':
+        # 分区键条件用于目录裁剪，date 条件利用行组统计信息过滤
+        condition &= (ds.field('month') >= start.strftime('%Y-%m')) & (ds.field('month') <= end.strftime('%Y-%m'))
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != 'month']
+    return dataset, list(columns), condition
+
+
+def read_price_dataset(dataset_dir, start_date, end_date, columns=None) -> pa.Table:
+    """
+    读取日期范围内的价格数据，日期条件与列选择下推到分区与 Parquet 文件
+    :param columns: 需要的列，默认读取全部列
+    """
+    scan = _price_scan(dataset_dir, start_date, end_date, columns)
+    if scan is None:
+        return pa.table({})
+    dataset, columns, condition = scan
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def iter_price_dataset_batches(dataset_dir, start_date, end_date, batch_rows=65536, columns=None):
+    """按批次流式读取日期范围内的价格数据，每批最多 batch_rows 行"""
+    scan = _price_scan(dataset_dir, start_date, end_date, columns)
+    if scan is None:
+        return
+    dataset, columns, condition = scan
+    for batch in dataset.to_batches(columns=columns, filter=condition, batch_size=batch_rows):
+        if batch.num_rows:
+            yield batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='每日价格 CSV 转换为日期分区 Parquet 数据集')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='转换每日价格 CSV')
+    convert_parser.add_argument('source', help='存放 daily_prices_YYYYMMDD.csv 的目录')
+    convert_parser.add_argument('dataset', help='输出数据集目录')
+    convert_parser.add_argument('--granularity', choices=sorted(PARTITION_KEYS))
+
+    compact_parser = subparsers.add_parser('compact', help='按日分区压实为按月分区')
+    compact_parser.add_argument('dataset', help='数据集目录')
+
+    args = parser.parse_args(argv)
+    if args.command == 'convert':
+        paths = find_price_files(args.source)
+        convert_daily_csv(paths, args.dataset, args.granularity)
+    else:
+        compact_dataset(args.dataset)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,148 @@
+"""
+流水线阶段调度 - 按依赖关系并发执行互不依赖的阶段，流式数据经有界缓冲在阶段间传递
+
+    pipeline = Pipeline()
+    pipeline.add('categories', loader.load_category_mapping)
+    pipeline.add('prices', lambda: calculator.collect_period_prices(
+        prefetch(loader.iter_price_batches(start, end), cancel=pipeline.cancelled), start, end))
+    pipeline.add('indices', calculator.compute_category_indices, 'prices', 'categories')
+    results = pipeline.run()
+
+每个阶段在依赖全部完成后立即提交到线程池，依赖的结果按声明顺序作为位置参数传入。
+任一阶段失败时不再提交新的阶段，已提交但尚未开始的阶段被取消，异常不等待其余阶段结束即原样抛出。
+同时置位 pipeline.cancelled：传入该事件的 prefetch 停止拉取并关闭数据源，消费它的阶段以 PipelineCancelled 结束，
+正在读取的价格流不会在失败后继续读完。
+prefetch 在后台线程中提前拉取迭代器（如价格批次流），下游边接收边处理，缓冲区满时生产者等待。
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+LOGGER = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class PipelineCancelled(RuntimeError):
+    """其他阶段失败，流水线已取消"""
+
+
+class Pipeline:
+    """由命名阶段组成的有向无环图"""
+
+    def __init__(self, max_workers=None):
+        """
+        :param max_workers: 最大并发阶段数，默认为阶段数
+        """
+        self.max_workers = max_workers
+        self._stages = {}
+        # 任一阶段失败时置位，流式阶段据此提前结束
+        self.cancelled = threading.Event()
+
+    def add(self, name: str, func, *depends_on):
+        """
+        添加阶段
+        :param name: 阶段名，结果以此为键
+        :param func: 阶段函数，依赖阶段的结果按 depends_on 的顺序作为位置参数传入
+        :param depends_on: 依赖的阶段名，须已添加
+        """
+        if name in self._stages:
+            raise ValueError(f"阶段重复: {name}")
+        unknown = [dep for dep in depends_on if dep not in self._stages]
+        if unknown:
+            raise ValueError(f"阶段 {name} 依赖的阶段不存在: {', '.join(unknown)}")
+        self._stages[name] = (func, depends_on)
+        return self
+
+    def run(self) -> dict:
+        """执行全部阶段，返回 {阶段名: 结果}"""
+        results, running, pending = {}, {}, dict(self._stages)
+        started = time.perf_counter()
+        self.cancelled.clear()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or max(len(pending), 1),
+                                      thread_name_prefix='cpi-stage')
+        try:
+            while pending or running:
+                for name, (func, depends_on) in list(pending.items()):
+                    if all(dep in results for dep in depends_on):
+                        del pending[name]
+                        running[executor.submit(_timed, name, func, *(results[dep] for dep in depends_on))] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        except BaseException:
+            # 失败时通知仍在执行的阶段停止，不等待其结束，异常立即上抛
+            self.cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        LOGGER.info("流水线完成 | 阶段数: %d | 总耗时: %.2fs", len(results), time.perf_counter() - started)
+        return results
+
+
+def _timed(name, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    LOGGER.info("阶段 %s 完成，耗时 %.2fs", name, time.perf_counter() - started)
+    return result
+
+
+def prefetch(iterable, max_buffered=8, cancel=None, poll_interval=0.1):
+    """
+    在后台线程中提前拉取 iterable，按原顺序产出
+    :param max_buffered: 缓冲的最大元素数，限制生产者领先消费者的程度
+    :param cancel: 取消事件（如 Pipeline.cancelled），置位后停止拉取、关闭数据源并抛出 PipelineCancelled
+    :param poll_interval: 检查取消事件的间隔（秒）
+    """
+    buffer = queue.Queue(maxsize=max_buffered)
+    stopped = threading.Event()
+    cancel = cancel or threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(buffer, (None, item), stopped, cancel, poll_interval):
+                    return
+            _put(buffer, (None, _DONE), stopped, cancel, poll_interval)
+        except BaseException as exc:
+            _put(buffer, (exc, None), stopped, cancel, poll_interval)
+        finally:
+            # 消费者提前退出或流水线取消时关闭生成器，释放其占用的连接
+            if (stopped.is_set() or cancel.is_set()) and hasattr(iterable, 'close'):
+                iterable.close()
+
+    producer = threading.Thread(target=produce, name='cpi-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            try:
+                error, item = buffer.get(timeout=poll_interval)
+            except queue.Empty:
+                if cancel.is_set():
+                    raise PipelineCancelled("流水线已取消") from None
+                continue
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            if cancel.is_set():
+                raise PipelineCancelled("流水线已取消")
+            yield item
+    finally:
+        stopped.set()
+        # 取消时生产者可能仍阻塞在数据源上，不等待其结束，它在下一次放入缓冲区前退出并关闭数据源
+        if not cancel.is_set():
+            producer.join()
+
+
+def _put(buffer, item, stopped, cancel, poll_interval) -> bool:
+    """缓冲区满时等待，消费者已退出或流水线已取消则放弃并返回 False"""
+    while not stopped.is_set() and not cancel.is_set():
+        try:
+            buffer.put(item, timeout=poll_interval)
+            return True
+        except queue.Full:
+            continue
+    return False
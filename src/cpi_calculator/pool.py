@@ -0,0 +1,229 @@
+"""
+进程级 ClickHouse 连接池 - 线程安全、按查询借还连接，支持健康检查与空闲回收
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from clickhouse_driver import Client
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(TimeoutError):
+    """等待可用连接超时"""
+
+
+class ConnectionPool:
+    """通用连接池，连接由 factory 创建，可用于 clickhouse_driver 与 clickhouse_connect 客户端"""
+
+    def __init__(self, factory, min_size=1, max_size=10, idle_timeout=300.0,
+                 health_check=None, health_check_interval=30.0, checkout_timeout=30.0):
+        """
+        :param factory: 创建新连接的无参函数
+        :param min_size: 保留的最少连接数，空闲回收不会低于该值
+        :param max_size: 最大连接数，全部借出时后续借用方阻塞等待
+        :param idle_timeout: 空闲超过该秒数的连接会被关闭
+        :param health_check: 健康检查函数，接收连接，失败时抛出异常或返回 False
+        :param health_check_interval: 空闲超过该秒数的连接在借出前做健康检查
+        :param checkout_timeout: 借用连接的最长等待秒数
+        """
+        if not 0 <= min_size <= max_size:
+            raise ValueError(f"连接池大小配置错误: min_size={min_size}, max_size={max_size}")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check or _default_health_check
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()  # (连接, 归还时间)，右端为最近归还
+        self._size = 0
+        self._lock = threading.Condition()
+        self._warmed = False
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """当前已创建的连接数（含借出与空闲）"""
+        return self._size
+
+    def _warm_up(self):
+        """首次借用时创建 min_size 个连接：先在锁内占用名额，连接在锁外创建"""
+        with self._lock:
+            if self._warmed:
+                return
+            self._warmed = True
+            count = max(self.min_size - self._size, 0)
+            self._size += count
+        created = []
+        try:
+            for _ in range(count):
+                created.append(self.factory())
+        finally:
+            with self._lock:
+                # 创建失败的名额归还；预热期间连接池已关闭则直接关闭新连接
+                self._size -= count - len(created)
+                if self._closed:
+                    self._size -= len(created)
+                    for conn in created:
+                        _close(conn)
+                else:
+                    now = time.monotonic()
+                    self._idle.extend((conn, now) for conn in created)
+                self._lock.notify_all()
+
+    def _evict_idle(self):
+        """关闭空闲过久的连接（最早归还的在左端）"""
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            _close(conn)
+
+    def acquire(self, timeout=None):
+        """借出一个连接，无空闲连接且已达上限时阻塞等待"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if not self._warmed:
+            self._warm_up()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("连接池已关闭")
+            self._evict_idle()
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"等待 ClickHouse 连接超时（{timeout}s，最大连接数 {self.max_size}）")
+                self._lock.wait(remaining)
+
+        # 创建连接与健康检查在锁外进行，避免阻塞其他线程
+        try:
+            if conn is None:
+                return self.factory()
+            if time.monotonic() - returned_at > self.health_check_interval and not self._is_healthy(conn):
+                LOGGER.warning("连接健康检查失败，重新创建连接")
+                _close(conn)
+                return self.factory()
+            return conn
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """归还连接；discard=True 时关闭该连接（如查询过程中连接异常）"""
+        with self._lock:
+            if discard or self._closed:
+                self._size -= 1
+                _close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """按查询借用连接：with pool.connection() as client: ..."""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except BaseException:
+            # 出错或流式读取被中途放弃的连接状态不可信，直接丢弃
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def execute(self, query, *args, **kwargs):
+        """借用连接执行单条 clickhouse_driver 查询"""
+        with self.connection() as client:
+            return client.execute(query, *args, **kwargs)
+
+    def close(self):
+        """关闭全部空闲连接，借出中的连接在归还时关闭"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                _close(conn)
+            self._lock.notify_all()
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            return self.health_check(conn) is not False
+        except Exception:
+            return False
+
+
+def _default_health_check(conn):
+    # clickhouse_connect 客户端提供 ping()，clickhouse_driver 客户端执行 SELECT 1
+    if hasattr(conn, 'ping'):
+        return conn.ping()
+    conn.execute('SELECT 1')
+    return True
+
+
+def _close(conn):
+    try:
+        if hasattr(conn, 'disconnect'):
+            conn.disconnect()
+        elif hasattr(conn, 'close'):
+            conn.close()
+    except Exception as e:
+        LOGGER.debug("关闭连接失败: %s", e)
+
+
+_POOLS = {}
+_POOL_KWARGS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(key, factory, **pool_kwargs) -> ConnectionPool:
+    """
+    获取进程内共享的连接池，相同 key 只创建一次
+    :param key: 连接池标识（如 (host, port, user, database)）
+    :param factory: 首次创建连接池时使用的连接工厂
+    :param pool_kwargs: 首次创建时的连接池参数；之后的调用传入不同参数时沿用已有连接池并记录警告
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = ConnectionPool(factory, **pool_kwargs)
+            _POOL_KWARGS[key] = pool_kwargs
+        elif pool_kwargs and pool_kwargs != _POOL_KWARGS[key]:
+            LOGGER.warning("共享连接池已按参数 %s 创建，忽略本次传入的参数 %s", _POOL_KWARGS[key], pool_kwargs)
+        return pool
+
+
+def get_clickhouse_pool(conf: dict, **pool_kwargs) -> ConnectionPool:
+    """
+    获取 clickhouse_driver 连接池，相同连接配置的加载器与计算器共享同一个池
+    :param conf: clickhouse_driver.Client 参数（host/port/user/password/database...）
+    """
+    key = ('clickhouse_driver',) + tuple(sorted((k, str(v)) for k, v in conf.items()))
+    return get_pool(key, lambda: Client(**conf), **pool_kwargs)
+
+
+@atexit.register
+def close_all_pools():
+    """关闭并移除全部共享连接池"""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+        _POOL_KWARGS.clear()
+    for pool in pools:
+        pool.close()
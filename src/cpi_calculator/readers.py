@@ -0,0 +1,121 @@
+"""
+类型化 CSV 读取 - 每日价格、商品与分类文件的声明式 schema，统一由 pyarrow 列式解析
+
+    daily_prices_YYYYMMDD.csv  product_id,category_id,name,price,change_date
+    products.csv               product_id,category_id,name,weight,price,change_count
+    categories.csv             无表头：name,id,hierarchy,weight,price,parent，空值为字面量 null
+
+文件名以 .gz / .zst 结尾时由 pyarrow 流式解压。
+日期直接解析为 date32，不在每次加载后再转换；商品名称在价格文件中跨日期大量重复，
+以字典编码（pandas 中为 category）存放；价格保留 float64，见 columnar.PRICE_SCHEMA 的说明。
+"""
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# 每日价格文件命名：daily_prices_YYYYMMDD.csv，可压缩为 .csv.gz / .csv.zst
+PRICE_FILE_PATTERN = re.compile(r'^daily_prices_(\d{8})\.csv(?:\.gz|\.zst)?$')
+
+CATEGORICAL = pa.dictionary(pa.int32(), pa.string())
+
+PRICE_FILE_SCHEMA = pa.schema([
+    ('product_id', pa.int64()),
+    ('category_id', pa.int64()),
+    ('name', CATEGORICAL),
+    ('price', pa.float64()),
+    ('change_date', pa.date32()),
+])
+# 商品表每个商品一行，名称几乎不重复，字典编码反而更占内存
+PRODUCT_FILE_SCHEMA = pa.schema([
+    ('product_id', pa.int64()),
+    ('category_id', pa.int64()),
+    ('name', pa.string()),
+    ('weight', pa.float64()),
+    ('price', pa.float64()),
+    ('change_count', pa.int32()),
+])
+CATEGORY_FILE_SCHEMA = pa.schema([
+    ('name', pa.string()),
+    ('id', pa.int64()),
+    ('hierarchy', pa.int8()),
+    ('weight', pa.float64()),
+    ('price', pa.float64()),
+    ('parent', pa.int64()),
+])
+
+
+def price_file_date(path) -> date | None:
+    """每日价格文件名中的日期，不是每日价格文件时返回 None"""
+    match = PRICE_FILE_PATTERN.match(Path(path).name)
+    return datetime.strptime(match.group(1), '%Y%m%d').date() if match else None
+
+
+def find_price_files(directory, start_date=None, end_date=None) -> list:
+    """
+    列出目录下日期在 [start_date, end_date] 内的每日价格文件，按日期排序
+    同一天只允许一个文件，同时存在 .csv 与 .csv.gz / .csv.zst 等多种编码时抛出 ValueError，避免该日数据被重复读取
+    """
+    start = to_date(start_date) if start_date else date.min
+    end = to_date(end_date) if end_date else date.max
+    by_date = {}
+    for path in Path(directory).iterdir():
+        day = price_file_date(path)
+        if day is not None and start <= day <= end:
+            by_date.setdefault(day, []).append(path)
+    duplicated = {day: paths for day, paths in by_date.items() if len(paths) > 1}
+    if duplicated:
+        details = '; '.join(f"{day}: {', '.join(sorted(p.name for p in paths))}"
+                            for day, paths in sorted(duplicated.items()))
+        raise ValueError(f"同一天存在多个价格文件，请只保留一种编码: {details}")
+    return [paths[0] for _, paths in sorted(by_date.items())]
+
+
+def read_typed_csv(source, schema: pa.Schema, header=True, columns=None, null_values=None) -> pa.Table:
+    """
+    按声明的 schema 读取 CSV，列类型不做推断
+    :param source: 文件路径（.gz / .zst 自动解压）或可读对象
+    :param header: 文件是否带表头；无表头时按 schema 的列顺序命名
+    :param columns: 只读取的列，默认全部
+    :param null_values: 视为空值的字符串，默认使用 pyarrow 的空值集合
+    """
+    read_options = pa_csv.ReadOptions(use_threads=True, column_names=None if header else schema.names)
+    convert_kwargs = {'column_types': {field.name: field.type for field in schema}}
+    if columns is not None:
+        convert_kwargs['include_columns'] = list(columns)
+    if null_values is not None:
+        convert_kwargs.update(null_values=null_values, strings_can_be_null=True)
+    return pa_csv.read_csv(source, read_options=read_options,
+                           convert_options=pa_csv.ConvertOptions(**convert_kwargs))
+
+
+def read_prices(source, columns=None) -> pa.Table:
+    """读取每日价格文件，列名与文件一致（日期列为 change_date）"""
+    return read_typed_csv(source, PRICE_FILE_SCHEMA, columns=columns)
+
+
+def read_products(source, columns=None) -> pa.Table:
+    """读取商品表 products.csv"""
+    return read_typed_csv(source, PRODUCT_FILE_SCHEMA, columns=columns)
+
+
+def read_categories(source) -> pa.Table:
+    """读取无表头的 categories.csv，字面量 null 与空串视为空值"""
+    return read_typed_csv(source, CATEGORY_FILE_SCHEMA, header=False, null_values=['null', ''])
+
+
+def to_pandas(table: pa.Table) -> pd.DataFrame:
+    """转换为 DataFrame：日期为 datetime64，字典编码列为 category"""
+    return table.to_pandas(date_as_object=False)
+
+
+def to_date(value) -> date:
+    """将 'YYYY-MM-DD' 字符串或日期对象统一转换为 date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
@@ -0,0 +1,220 @@
+"""
+CPI 计算结果存储 - 每次运行的总指数与分类指数追加到按月分区的 Parquet 数据集，可选同步写入 ClickHouse
+
+目录布局（Hive 风格）：
+    <root>/month=YYYY-MM/<run_id>.parquet    # date, category_id, level, cpi_index, formula, run_id, computed_at
+
+总指数的 category_id 与 level 均为 0。同一 (formula, level, category_id, date) 被多次计算时，
+读取默认只保留 computed_at 最新的一行；ClickHouse 表使用 ReplacingMergeTree(computed_at)，
+重复运行写入的旧版本在合并时去除，读取时以 FINAL 保证结果唯一。
+指数列名为 cpi_index（INDEX 是 ClickHouse 关键字，不能直接用作列名）。
+
+用法：
+    python -m cpi_calculator.result_store results --start 2025-01-01 --end 2025-01-31 --level 0
+"""
+import argparse
+import logging
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .columnar import cast_table, fetch_arrow, insert_arrow
+from .compression import atomic_path
+from .readers import to_date
+
+LOGGER = logging.getLogger(__name__)
+
+RESULT_TABLE = 'cpi_result'
+HEADLINE_CATEGORY = 0
+RESULT_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('category_id', pa.int64()),
+    ('level', pa.int8()),
+    ('cpi_index', pa.float64()),
+    ('formula', pa.string()),
+    ('run_id', pa.string()),
+    ('computed_at', pa.timestamp('ms', tz='UTC')),
+])
+RESULT_KEY = ['formula', 'level', 'category_id', 'date']
+PARTITIONING = ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+
+
+def index_frame(day, headline, category_indices: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    组装一次计算的结果行：总指数（category_id=0, level=0）与各分类指数
+    :param category_indices: 含 category_id/level/index 列的 DataFrame（CPICalculator.compute_category_indices 的结果）
+    :return: DataFrame [category_id, level, cpi_index, date]
+    """
+    rows = pd.DataFrame({'category_id': [HEADLINE_CATEGORY], 'level': [0], 'cpi_index': [headline]})
+    if category_indices is not None and len(category_indices):
+        categories = category_indices[['category_id', 'level', 'index']].rename(columns={'index': 'cpi_index'})
+        rows = pd.concat([rows, categories], ignore_index=True)
+    return rows.assign(date=pd.Timestamp(day).date())
+
+
+def result_table(results, formula: str, run_id: str, computed_at=None) -> pa.Table:
+    """
+    将一次运行的结果整理为 RESULT_SCHEMA
+    :param results: 含 date/category_id/level/cpi_index 列的 DataFrame 或 pyarrow.Table
+    """
+    if isinstance(results, pd.DataFrame):
+        results = pa.Table.from_pandas(results, preserve_index=False)
+    computed_at = computed_at or datetime.now(timezone.utc)
+    n = results.num_rows
+    table = results.select(['date', 'category_id', 'level', 'cpi_index'])
+    table = table.append_column('formula', pa.array([formula] * n, pa.string()))
+    table = table.append_column('run_id', pa.array([run_id] * n, pa.string()))
+    table = table.append_column('computed_at', pa.array([computed_at] * n, RESULT_SCHEMA.field('computed_at').type))
+    return cast_table(table, RESULT_SCHEMA).select(RESULT_SCHEMA.names)
+
+
+def latest_results(table: pa.Table) -> pa.Table:
+    """同一 (formula, level, category_id, date) 只保留 computed_at 最新的一行"""
+    if table.num_rows == 0:
+        return table
+    ranked = table.append_column('_row', pa.array(range(table.num_rows), pa.int64()))
+    latest = ranked.group_by(RESULT_KEY, use_threads=False).aggregate([('computed_at', 'max')])
+    kept = ranked.join(latest.rename_columns(RESULT_KEY + ['computed_at']), RESULT_KEY + ['computed_at'],
+                       join_type='inner')
+    # 同一时间戳的重复行按写入顺序保留最后一行
+    kept = kept.group_by(RESULT_KEY, use_threads=False).aggregate([('_row', 'max')])
+    return table.take(kept.column('_row_max')).sort_by([(k, 'ascending') for k in RESULT_KEY])
+
+
+class ClickHouseResultSink:
+    """ClickHouse 结果表，ReplacingMergeTree 按排序键去重，重复运行幂等"""
+
+    def __init__(self, pool, table_name=RESULT_TABLE):
+        self.pool = pool
+        self.table_name = table_name
+
+    def ddl(self) -> str:
+        return f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name}
+            (
+                date Date,
+                category_id UInt64,
+                level UInt8,
+                cpi_index Float64,
+                formula LowCardinality(String),
+                run_id String,
+                computed_at DateTime64(3, 'UTC')
+            )
+            ENGINE = ReplacingMergeTree(computed_at)
+            PARTITION BY toYYYYMM(date)
+            ORDER BY ({', '.join(RESULT_KEY)})
+        """
+
+    def create_table(self):
+        self.pool.execute(self.ddl())
+
+    def write(self, table: pa.Table):
+        with self.pool.connection() as client:
+            insert_arrow(client, self.table_name, table)
+
+    def read(self, start_date=None, end_date=None, formula=None, level=None) -> pa.Table:
+        conditions, params = [], {}
+        for column, op, value in (('date', '>=', start_date), ('date', '<=', end_date),
+                                  ('formula', '=', formula), ('level', '=', level)):
+            if value is not None:
+                conditions.append(f'{column} {op} %({column}{len(params)})s')
+                params[f'{column}{len(params)}'] = value
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        query = f"SELECT {', '.join(RESULT_SCHEMA.names)} FROM {self.table_name} FINAL {where} " \
+                f"ORDER BY {', '.join(RESULT_KEY)}"
+        with self.pool.connection() as client:
+            return fetch_arrow(client, query, params=params, schema=RESULT_SCHEMA)
+
+
+class ResultStore:
+    """CPI 结果的本地列式存储"""
+
+    def __init__(self, root, clickhouse=None):
+        """
+        :param root: 数据集目录
+        :param clickhouse: 可选的 ClickHouseResultSink，写入时同步写入
+        """
+        self.root = Path(root)
+        self.clickhouse = clickhouse
+
+    def append(self, results, formula: str, run_id: str = None) -> str:
+        """
+        追加一次运行的结果
+        :param results: index_frame 的结果，或含 date/category_id/level/cpi_index 列的 pyarrow.Table
+        :param formula: 计算公式/口径标识（如 CPICalculator.FORMULA）
+        :param run_id: 运行ID，默认随机生成
+        :return: run_id
+        """
+        run_id = run_id or uuid.uuid4().hex[:12]
+        table = result_table(results, formula, run_id)
+        months = pc.strftime(table.column('date'), format='%Y-%m')
+        for month in pc.unique(months).to_pylist():
+            with atomic_path(self.root / f'month={month}' / f'{run_id}.parquet') as tmp:
+                pq.write_table(table.filter(pc.equal(months, month)), tmp, compression='zstd')
+        if self.clickhouse is not None:
+            self.clickhouse.write(table)
+        LOGGER.info("已保存计算结果 %d 行 | run_id: %s | 公式: %s", table.num_rows, run_id, formula)
+        return run_id
+
+    def read(self, start_date=None, end_date=None, formula=None, level=None, category_ids=None,
+             latest=True) -> pa.Table:
+        """
+        读取结果，日期范围按月分区裁剪
+        :param latest: 每个 (formula, level, category_id, date) 只保留最新一次运行的结果
+        """
+        if not self.root.exists():
+            return RESULT_SCHEMA.empty_table()
+        dataset = ds.dataset(self.root, format='parquet', partitioning=PARTITIONING, schema=RESULT_SCHEMA.append(
+            pa.field('month', pa.string())))
+        condition = None
+        for expression in _conditions(start_date, end_date, formula, level, category_ids):
+            condition = expression if condition is None else condition & expression
+        table = dataset.to_table(columns=RESULT_SCHEMA.names, filter=condition)
+        return latest_results(table) if latest else table
+
+    def headline(self, start_date=None, end_date=None, formula=None) -> pd.DataFrame:
+        """总指数序列，列为 [date, cpi_index]，可直接交给 Visualizer.plot_cpi_trend"""
+        table = self.read(start_date, end_date, formula=formula, level=0)
+        frame = table.select(['date', 'cpi_index']).to_pandas(date_as_object=False)
+        return frame.sort_values('date', ignore_index=True)
+
+
+def _conditions(start_date, end_date, formula, level, category_ids):
+    if start_date is not None:
+        start = to_date(start_date)
+        yield ds.field('month') >= f'{start:%Y-%m}'
+        yield ds.field('date') >= start
+    if end_date is not None:
+        end = to_date(end_date)
+        yield ds.field('month') <= f'{end:%Y-%m}'
+        yield ds.field('date') <= end
+    if formula is not None:
+        yield ds.field('formula') == formula
+    if level is not None:
+        yield ds.field('level') == level
+    if category_ids is not None:
+        yield ds.field('category_id').isin(list(category_ids))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='查询已保存的 CPI 计算结果')
+    parser.add_argument('root', help='结果数据集目录')
+    parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    parser.add_argument('--end', help='结束日期 YYYY-MM-DD')
+    parser.add_argument('--formula', help='计算公式')
+    parser.add_argument('--level', type=int, help='层级，0 为总指数')
+    parser.add_argument('--all-runs', action='store_true', help='保留每次运行的结果')
+    args = parser.parse_args(argv)
+    table = ResultStore(args.root).read(args.start, args.end, args.formula, args.level, latest=not args.all_runs)
+    print(table.to_pandas().to_string(index=False))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
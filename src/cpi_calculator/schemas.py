@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Decimal, Date, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, DECIMAL, Date, ForeignKey, CheckConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -9,7 +9,7 @@ class Category(Base):
 
     id = Column(Integer, primary_key=True, nullable=False, comment='分类ID（国家标准分类编码）')
     name = Column(String(50), nullable=False, comment='分类名称')
-    weight = Column(Decimal(8,4), comment='CPI计算权重')
+    weight = Column(DECIMAL(8,4), comment='CPI计算权重')
     hierarchy = Column(Integer, nullable=False, comment='分类层级（1=一级分类，2=二级分类，3=三级分类）')
     parent_id = Column(Integer, ForeignKey('category.id', ondelete='SET NULL'), comment='父分类ID')
 
@@ -27,7 +27,7 @@ class Price(Base):
     product_id = Column(Integer, primary_key=True, nullable=False, comment='商品ID')
     category_id = Column(Integer, ForeignKey('category.id', ondelete='CASCADE'), nullable=False, comment='分类ID')
     name = Column(String(50), comment='商品名称')
-    price = Column(Decimal(12,2), comment='商品价格（元）')
+    price = Column(DECIMAL(12,2), comment='商品价格（元）')
 
     # 关系定义
     category = relationship('Category', back_populates='prices')
@@ -0,0 +1,120 @@
+"""
+价格与分类数据批量校验 - 以 Arrow 列运算检查 schemas.py 中的约束，返回紧凑的违规报告
+
+价格数据：主键非空、price >= 0、(date, product_id) 不重复、category_id 存在且为末级分类
+分类数据：id 非空且唯一、父分类存在、层级 = 父分类层级 + 1（顶级为 1）、权重非负
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# 每类违规在报告中保留的样例数
+MAX_SAMPLES = 5
+
+
+class ValidationError(ValueError):
+    """数据未通过校验，report 为违规报告"""
+
+    def __init__(self, report):
+        self.report = report
+        summary = ', '.join(f"{name}={v['count']}" for name, v in report['violations'].items())
+        super().__init__(f"数据校验未通过（{report['rows']} 行）: {summary}")
+
+
+def _to_table(data) -> pa.Table:
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False)
+    if isinstance(data, pa.RecordBatch):
+        return pa.Table.from_batches([data])
+    return data
+
+
+def _add_mask(violations, name, table, mask, columns):
+    """记录布尔掩码命中的行：数量与前几行的关键列"""
+    mask = pc.fill_null(mask, False)
+    count = pc.sum(mask).as_py() or 0
+    if count:
+        sample = table.filter(mask).select(columns).slice(0, MAX_SAMPLES).to_pylist()
+        violations[name] = {'count': count, 'sample': sample}
+
+
+def _report(table, violations) -> dict:
+    return {'rows': table.num_rows, 'ok': not violations, 'violations': violations}
+
+
+def validate_categories(categories) -> dict:
+    """
+    校验分类数据（categories.csv 或 load_category_mapping 的结果）
+    :param categories: 含 id/hierarchy/weight/parent 列的 DataFrame 或 pyarrow.Table
+    :return: {'rows', 'ok', 'violations': {检查项: {'count', 'sample'}}}
+    """
+    table = _to_table(categories)
+    ids, parents, hierarchy = table.column('id'), table.column('parent'), table.column('hierarchy')
+    violations = {}
+
+    _add_mask(violations, 'null_id', table, pc.is_null(ids), ['name', 'id'])
+    counts = table.group_by('id').aggregate([('id', 'count')])
+    duplicated = counts.filter(pc.greater(counts.column('id_count'), 1)).column('id')
+    _add_mask(violations, 'duplicate_id', table, pc.is_in(ids, value_set=duplicated), ['name', 'id'])
+
+    has_parent = pc.is_valid(parents)
+    parent_pos = pc.index_in(parents, value_set=ids)
+    _add_mask(violations, 'unknown_parent', table, pc.and_(has_parent, pc.is_null(parent_pos)),
+              ['name', 'id', 'parent'])
+
+    # 父分类层级按位置取出，顶级分类的期望层级为 1
+    parent_hierarchy = pc.take(hierarchy, parent_pos)
+    expected = pc.if_else(has_parent, pc.add(parent_hierarchy, 1), 1)
+    _add_mask(violations, 'hierarchy_mismatch', table, pc.not_equal(hierarchy, expected),
+              ['name', 'id', 'hierarchy', 'parent'])
+    _add_mask(violations, 'negative_weight', table, pc.less(table.column('weight'), 0), ['name', 'id', 'weight'])
+    return _report(table, violations)
+
+
+def validate_prices(prices, categories=None) -> dict:
+    """
+    校验一批价格数据
+    :param prices: 含 product_id/category_id/price 与 date（或 change_date）列的 Table/RecordBatch/DataFrame
+    :param categories: 分类数据，提供时检查 category_id 是否存在且为末级分类
+    :return: {'rows', 'ok', 'violations': {检查项: {'count', 'sample'}}}
+    """
+    table = _to_table(prices)
+    date_column = 'date' if 'date' in table.column_names else 'change_date'
+    keys = [date_column, 'product_id', 'category_id']
+    violations = {}
+
+    for name in keys:
+        _add_mask(violations, f'null_{name}', table, pc.is_null(table.column(name)), keys)
+    _add_mask(violations, 'negative_price', table, pc.less(table.column('price'), 0), keys + ['price'])
+
+    counts = table.select([date_column, 'product_id']).group_by([date_column, 'product_id']).aggregate(
+        [('product_id', 'count')])
+    duplicated = counts.filter(pc.greater(counts.column('product_id_count'), 1))
+    if duplicated.num_rows:
+        violations['duplicate_key'] = {
+            'count': pc.sum(duplicated.column('product_id_count')).as_py(),
+            'sample': duplicated.select([date_column, 'product_id']).slice(0, MAX_SAMPLES).to_pylist(),
+        }
+
+    if categories is not None:
+        category_table = _to_table(categories)
+        category_ids = category_table.column('id')
+        parents = pc.drop_null(category_table.column('parent'))
+        leaves = category_ids.filter(pc.invert(pc.is_in(category_ids, value_set=parents)))
+        category_id = table.column('category_id')
+        known = pc.is_in(category_id, value_set=category_ids)
+        _add_mask(violations, 'unknown_category', table, pc.and_(pc.is_valid(category_id), pc.invert(known)), keys)
+        _add_mask(violations, 'non_leaf_category', table,
+                  pc.and_(known, pc.invert(pc.is_in(category_id, value_set=leaves))), keys)
+    return _report(table, violations)
+
+
+def check_prices(prices, categories=None, allow=()) -> dict:
+    """
+    校验价格数据，存在违规时抛出 ValidationError，通过时返回报告
+    :param allow: 允许存在的检查项（如 ('duplicate_key',)），仅记录在报告中不报错
+    """
+    report = validate_prices(prices, categories)
+    if set(report['violations']) - set(allow):
+        raise ValidationError(report)
+    return report
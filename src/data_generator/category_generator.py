@@ -5,6 +5,8 @@ from pathlib import Path
 import random
 import csv
 
+from src.cpi_calculator.compression import open_text
+
 def get_raw_categories() -> list:
     """
     Reads the raw categories from a text file and returns them as a list.
@@ -34,7 +36,7 @@ def generate_category_csv(categories: list, weights: list) -> None:
     """
     category_path = Path(__file__).resolve().parent.parent.parent / 'data' / 'categories.csv'
     
-    with open(category_path, 'w', newline='', encoding='utf-8') as f:
+    with open_text(category_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(['category', 'weight'])
         for category, weight in zip(categories, weights):
@@ -2,6 +2,8 @@ import random
 from datetime import datetime, timedelta
 import csv
 
+from src.cpi_calculator.compression import open_text
+
 class Product:
     def __init__(self, id, weight, price):
         self.id = id
@@ -85,9 +87,9 @@ class PriceGenerator:
         将每日商品数据导出为 CSV 文件（使用内置 csv 模块）
 
         :param daily_data: price_generator 返回的数据
-        :param filename: 输出文件名
+        :param filename: 输出文件名，以 .gz / .zst 结尾时压缩写入
         """
-        with open(filename, mode='w', newline='', encoding='utf-8') as f:
+        with open_text(filename, mode='w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(['Date', 'Product ID', 'Price', 'Weight'])
 
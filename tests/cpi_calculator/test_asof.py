@@ -0,0 +1,80 @@
+# tests/cpi_calculator/test_asof.py
+import datetime
+
+import numpy as np
+import pytest
+
+from src.cpi_calculator.asof import AsOfPriceIndex, build_index
+from src.cpi_calculator.changelog import convert_daily_csv
+
+# 每天的 (product_id, price)；商品 1 第二天调价、第三天调回，商品 2 第三天移出，商品 4 第三天加入，
+# 商品 5 第二天同时有两个价格、第三天只剩较低的价格
+DAYS = {
+    '20250517': [(1, 10.0), (1, 10.0), (2, 20.0), (3, 30.0), (5, 5.0)],
+    '20250518': [(1, 11.0), (2, 20.0), (3, 30.0), (5, 5.0), (5, 6.0)],
+    '20250519': [(1, 10.0), (3, 30.0), (4, 40.0), (5, 5.0)],
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for day, rows in DAYS.items():
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        lines = ['product_id,category_id,name,price,change_date']
+        lines += [f'{pid},1101010001,商品_{pid},{price},{iso}' for pid, price in rows]
+        (tmp_path / f'daily_prices_{day}.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return tmp_path
+
+
+def test_only_changes_are_stored(data_dir):
+    """测试每个商品只保存价格变化点"""
+    index = build_index(data_dir)
+    assert index.product_ids.tolist() == [1, 2, 3, 4, 5]
+    assert np.diff(index.offsets).tolist() == [3, 1, 1, 1, 3]
+    history = index.history(1)
+    assert history['price'].to_pylist() == [10.0, 11.0, 10.0]
+    assert history['date'].to_pylist()[1] == datetime.date(2025, 5, 18)
+    assert index.history(999).num_rows == 0
+
+
+def test_lookup(data_dir):
+    """测试单个与批量 as-of 查询：早于首次观测与未知商品为空，移出后沿用最后价格"""
+    index = build_index(data_dir)
+    assert index.price_at(1, '2025-05-18') == 11.0
+    assert index.price_at(1, '2025-06-30') == 10.0
+    assert index.price_at(4, '2025-05-18') is None
+    assert index.price_at(999, '2025-05-18') is None
+
+    prices, effective = index.lookup([2, 1, 4, 999], np.array(['2025-05-19'] * 4, dtype='datetime64[D]'),
+                                     return_dates=True)
+    assert prices[:3].tolist() == [20.0, 10.0, 40.0] and np.isnan(prices[3])
+    assert effective[:3].tolist() == [datetime.date(2025, 5, 17), datetime.date(2025, 5, 19),
+                                      datetime.date(2025, 5, 19)]
+    # 单个日期对全部商品生效
+    assert index.lookup([1, 3], '2025-05-17').tolist() == [10.0, 30.0]
+
+
+def test_changelog_matches_daily_files(data_dir, tmp_path):
+    """测试由变更日志构建的索引与每日文件一致（同日多个价格取最大）"""
+    store = convert_daily_csv(sorted(data_dir.glob('daily_prices_*.csv')), tmp_path / 'store')
+    from_files, from_changelog = build_index(data_dir), build_index(store.root)
+    assert from_changelog.to_table().equals(from_files.to_table())
+
+
+def test_vectorized_lookup_matches_scan():
+    """测试批量查询与逐个线性查找的结果一致"""
+    rng = np.random.default_rng(1)
+    product_ids = rng.integers(0, 50, 2000)
+    days = rng.integers(0, 100, 2000)
+    prices = rng.integers(1, 5, 2000).astype(float)
+    index = AsOfPriceIndex.from_observations(product_ids, days, prices)
+
+    queries, query_days = rng.integers(0, 55, 500), rng.integers(-5, 110, 500)
+    result = index.lookup(queries, query_days)
+    for product_id, day, price in zip(queries, query_days, result):
+        mask = (product_ids == product_id) & (days <= day)
+        if not mask.any():
+            assert np.isnan(price)
+            continue
+        last_day = days[mask].max()
+        assert price == prices[mask & (days == last_day)][-1]
@@ -0,0 +1,105 @@
+# tests/cpi_calculator/test_async_executor.py
+import threading
+import time
+
+import pyarrow as pa
+import pytest
+
+from src.cpi_calculator.async_executor import AsyncQueryExecutor, QueryTimeoutError
+from src.cpi_calculator.pool import ConnectionPool
+
+
+class StubServer:
+    """进程内的 ClickHouse 替身：查询文本为 'SELECT <秒数>'，执行期间可被 KILL QUERY 终止"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running = 0
+        self.killed = []
+
+    def run(self, query, query_id):
+        seconds = float(query.split()[1])
+        stop = threading.Event()
+        with self.lock:
+            self.running[query_id] = stop
+            self.max_running = max(self.max_running, len(self.running))
+        try:
+            if stop.wait(seconds):
+                raise RuntimeError(f'Query was cancelled: {query_id}')
+            return pa.table({'seconds': [seconds]})
+        finally:
+            with self.lock:
+                self.running.pop(query_id)
+
+    def kill(self, query_id):
+        with self.lock:
+            self.killed.append(query_id)
+            stop = self.running.get(query_id)
+        if stop:
+            stop.set()
+
+
+class StubClient:
+    def __init__(self, server):
+        self.server = server
+
+    def ping(self):
+        return True
+
+    def query_arrow(self, query, settings=None, use_strings=True):
+        return self.server.run(query, settings['query_id'])
+
+    def command(self, statement):
+        self.server.kill(statement.split("'")[1])
+
+
+@pytest.fixture
+def server():
+    return StubServer()
+
+
+@pytest.fixture
+def pool(server):
+    pool = ConnectionPool(lambda: StubClient(server), min_size=0, max_size=8)
+    yield pool
+    pool.close()
+
+
+def test_queries_run_concurrently(server, pool):
+    """测试互不依赖的查询并发执行，总耗时接近最慢的查询"""
+    with AsyncQueryExecutor(pool, max_concurrency=4) as executor:
+        started = time.perf_counter()
+        results = executor.run_all({'a': 'SELECT 0.2', 'b': 'SELECT 0.2', 'c': 'SELECT 0.3'})
+        elapsed = time.perf_counter() - started
+
+    assert results['c'].column('seconds').to_pylist() == [0.3]
+    assert elapsed < 0.6
+    assert server.max_running == 3
+
+
+def test_concurrency_limit(server, pool):
+    """测试同时执行的查询数不超过并发上限"""
+    with AsyncQueryExecutor(pool, max_concurrency=2) as executor:
+        executor.run_all({str(i): 'SELECT 0.05' for i in range(6)})
+    assert server.max_running == 2
+
+
+def test_timeout_kills_query(server, pool):
+    """测试超时的查询抛出 QueryTimeoutError 并通知服务器终止，其余查询正常返回"""
+    with AsyncQueryExecutor(pool, max_concurrency=4, timeout=5) as executor:
+        results = executor.run_all({'fast': 'SELECT 0.01', 'slow': ('SELECT 10', None, 0.1)},
+                                   return_exceptions=True)
+
+    assert results['fast'].num_rows == 1
+    assert isinstance(results['slow'], QueryTimeoutError)
+    assert len(server.killed) == 1
+    assert not server.running
+
+
+def test_failure_cancels_siblings(server, pool):
+    """测试任一查询失败时取消其余查询"""
+    with AsyncQueryExecutor(pool, max_concurrency=4) as executor:
+        with pytest.raises(ValueError):
+            executor.run_all({'bad': 'SELECT x', 'slow': 'SELECT 10'})
+    assert len(server.killed) == 1
@@ -0,0 +1,99 @@
+# tests/cpi_calculator/test_backfill.py
+import datetime
+import json
+from functools import partial
+
+import pytest
+
+from src.cpi_calculator.backfill import month_partitions, report_days, run_backfill
+from src.cpi_calculator.loader import LocalDataLoader
+from src.cpi_calculator.result_store import ResultStore
+
+# 基期 1 月 30 日；商品 1 属于分类 11（权重 0.4），商品 2 属于分类 12（权重 0.6）
+PRICES = {
+    '20250130': (10.0, 20.0),
+    '20250131': (11.0, 20.0),
+    '20250201': (12.0, 22.0),
+    '20250202': (12.0, 24.0),
+}
+
+
+def _write_day(data_dir, day, prices):
+    iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+    lines = ['product_id,category_id,name,price,change_date']
+    lines += [f'{pid},{cid},商品_{pid},{price},{iso}' for pid, cid, price in zip((1, 2), (11, 12), prices)]
+    (data_dir / f'daily_prices_{day}.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for day, prices in PRICES.items():
+        _write_day(tmp_path, day, prices)
+    (tmp_path / 'categories.csv').write_text('食品,1,1,1.0,null,null\n粮食,11,2,0.4,null,1\n油脂,12,2,0.6,null,1\n',
+                                             encoding='utf-8')
+    return tmp_path
+
+
+def _backfill(data_dir, granularity='day', checkpoint='checkpoint.json', **kwargs):
+    return run_backfill(partial(LocalDataLoader, data_dir=data_dir), {}, ResultStore(data_dir / 'results'),
+                        '2025-01-30', '2025-02-02', granularity, 'jevons_fixed_base', data_dir / checkpoint,
+                        max_workers=2, **kwargs)
+
+
+def test_partitions():
+    """测试按自然月切分并截断首尾，按粒度选取报告日"""
+    assert month_partitions('2024-12-15', '2025-02-10') == [
+        (datetime.date(2024, 12, 15), datetime.date(2024, 12, 31)),
+        (datetime.date(2025, 1, 1), datetime.date(2025, 1, 31)),
+        (datetime.date(2025, 2, 1), datetime.date(2025, 2, 10)),
+    ]
+    start, end = datetime.date(2025, 2, 1), datetime.date(2025, 2, 3)
+    assert len(report_days(start, end, 'day')) == 3
+    assert report_days(start, end, 'month') == [end]
+
+
+def test_backfill_daily(data_dir):
+    """测试逐日回填：每个报告日相对基期计算，结果写入结果存储"""
+    assert _backfill(data_dir) == ['2025-01', '2025-02']
+    headline = ResultStore(data_dir / 'results').headline(formula='jevons_fixed_base')
+    assert headline['date'].dt.strftime('%m%d').tolist() == ['0131', '0201', '0202']
+    expected = [0.4 * 1.1 + 0.6 * 1.0, 0.4 * 1.2 + 0.6 * 1.1, 0.4 * 1.2 + 0.6 * 1.2]
+    assert headline['cpi_index'].tolist() == pytest.approx(expected)
+    assert json.loads((data_dir / 'checkpoint.json').read_text())['completed'] == ['2025-01', '2025-02']
+
+
+def test_resume_after_failure(data_dir):
+    """测试分区失败后已完成的分区写入检查点，修复后重新运行只计算未完成的分区"""
+    (data_dir / 'daily_prices_20250202.csv').write_text('product_id,category_id\nx,y\n', encoding='utf-8')
+    with pytest.raises(RuntimeError, match='2025-02'):
+        _backfill(data_dir)
+    assert json.loads((data_dir / 'checkpoint.json').read_text())['completed'] == ['2025-01']
+
+    _write_day(data_dir, '20250202', PRICES['20250202'])
+    assert _backfill(data_dir) == ['2025-02']
+    assert _backfill(data_dir) == []
+    assert _backfill(data_dir, restart=True) == ['2025-01', '2025-02']
+    assert len(ResultStore(data_dir / 'results').headline(formula='jevons_fixed_base')) == 3
+
+
+def test_checkpoint_parameters_must_match(data_dir):
+    """测试检查点参数与本次回填不一致时拒绝续跑"""
+    _backfill(data_dir, granularity='month')
+    with pytest.raises(ValueError):
+        _backfill(data_dir, granularity='day')
+
+
+def test_backfills_with_different_base_do_not_overwrite(data_dir):
+    """测试基期不同的回填写入不同的 run_id，后一次回填不覆盖前一次的结果"""
+    _backfill(data_dir, granularity='month')
+    _backfill(data_dir, granularity='month', checkpoint='checkpoint-0131.json', base_date='2025-01-31')
+
+    assert sorted(p.name for p in (data_dir / 'results' / 'month=2025-02').iterdir()) == [
+        'backfill-jevons_fixed_base-20250130-month-2025-02.parquet',
+        'backfill-jevons_fixed_base-20250131-month-2025-02.parquet',
+    ]
+    runs = ResultStore(data_dir / 'results').read('2025-02-02', '2025-02-02', level=0, latest=False)
+    assert sorted(runs['cpi_index'].to_pylist()) == pytest.approx(sorted([
+        0.4 * 1.2 + 0.6 * 1.2,
+        0.4 * 12 / 11 + 0.6 * 1.2,
+    ]))
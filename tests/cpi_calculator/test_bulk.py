@@ -0,0 +1,67 @@
+# tests/cpi_calculator/test_bulk.py
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+
+from src.cpi_calculator.bulk import bulk_upsert, upsert_categories, upsert_prices, upsert_statement
+from src.cpi_calculator.readers import read_categories, read_prices
+from src.cpi_calculator.schemas import Base, Category, Price
+
+PRICE_HEADER = 'product_id,category_id,name,price,change_date\n'
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _write_prices(tmp_path, rows):
+    path = tmp_path / 'daily_prices_20250517.csv'
+    path.write_text(PRICE_HEADER + ''.join(f'{pid},1101010001,大米_{pid},{price},2025-05-17\n' for pid, price in rows),
+                    encoding='utf-8')
+    return read_prices(path)
+
+
+def test_upsert_prices_updates_on_conflict(engine, tmp_path):
+    """测试主键冲突时更新价格，同一批中重复的主键保留最后一行"""
+    with engine.begin() as conn:
+        assert upsert_prices(conn, _write_prices(tmp_path, [(1, 3.2), (2, 4.0), (1, 3.3)]), batch_size=10) == 2
+        upsert_prices(conn, _write_prices(tmp_path, [(2, 4.5), (3, 1.0)]), batch_size=1)
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(Price.product_id, Price.price).order_by(Price.product_id)).all()
+    assert [(pid, float(price)) for pid, price in rows] == [(1, 3.3), (2, 4.5), (3, 1.0)]
+
+
+def test_upsert_categories(engine, tmp_path):
+    """测试分类写入：parent 列映射为 parent_id，重复写入不报错"""
+    path = tmp_path / 'categories.csv'
+    path.write_text('粮食,1101010000,2,0.0075,null,1101000000\n'
+                    '食品,1101000000,1,0.1869,null,null\n', encoding='utf-8')
+    with engine.begin() as conn:
+        upsert_categories(conn, read_categories(path))
+        upsert_categories(conn, read_categories(path))
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(Category.id, Category.parent_id).order_by(Category.id)).all()
+    assert rows == [(1101000000, None), (1101010000, 1101000000)]
+
+
+def test_bulk_upsert_accepts_dicts(engine):
+    """测试字典行输入"""
+    with engine.begin() as conn:
+        written = bulk_upsert(conn, Category, ({'id': i, 'name': f'c{i}', 'weight': None, 'hierarchy': 1,
+                                                'parent_id': None} for i in range(25)), batch_size=10)
+    assert written == 25
+
+
+def test_postgres_statement_uses_on_conflict():
+    """测试 PostgreSQL 方言生成 ON CONFLICT DO UPDATE"""
+    class Connection:
+        dialect = postgresql.dialect()
+
+    sql = str(upsert_statement(Connection(), Price).compile(dialect=postgresql.dialect()))
+    assert 'ON CONFLICT (date, product_id) DO UPDATE' in sql
+    assert 'price = excluded.price' in sql
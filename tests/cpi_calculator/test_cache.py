@@ -0,0 +1,110 @@
+# tests/cpi_calculator/test_cache.py
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.cpi_calculator.cache import ObjectCache
+from src.cpi_calculator.credentials import clear_credentials_cache
+from src.cpi_calculator.fetcher import LocalObjectStore
+from src.cpi_calculator.loader import SecureOSSDataLoader, _parse_csv_object
+
+
+class CountingStore(LocalObjectStore):
+    """统计下载次数的本地模拟存储"""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.downloads = 0
+
+    def get_object(self, key):
+        self.downloads += 1
+        return super().get_object(key)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CountingStore(tmp_path / 'bucket')
+    source = tmp_path / 'mapping.csv'
+    source.write_text('id,parent,weight\n1,,1.0\n11,1,0.4\n', encoding='utf-8')
+    store.put_object_from_file('meta/category_mapping.csv', source)
+    return store
+
+
+def test_unchanged_object_served_from_snapshot(store, tmp_path):
+    """测试对象未变化时不重复下载与解析，新实例也可复用磁盘快照"""
+    parse = MagicMock(side_effect=_parse_csv_object)
+    first = ObjectCache(tmp_path / 'cache').get_table(store, 'meta/category_mapping.csv', parse)
+    second = ObjectCache(tmp_path / 'cache').get_table(store, 'meta/category_mapping.csv', parse)
+
+    assert second.equals(first)
+    assert store.downloads == 1
+    assert parse.call_count == 1
+
+
+def test_changed_object_revalidated(store, tmp_path):
+    """测试 ETag 变化后重新下载"""
+    cache = ObjectCache(tmp_path / 'cache')
+    cache.get_table(store, 'meta/category_mapping.csv', _parse_csv_object)
+    (store.root / 'meta/category_mapping.csv').write_text('id,parent,weight\n1,,1.0\n', encoding='utf-8')
+
+    table = cache.get_table(store, 'meta/category_mapping.csv', _parse_csv_object)
+    assert table.num_rows == 1
+    assert store.downloads == 2
+
+
+def test_max_age_skips_revalidation(store, tmp_path):
+    """测试校验有效期内不访问 OSS"""
+    cache = ObjectCache(tmp_path / 'cache', max_age=3600)
+    cache.get_table(store, 'meta/category_mapping.csv', _parse_csv_object)
+    offline = MagicMock(side_effect=AssertionError('不应访问网络'))
+
+    table = cache.get_table(MagicMock(head_object=offline, get_object=offline),
+                            'meta/category_mapping.csv', _parse_csv_object)
+    assert table.num_rows == 2
+
+
+def test_hits_update_index_in_memory_until_close(store, tmp_path):
+    """测试命中只在内存中更新使用时间，索引在 close() 时写回"""
+    cache = ObjectCache(tmp_path / 'cache')
+    cache.get_table(store, 'meta/category_mapping.csv', _parse_csv_object)
+    index_file = tmp_path / 'cache' / 'index.json'
+    saved = index_file.read_text(encoding='utf-8')
+
+    with patch.object(cache, '_save_index', wraps=cache._save_index) as save:
+        for _ in range(3):
+            cache.get_table(store, 'meta/category_mapping.csv', _parse_csv_object)
+        save.assert_not_called()
+        cache.close()
+        save.assert_called_once()
+    assert index_file.read_text(encoding='utf-8') != saved
+    assert ObjectCache(tmp_path / 'cache')._index == cache._index
+
+
+def test_eviction_keeps_total_size_bounded(tmp_path):
+    """测试超出容量时淘汰最久未使用的对象"""
+    store = LocalObjectStore(tmp_path / 'bucket')
+    for i in range(3):
+        source = tmp_path / f'{i}.csv'
+        source.write_text('id\n' + '\n'.join(str(i * 1000 + n) for n in range(100)), encoding='utf-8')
+        store.put_object_from_file(f'meta/{i}.csv', source)
+
+    cache = ObjectCache(tmp_path / 'cache', max_bytes=1)
+    for i in range(3):
+        cache.get_table(store, f'meta/{i}.csv', _parse_csv_object)
+
+    assert list(cache._index) == ['meta/2.csv']
+    assert len(list((tmp_path / 'cache' / 'objects').glob('*.arrow'))) == 1
+
+
+def test_loader_category_mapping_uses_cache(store, tmp_path):
+    """测试加载器分类映射第二次读取不再下载"""
+    conf = {'endpoint': 'e', 'bucket': 'b', 'sts_role_arn': '', 'cache_dir': tmp_path / 'cache'}
+    with patch('src.cpi_calculator.credentials.StsClient') as sts, \
+            patch('src.cpi_calculator.loader.OssClient', return_value=store):
+        sts.return_value.assume_role.return_value = MagicMock(expiration=None)
+        loader = SecureOSSDataLoader(conf, {'host': 'localhost'})
+        loader.load_category_mapping()
+        df = loader.load_category_mapping()
+    clear_credentials_cache()
+
+    assert list(df['id']) == [1, 11]
+    assert store.downloads == 1
@@ -0,0 +1,110 @@
+# tests/cpi_calculator/test_category_tree.py
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cpi_calculator.calculator import CPICalculator
+from src.cpi_calculator.category_tree import CategoryTree, save_closure
+from src.cpi_calculator.pool import ConnectionPool
+
+CATEGORIES = pd.DataFrame({
+    'name': ['食品', '粮食', '大米', '面粉', '衣着', '服装'],
+    'id': [1101000000, 1101010000, 1101010001, 1101010002, 1102000000, 1102010000],
+    'hierarchy': [1, 2, 3, 3, 1, 2],
+    'weight': [0.5, 0.2, 0.1, 0.1, 0.5, 0.5],
+    'parent': [None, 1101000000, 1101010000, 1101010000, None, 1102000000],
+})
+
+
+@pytest.fixture
+def tree():
+    return CategoryTree.from_table(CATEGORIES)
+
+
+def test_leaf_and_depth(tree):
+    """测试末级标记与层级"""
+    assert tree.leaf_ids.tolist() == [1101010001, 1101010002, 1102010000]
+    assert tree.is_leaf_id(1102010000) and not tree.is_leaf_id(1101010000)
+    assert tree.depth.tolist() == CATEGORIES['hierarchy'].tolist()
+    assert tree.parent_of(1101010001) == 1101010000
+    assert tree.parent_of(1101000000) is None
+
+
+def test_ancestors(tree):
+    """测试祖先查询与批量按层级取祖先"""
+    assert tree.ancestors_of(1101010002) == [1101000000, 1101010000]
+    assert tree.ancestors_of(1101000000) == []
+    assert tree.ancestor_at([1101010001, 1102010000, 999], 1).tolist() == [1101000000, 1102000000, -1]
+    assert tree.ancestor_at([1101010001, 1102010000], 3).tolist() == [1101010001, 1102010000]
+
+
+def test_closure_table(tree):
+    """测试闭包表包含自身与全部祖先"""
+    closure = tree.closure_table().to_pandas()
+    assert len(closure) == 6 + 2 + 4
+    rice = closure[closure['descendant_id'] == 1101010001].sort_values('distance')
+    assert rice['ancestor_id'].tolist() == [1101010001, 1101010000, 1101000000]
+    assert rice['distance'].tolist() == [0, 1, 2]
+    assert rice['descendant_is_leaf'].all()
+
+
+def test_cached_per_version(tree):
+    """测试相同内容复用实例，内容变化时重新构建"""
+    assert CategoryTree.from_table(CATEGORIES.copy()) is tree
+    changed = CATEGORIES.assign(weight=[0.5, 0.2, 0.15, 0.05, 0.5, 0.5])
+    assert CategoryTree.from_table(changed).version != tree.version
+
+
+def test_cycle_rejected():
+    """测试父子关系成环时报错"""
+    with pytest.raises(ValueError):
+        CategoryTree([1, 2], [2, 1])
+
+
+def test_save_closure_once_per_version(tree):
+    """测试同一版本的闭包表只写入一次，第二次调用返回 False 且不再写入"""
+    inserted = []
+
+    def execute(query, *args, **kwargs):
+        if 'count()' in query:
+            return [(len(inserted),)]
+        if query.startswith('INSERT INTO category_closure'):
+            inserted.extend(range(len(args[0][0])))
+        return None
+
+    client = MagicMock(spec=['execute'])
+    client.execute.side_effect = execute
+    assert save_closure(client, tree) is True
+    assert len(inserted) == 12
+
+    second = save_closure(client, tree)
+    assert second is False
+    inserts = [c for c in client.execute.call_args_list if c.args[0].startswith('INSERT')]
+    assert len(inserts) == 1
+
+
+def test_empty_tree():
+    """测试空分类集合得到空索引而不是误报成环"""
+    tree = CategoryTree([], [])
+    assert tree.depth.tolist() == []
+    assert tree.leaf_ids.tolist() == []
+    assert tree.closure_table().num_rows == 0
+
+
+def test_calculator_picks_up_new_tree_version():
+    """测试长期运行的计算器在分类表更新后使用新版本的分类树"""
+    def category_result(weights):
+        return ([np.array(CATEGORIES['id'], dtype=np.uint64), np.array(CATEGORIES['parent'], dtype=object),
+                 np.array(weights)], [('id', 'UInt64'), ('parent', 'Nullable(UInt64)'), ('weight', 'Float64')])
+
+    client = MagicMock(spec=['execute'])
+    client.execute.return_value = category_result(CATEGORIES['weight'])
+    calculator = CPICalculator(db_config={})
+    calculator.clickhouse_pool = ConnectionPool(lambda: client)
+
+    first = calculator.category_tree
+    assert calculator.category_tree is first
+    client.execute.return_value = category_result([0.5, 0.2, 0.15, 0.05, 0.5, 0.5])
+    assert calculator.category_tree.version != first.version
@@ -0,0 +1,66 @@
+# tests/cpi_calculator/test_changelog.py
+import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from src.cpi_calculator.changelog import ChangeLogStore, convert_daily_csv
+from src.cpi_calculator.readers import read_prices
+
+# 每天的 (product_id, category_id, price)；商品 1 出现两次，第二天调价，第三天商品 2 移出、商品 4 加入
+DAYS = {
+    '20250517': [(1, 11, 10.0), (1, 11, 10.0), (2, 11, 20.0), (3, 12, 30.0)],
+    '20250518': [(1, 11, 11.0), (1, 11, 11.0), (2, 11, 20.0), (3, 12, 30.0)],
+    '20250519': [(1, 11, 11.0), (3, 12, 30.0), (3, 12, 30.0), (4, 12, 40.0)],
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for day, rows in DAYS.items():
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        lines = ['product_id,category_id,name,price,change_date']
+        lines += [f'{pid},{cid},商品_{pid},{price},{iso}' for pid, cid, price in rows]
+        (tmp_path / f'daily_prices_{day}.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return tmp_path
+
+
+def rows(table):
+    return sorted(zip(*[table.column(c).to_pylist() for c in ['product_id', 'category_id', 'price', 'change_date']]))
+
+
+def test_round_trip_every_day(data_dir, tmp_path):
+    """测试重建的每日价格表与原文件（按多重集合）一致"""
+    paths = sorted(data_dir.glob('daily_prices_*.csv'))
+    store = convert_daily_csv(paths, tmp_path / 'store')
+
+    for path in paths:
+        day = datetime.datetime.strptime(path.name[13:21], '%Y%m%d').date()
+        snapshot = ChangeLogStore(tmp_path / 'store').snapshot(day)
+        assert rows(snapshot) == rows(read_prices(path))
+    assert snapshot.schema == read_prices(paths[0]).schema
+    assert store.last_date == datetime.date(2025, 5, 19)
+
+
+def test_events_record_changes_only(data_dir, tmp_path):
+    """测试事件只记录变化的键：调价为 removed + added，次数变化为 count"""
+    convert_daily_csv(sorted(data_dir.glob('daily_prices_*.csv')), tmp_path / 'store')
+    events = pq.read_table(tmp_path / 'store' / 'events' / '2025-05.parquet')
+    day2 = events.filter(pc.equal(events.column('date'), pa.scalar(datetime.date(2025, 5, 18))))
+
+    assert sorted(zip(day2.column('product_id').to_pylist(), day2.column('kind').to_pylist())) == [
+        (1, 'added'), (1, 'removed')
+    ]
+    # 第三天：商品 1 次数 2->1、商品 3 次数 1->2、商品 2 移出、商品 4 加入
+    assert events.num_rows == 2 + 4
+
+
+def test_append_out_of_order_rejected(data_dir, tmp_path):
+    """测试只能按日期顺序追加"""
+    store = convert_daily_csv(sorted(data_dir.glob('daily_prices_*.csv')), tmp_path / 'store')
+    with pytest.raises(ValueError):
+        store.append('2025-05-18', read_prices(data_dir / 'daily_prices_20250518.csv'))
+    with pytest.raises(KeyError):
+        store.snapshot('2025-05-20')
@@ -0,0 +1,100 @@
+# tests/cpi_calculator/test_chunking.py
+import threading
+import time
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pytest
+
+from src.cpi_calculator.chunking import AdaptiveRangeLoader
+
+
+class FakeSource:
+    """每天固定行数的数据源，记录每次查询的范围与同时执行的查询数"""
+
+    def __init__(self, rows_per_day=100, delay=0.0, fail=None):
+        self.rows_per_day = rows_per_day
+        self.delay = delay
+        self.fail = fail or (lambda start, end: False)
+        self.calls = []
+        self.running = self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, start, end):
+        with self.lock:
+            self.calls.append((start, end))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if self.fail(start, end):
+                raise RuntimeError('Memory limit exceeded')
+            first, last = date.fromisoformat(start), date.fromisoformat(end)
+            days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+            return pa.table({'date': pa.array([d for d in days for _ in range(self.rows_per_day)], pa.date32()),
+                             'price': pa.array([1.0] * (len(days) * self.rows_per_day))})
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_short_range_single_query():
+    """测试短范围不分段"""
+    source = FakeSource()
+    table = AdaptiveRangeLoader(source).load('2025-05-17', '2025-05-19')
+    assert source.calls == [('2025-05-17', '2025-05-19')]
+    assert table.num_rows == 300
+
+
+def test_long_range_sized_by_estimated_rows():
+    """测试长范围先探测首日，之后按目标行数分段，结果按日期顺序合并"""
+    source = FakeSource(rows_per_day=100, delay=0.01)
+    loader = AdaptiveRangeLoader(source, target_rows=1000, max_workers=4)
+    table = loader.load('2025-01-01', '2025-03-31')
+
+    assert source.calls[0] == ('2025-01-01', '2025-01-01')
+    assert source.calls[1] == ('2025-01-02', '2025-01-11')
+    assert table.num_rows == 90 * 100
+    dates = table.column('date').to_pylist()
+    assert dates == sorted(dates)
+    assert source.max_running > 1
+
+
+def test_memory_budget_limits_parallelism():
+    """测试在途分段的估计内存不超过预算"""
+    source = FakeSource(rows_per_day=100, delay=0.01)
+    probe = source('2025-01-01', '2025-01-01')
+    # 预算只够一个 10 天分段
+    loader = AdaptiveRangeLoader(source, target_rows=1000, max_workers=4, memory_budget=probe.nbytes * 15)
+    loader.load('2025-01-01', '2025-02-28')
+    assert source.max_running == 1
+
+
+def test_failed_chunk_retried_then_split():
+    """测试失败的分段重试后拆分，只有失败的日期被重新读取"""
+    attempts = []
+
+    def fail(start, end):
+        # 含 2025-01-15 且跨度超过 2 天的查询总是失败
+        failing = start <= '2025-01-15' <= end and start != end and date.fromisoformat(end) - date.fromisoformat(
+            start) > timedelta(days=2)
+        attempts.append(failing)
+        return failing
+
+    source = FakeSource(rows_per_day=10, fail=fail)
+    loader = AdaptiveRangeLoader(source, target_rows=100, max_retries=1, backoff=0)
+    table = loader.load('2025-01-01', '2025-01-31')
+
+    assert table.num_rows == 31 * 10
+    assert table.column('date').to_pylist() == sorted(table.column('date').to_pylist())
+    assert any(attempts)
+    # 只有失败分段内的日期被重复读取
+    reread = [(s, e) for s, e in source.calls if s >= '2025-01-12' and e <= '2025-01-21']
+    assert len(reread) > 2
+
+
+def test_single_day_failure_raises():
+    """测试单日分段重试后仍失败时抛出异常"""
+    source = FakeSource(fail=lambda start, end: True)
+    with pytest.raises(RuntimeError):
+        AdaptiveRangeLoader(source, max_retries=1, backoff=0).load('2025-01-01', '2025-01-01')
@@ -0,0 +1,55 @@
+# tests/cpi_calculator/test_columnar.py
+import numpy as np
+import pyarrow as pa
+from unittest.mock import MagicMock
+
+from src.cpi_calculator.columnar import PRICE_SCHEMA, cast_table, fetch_arrow
+
+
+def make_client(columns, column_types):
+    """模拟 clickhouse_driver 以列式 + NumPy 模式返回的结果"""
+    client = MagicMock()
+    client.execute.return_value = (columns, column_types)
+    return client
+
+
+def test_fetch_arrow_casts_to_schema():
+    """测试列式结果按显式类型映射转换"""
+    client = make_client(
+        [
+            np.array([1, 2], dtype=np.uint64),
+            np.array([11, 12], dtype=np.uint32),
+            np.array([3.2, 4.81], dtype=np.float64),
+            np.array(['2025-05-17', '2025-05-18'], dtype='datetime64[D]'),
+        ],
+        [('product_id', 'UInt64'), ('category_id', 'UInt32'), ('price', 'Float64'), ('date', 'Date')]
+    )
+
+    table = fetch_arrow(client, 'SELECT ...', {'start': '2025-05-17'}, schema=PRICE_SCHEMA)
+
+    assert table.schema == PRICE_SCHEMA
+    assert table.column('product_id').to_pylist() == [1, 2]
+    kwargs = client.execute.call_args.kwargs
+    assert kwargs['columnar'] is True
+    assert kwargs['settings']['use_numpy'] is True
+
+
+def test_fetch_arrow_empty_result():
+    """测试空结果仍返回带类型的空表"""
+    client = make_client([], [('product_id', 'UInt64'), ('category_id', 'UInt32'),
+                              ('price', 'Float64'), ('date', 'Date')])
+
+    table = fetch_arrow(client, 'SELECT ...', schema=PRICE_SCHEMA)
+
+    assert table.num_rows == 0
+    assert table.schema == PRICE_SCHEMA
+
+
+def test_cast_table_keeps_undeclared_columns():
+    """测试未声明类型的列保持原样"""
+    table = pa.table({'product_id': pa.array([1], pa.uint32()), 'name': ['大米_1']})
+
+    table = cast_table(table, PRICE_SCHEMA)
+
+    assert table.schema.field('product_id').type == pa.int64()
+    assert table.schema.field('name').type == pa.string()
@@ -0,0 +1,70 @@
+# tests/cpi_calculator/test_compression.py
+import csv
+import gzip
+
+import pytest
+
+from src.cpi_calculator.compression import compression_of, is_csv, open_binary, open_text, strip_compression_suffix
+from src.cpi_calculator.loader import LocalDataLoader
+from src.cpi_calculator.readers import read_prices
+
+ROWS = [
+    ['product_id', 'category_id', 'name', 'price', 'change_date'],
+    ['290471015057', '1101010001', '大米_195', '3.2', '2025-05-17'],
+    ['959716720904', '1101010002', '面粉_8', '4.81', '2025-05-17'],
+]
+
+
+def test_suffix_helpers():
+    """测试按扩展名识别压缩格式"""
+    assert compression_of('daily_prices_20250517.csv.zst') == 'zstd'
+    assert compression_of('daily_prices_20250517.CSV.GZ') == 'gzip'
+    assert compression_of('daily_prices_20250517.csv') is None
+    assert strip_compression_suffix('a.csv.gz') == 'a.csv'
+    assert is_csv('a.csv.zst') and is_csv('a.csv') and not is_csv('a.txt.gz')
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.csv.gz', '.csv.zst'])
+def test_text_round_trip(tmp_path, suffix):
+    """测试文本读写往返，压缩文件与未压缩文件内容一致"""
+    path = tmp_path / f'daily_prices_20250517{suffix}'
+    with open_text(path, 'w', newline='') as f:
+        csv.writer(f).writerows(ROWS)
+    with open_text(path, newline='') as f:
+        assert list(csv.reader(f)) == ROWS
+
+    table = read_prices(path)
+    assert table.num_rows == 2
+    assert table.column('price').to_pylist() == [3.2, 4.81]
+
+
+def test_gzip_written_file_is_standard(tmp_path):
+    """测试写出的 .gz 可被标准 gzip 工具读取"""
+    path = tmp_path / 'a.csv.gz'
+    with open_binary(path, 'wb') as f:
+        f.write(b'a,b\n1,2\n')
+    assert gzip.decompress(path.read_bytes()) == b'a,b\n1,2\n'
+
+
+def test_local_loader_reads_compressed_files(tmp_path):
+    """测试本地加载器同时识别 .csv、.csv.gz 与 .csv.zst 每日文件"""
+    for day, suffix in [('20250517', '.csv'), ('20250518', '.csv.gz'), ('20250519', '.csv.zst')]:
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        with open_text(tmp_path / f'daily_prices_{day}{suffix}', 'w', newline='') as f:
+            csv.writer(f).writerows([ROWS[0], ROWS[1][:4] + [iso]])
+
+    df = LocalDataLoader(tmp_path).load_price_data('2025-05-17', '2025-05-19')
+    assert len(df) == 3
+    assert df['date'].dt.strftime('%Y%m%d').tolist() == ['20250517', '20250518', '20250519']
+
+
+def test_local_loader_rejects_duplicate_encodings(tmp_path):
+    """测试同一天同时存在 .csv 与 .csv.zst 时报错，而不是把该日数据读取两次"""
+    for suffix in ['.csv', '.csv.zst']:
+        with open_text(tmp_path / f'daily_prices_20250517{suffix}', 'w', newline='') as f:
+            csv.writer(f).writerows(ROWS)
+
+    with pytest.raises(ValueError, match='2025-05-17'):
+        LocalDataLoader(tmp_path).load_price_data('2025-05-17', '2025-05-17')
+    # 范围外的重复不影响
+    assert LocalDataLoader(tmp_path).load_price_data('2025-05-18', '2025-05-18').empty
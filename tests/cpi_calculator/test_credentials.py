@@ -0,0 +1,110 @@
+# tests/cpi_calculator/test_credentials.py
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.cpi_calculator.calculator import CPICalculator
+from src.cpi_calculator.credentials import CachedCredentials, clear_credentials_cache
+from src.cpi_calculator.loader import SecureOSSDataLoader
+
+OSS_CONF = {'endpoint': 'e', 'bucket': 'b', 'sts_role_arn': 'acs:ram::1:role/cpi'}
+
+
+@pytest.fixture
+def sts():
+    with patch('src.cpi_calculator.credentials.StsClient') as sts:
+        sts.return_value.assume_role.return_value = MagicMock(
+            access_key_id='ak', access_key_secret='sk', security_token='token', expiration=None
+        )
+        yield sts
+    clear_credentials_cache()
+
+
+def test_loader_construction_does_not_connect(sts):
+    """测试创建加载器时不请求 STS、不创建 OSS 客户端"""
+    with patch('src.cpi_calculator.loader.OssClient') as oss:
+        SecureOSSDataLoader(OSS_CONF, {'host': 'localhost'})
+
+    sts.assert_not_called()
+    oss.assert_not_called()
+
+
+def test_credentials_shared_across_loaders(sts):
+    """测试同一角色的多个加载器复用同一份凭证与 OSS 客户端"""
+    with patch('src.cpi_calculator.loader.OssClient') as oss:
+        first = SecureOSSDataLoader(OSS_CONF, {'host': 'localhost'})
+        second = SecureOSSDataLoader(OSS_CONF, {'host': 'localhost'})
+        assert first.oss_client is first.oss_client
+        second.oss_client
+
+    assert sts.return_value.assume_role.call_count == 1
+    assert oss.call_count == 2
+
+
+def test_expired_credentials_refetched_synchronously():
+    """测试凭证过期后在下一次 get() 时同步重新获取"""
+    expired = MagicMock(expiration=datetime.now(timezone.utc) - timedelta(seconds=1))
+    fresh = MagicMock(expiration=(datetime.now(timezone.utc) + timedelta(hours=1)).isoformat())
+    cache = CachedCredentials(MagicMock(side_effect=[expired, fresh]))
+    try:
+        assert cache.get() is expired
+        assert cache.get() is fresh
+        assert cache.get() is fresh
+        assert cache.fetch.call_count == 2
+    finally:
+        cache.close()
+
+
+def test_background_refresh_before_expiry():
+    """测试临近过期时后台线程提前刷新，调用方无需等待"""
+    fetch = MagicMock(side_effect=lambda: MagicMock(expiration=None))
+    cache = CachedCredentials(fetch, refresh_margin=0.95, default_ttl=1.0, retry_interval=0.01)
+    try:
+        first = cache.get()
+        time.sleep(0.2)
+        assert fetch.call_count >= 2
+        assert cache.get() is not first
+    finally:
+        cache.close()
+
+
+def test_background_refresh_does_not_block_get():
+    """测试后台刷新的 STS 请求在锁外进行，请求期间 get() 立即返回旧凭证"""
+    first = MagicMock(expiration=None)
+    fetching, release = threading.Event(), threading.Event()
+
+    def fetch():
+        if fetch.calls:
+            fetching.set()
+            release.wait(5)
+        fetch.calls += 1
+        return first if fetch.calls == 1 else MagicMock(expiration=None)
+
+    fetch.calls = 0
+    cache = CachedCredentials(fetch, refresh_margin=0.95, default_ttl=1.0, retry_interval=0.01)
+    try:
+        assert cache.get() is first
+        assert fetching.wait(5)
+        started = time.monotonic()
+        assert cache.get() is first
+        assert time.monotonic() - started < 0.5
+        release.set()
+        deadline = time.monotonic() + 5
+        while cache.get() is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get() is not first
+    finally:
+        release.set()
+        cache.close()
+
+
+def test_calculator_connects_lazily():
+    """测试计算器在首次使用时才创建 SQLAlchemy 引擎"""
+    with patch('src.cpi_calculator.calculator.create_engine') as create_engine:
+        calculator = CPICalculator({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        create_engine.assert_not_called()
+        assert calculator.sqlalchemy_engine is calculator.sqlalchemy_engine
+    create_engine.assert_called_once()
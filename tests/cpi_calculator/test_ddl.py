@@ -0,0 +1,44 @@
+# tests/cpi_calculator/test_ddl.py
+import re
+
+from src.cpi_calculator.calculator import CATEGORY_TREE_COLUMNS
+from src.cpi_calculator.ddl import schema_ddl, table_ddl
+from src.cpi_calculator.schemas import Category, Price
+
+
+def test_price_table_layout():
+    """测试 price 表按月分区、按分类/商品/日期排序并带编码与跳数索引"""
+    ddl = table_ddl(Price)
+
+    assert 'PARTITION BY toYYYYMM(date)' in ddl
+    assert ddl.endswith('ORDER BY (category_id, product_id, date)')
+    assert 'name LowCardinality(Nullable(String))' in ddl
+    assert 'date Date CODEC(DoubleDelta, ZSTD(1))' in ddl
+    assert 'INDEX idx_product_id product_id TYPE bloom_filter(0.01) GRANULARITY 4' in ddl
+
+
+def test_sort_key_columns_not_nullable():
+    """测试排序键列不生成 Nullable 类型"""
+    category_ddl, price_ddl = schema_ddl()
+    assert 'product_id UInt64' in price_ddl
+    assert 'parent Nullable(UInt64)' in category_ddl
+    assert 'id UInt64' in category_ddl
+
+
+def test_rename_applies_to_keys():
+    """测试列重命名同时作用于分区键与排序键"""
+    ddl = table_ddl(Price, 'daily_price', rename={'date': 'change_date'}, database='cpi')
+
+    assert ddl.startswith('CREATE TABLE IF NOT EXISTS cpi.daily_price')
+    assert 'PARTITION BY toYYYYMM(change_date)' in ddl
+    assert 'ORDER BY (category_id, product_id, change_date)' in ddl
+    assert ' date ' not in ddl
+
+
+def test_category_columns_match_calculator_query():
+    """测试 category 表的列名与 CPICalculator 读取分类树的列一致（模型的 parent_id 建为 parent）"""
+    ddl = table_ddl(Category)
+    body = ddl[ddl.index('(') + 1:ddl.rindex(')\nENGINE')]
+    columns = {re.match(r'\s*(\w+)', line).group(1) for line in body.split(',\n') if line.strip()}
+    assert set(CATEGORY_TREE_COLUMNS) <= columns
+    assert 'parent_id' not in columns
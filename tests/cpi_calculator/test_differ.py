@@ -0,0 +1,75 @@
+# tests/cpi_calculator/test_differ.py
+import pyarrow as pa
+
+from src.cpi_calculator.compression import open_text
+from src.cpi_calculator.differ import diff_prices, update_products_file, write_csv
+from src.cpi_calculator.readers import read_prices, read_products
+
+PRICE_HEADER = 'product_id,category_id,name,price,change_date\n'
+PRODUCTS = (
+    'product_id,category_id,name,weight,price,change_count\n'
+    '1,1101010001,大米_1,0.5,3.2,0\n'
+    '2,1101010001,大米_2,0.3,4.0,0\n'
+    '3,1101010002,面粉_1,0.2,2.5,1\n'
+)
+
+
+def _prices(tmp_path, day, rows):
+    path = tmp_path / f'daily_prices_{day}.csv'
+    iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+    path.write_text(PRICE_HEADER + ''.join(f'{pid},1101010001,商品_{pid},{price},{iso}\n' for pid, price in rows),
+                    encoding='utf-8')
+    return read_prices(path)
+
+
+def test_diff_prices_kinds(tmp_path):
+    """测试调价、新增、消失三类事件；重复出现的商品取最后出现的价格"""
+    old = _prices(tmp_path, '20250517', [(1, 3.2), (2, 4.0), (3, 2.5), (1, 3.2)])
+    new = _prices(tmp_path, '20250518', [(1, 3.2), (2, 4.1), (4, 9.9), (2, 4.3)])
+
+    events = diff_prices(old, new).to_pylist()
+    assert [(e['product_id'], e['kind'], e['old_price'], e['new_price']) for e in events] == [
+        (2, 'price_change', 4.0, 4.3),
+        (3, 'removed', 2.5, None),
+        (4, 'added', None, 9.9),
+    ]
+    assert str(events[0]['date']) == '2025-05-18'
+
+
+def test_diff_identical_days_is_empty(tmp_path):
+    """测试价格不变时无事件"""
+    old = _prices(tmp_path, '20250517', [(1, 3.2), (2, 4.0)])
+    new = _prices(tmp_path, '20250518', [(2, 4.0), (1, 3.2)])
+    assert diff_prices(old, new).num_rows == 0
+
+
+def test_apply_events_updates_price_and_count(tmp_path):
+    """测试调价写入商品表，未知商品追加，重复应用不重复计数"""
+    path = tmp_path / 'products.csv'
+    path.write_text(PRODUCTS, encoding='utf-8')
+    old = _prices(tmp_path, '20250517', [(1, 3.2), (3, 2.5)])
+    new = _prices(tmp_path, '20250518', [(1, 3.5), (2, 4.0), (5, 1.0)])
+    events = diff_prices(old, new)
+
+    assert update_products_file(path, events) == 1
+    assert update_products_file(path, events) == 0
+    products = read_products(path).to_pydict()
+    assert products['product_id'] == [1, 2, 3, 5]
+    assert products['price'] == [3.5, 4.0, 2.5, 1.0]
+    assert products['change_count'] == [1, 0, 1, 0]
+    assert products['weight'][-1] is None
+    # 未修改的行保持原有格式
+    assert path.read_text(encoding='utf-8').splitlines()[2:4] == PRODUCTS.splitlines()[2:4]
+
+
+
+def test_write_csv_compresses_by_target_suffix(tmp_path):
+    """测试写出 .csv.gz / .csv.zst 时按目标文件扩展名压缩，而不是按临时文件名写成明文"""
+    table = pa.table({'product_id': [1, 2], 'price': [3.5, 4.0]})
+    for suffix, magic in [('.csv.gz', b'\x1f\x8b'), ('.csv.zst', b'\x28\xb5\x2f\xfd')]:
+        path = tmp_path / f'products{suffix}'
+        write_csv(table, path)
+        assert path.read_bytes()[:4].startswith(magic)
+        with open_text(path) as f:
+            assert f.read() == 'product_id,price\n1,3.5\n2,4.0\n'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['products.csv.gz', 'products.csv.zst']
@@ -0,0 +1,117 @@
+# tests/cpi_calculator/test_fetcher.py
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.cpi_calculator.credentials import clear_credentials_cache
+from src.cpi_calculator.fetcher import ConcurrentFetcher, LocalObjectStore, is_missing_object
+from src.cpi_calculator.loader import SecureOSSDataLoader
+
+
+@pytest.fixture
+def store(tmp_path):
+    """以本地目录模拟的 OSS，存放三天的分区价格对象"""
+    store = LocalObjectStore(tmp_path / 'bucket')
+    for day in ['2025-05-17', '2025-05-18', '2025-05-19']:
+        source = tmp_path / f'{day}.csv'
+        source.write_text(
+            'product_id,category_id,name,price,change_date\n'
+            f'1,1101010001,大米_1,3.2,{day}\n',
+            encoding='utf-8'
+        )
+        store.put_object_from_file(f'data/prices/date={day}/prices.csv', source)
+    return store
+
+
+def test_fetch_runs_concurrently():
+    """测试多个对象并发下载，总耗时接近最慢的单个对象"""
+    def slow_get(key):
+        time.sleep(0.2)
+        return key.encode()
+
+    fetcher = ConcurrentFetcher(slow_get, max_workers=8)
+    started = time.perf_counter()
+    results = fetcher.fetch_all([f'k{i}' for i in range(8)])
+
+    assert time.perf_counter() - started < 0.8
+    assert results['k3'] == b'k3'
+
+
+def test_fetch_retries_then_succeeds():
+    """测试失败后重试"""
+    attempts = {'count': 0}
+
+    def flaky_get(key):
+        attempts['count'] += 1
+        if attempts['count'] < 3:
+            raise ConnectionError('timeout')
+        return b'ok'
+
+    fetcher = ConcurrentFetcher(flaky_get, max_retries=3, backoff=0)
+    assert fetcher.fetch_all(['a']) == {'a': b'ok'}
+    assert attempts['count'] == 3
+
+
+def test_fetch_raises_after_retries():
+    """测试重试耗尽后抛出异常"""
+    fetcher = ConcurrentFetcher(MagicMock(side_effect=ConnectionError('down')), max_retries=1, backoff=0)
+    with pytest.raises(ConnectionError):
+        fetcher.fetch_all(['a'])
+
+
+def test_fetch_skips_missing_objects():
+    """测试不存在的对象不重试，按无数据跳过"""
+    class NoSuchKey(Exception):
+        pass
+
+    calls = []
+
+    def get(key):
+        calls.append(key)
+        if key == 'b':
+            raise NoSuchKey(key)
+        return b'ok'
+
+    fetcher = ConcurrentFetcher(get, max_retries=3, backoff=0, is_missing=is_missing_object)
+    assert fetcher.fetch_all(['a', 'b', 'c']) == {'a': b'ok', 'c': b'ok'}
+    assert calls.count('b') == 1
+
+
+def test_fetch_backpressure_limits_in_flight():
+    """测试调用方未消费时提交的任务数不超过 max_pending"""
+    lock = threading.Lock()
+    started = []
+
+    def get(key):
+        with lock:
+            started.append(key)
+        return b''
+
+    fetcher = ConcurrentFetcher(get, max_workers=2, max_pending=3)
+    iterator = fetcher.iter_fetch([f'k{i}' for i in range(20)])
+    next(iterator)
+    time.sleep(0.1)
+
+    assert len(started) <= 4
+    iterator.close()
+
+
+def test_loader_fetches_price_objects_from_store(store):
+    """测试加载器基于本地模拟存储并发下载每日对象"""
+    with patch('src.cpi_calculator.credentials.StsClient') as sts, \
+            patch('src.cpi_calculator.loader.OssClient', return_value=store):
+        sts.return_value.assume_role.return_value = MagicMock(expiration=None)
+        loader = SecureOSSDataLoader(
+            {'endpoint': 'localhost:9000', 'bucket': 'test-bucket', 'sts_role_arn': '', 'max_concurrency': 2},
+            {'host': 'localhost'}
+        )
+        df = loader.load_price_objects('2025-05-17', '2025-05-19')
+        # 2025-05-20 没有对象，视为当天无数据
+        with_gap = loader.load_price_objects('2025-05-18', '2025-05-20')
+    clear_credentials_cache()
+
+    assert len(df) == 3
+    assert len(with_gap) == 2
+    assert df['date'].is_monotonic_increasing
@@ -0,0 +1,157 @@
+# tests/cpi_calculator/test_ingest.py
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from unittest.mock import MagicMock
+
+from src.cpi_calculator.columnar import insert_arrow
+from src.cpi_calculator.compression import open_text
+from src.cpi_calculator.ingest import ClickHouseSink, IngestManifest, find_source_files, ingest_files
+from src.cpi_calculator.pool import ConnectionPool
+
+
+class RecordingSink:
+    """记录写入块的内存替身"""
+
+    def __init__(self):
+        self.inserts = []
+        self._lock = threading.Lock()
+
+    def execute(self, query):
+        pass
+
+    def insert(self, table_name, table):
+        with self._lock:
+            self.inserts.append((table_name, table))
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    for day in ['20250517', '20250518']:
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        lines = ['product_id,category_id,name,price,change_date']
+        lines += [f'{pid},11,商品_{pid},{pid}.5,{iso}' for pid in range(1, 6)]
+        (tmp_path / f'daily_prices_{day}.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (tmp_path / 'products.csv').write_text(
+        'product_id,category_id,name,weight,price,change_count\n'
+        '1,11,商品_1,0.5,1.5,0\n',
+        encoding='utf-8'
+    )
+    (tmp_path / 'categories.csv').write_text('食品,1,1,1.0,null,null\n', encoding='utf-8')
+    return tmp_path
+
+
+def test_find_source_files(source_dir):
+    """测试按文件名识别目标表"""
+    files = find_source_files(source_dir)
+    assert [(t, p.name) for t, p in files] == [
+        ('daily_price', 'daily_prices_20250517.csv'),
+        ('daily_price', 'daily_prices_20250518.csv'),
+        ('products', 'products.csv'),
+    ]
+
+
+def test_ingest_files_batches_and_reports(source_dir):
+    """测试按 batch_rows 分块写入并统计行数"""
+    sink = RecordingSink()
+    report = ingest_files(sink, find_source_files(source_dir), max_workers=2, batch_rows=2)
+
+    price_chunks = [t for name, t in sink.inserts if name == 'daily_price']
+    assert sorted(t.num_rows for t in price_chunks) == [1, 1, 2, 2, 2, 2]
+    assert price_chunks[0].schema.field('change_date').type == pa.date32()
+    assert report['files'] == 3
+    assert report['rows'] == 11
+    assert report['rows_per_sec'] > 0
+
+
+def test_insert_arrow_uses_numpy_columns():
+    """测试 clickhouse_driver 客户端以 NumPy 列块写入"""
+    client = MagicMock(spec=['execute'])
+    table = pa.table({'product_id': [1, 2], 'price': [1.5, 2.5]})
+    insert_arrow(client, 'daily_price', table)
+
+    query, columns = client.execute.call_args.args
+    assert query == 'INSERT INTO daily_price (product_id, price) VALUES'
+    assert isinstance(columns[0], np.ndarray)
+    assert client.execute.call_args.kwargs['columnar'] is True
+
+
+def test_clickhouse_sink_prefers_arrow_insert():
+    """测试 clickhouse_connect 客户端直接以 Arrow 写入"""
+    client = MagicMock()
+    table = pa.table({'product_id': [1]})
+    ClickHouseSink(ConnectionPool(lambda: client)).insert('products', table)
+
+    client.insert_arrow.assert_called_once_with('products', table, settings=None)
+
+
+def test_manifest_skips_unchanged_files(source_dir):
+    """测试再次运行时未变化的文件不再读取与写入"""
+    manifest = IngestManifest(source_dir / '.ingest_manifest.json')
+    ingest_files(RecordingSink(), find_source_files(source_dir), manifest=manifest)
+
+    sink = RecordingSink()
+    report = ingest_files(sink, find_source_files(source_dir),
+                          manifest=IngestManifest(source_dir / '.ingest_manifest.json'))
+
+    assert sink.inserts == []
+    assert report['skipped'] == 3
+    assert report['watermarks'] == {'daily_price': '2025-05-18'}
+
+
+def test_manifest_replaces_changed_day(source_dir):
+    """测试每日文件内容变化时先删除该日数据再写入，仅修改时间变化时不重新导入"""
+    manifest = IngestManifest(source_dir / '.ingest_manifest.json')
+    ingest_files(RecordingSink(), find_source_files(source_dir), manifest=manifest)
+
+    touched = source_dir / 'daily_prices_20250517.csv'
+    os.utime(touched, ns=(1, 1))
+    changed = source_dir / 'daily_prices_20250518.csv'
+    changed.write_text(changed.read_text(encoding='utf-8').replace('1.5,', '1.6,'), encoding='utf-8')
+
+    sink = RecordingSink()
+    sink.execute = MagicMock()
+    report = ingest_files(sink, find_source_files(source_dir), manifest=manifest)
+
+    assert report['files'] == 1
+    assert 'toDate(\'2025-05-18\')' in sink.execute.call_args.args[0]
+    assert manifest.files['2025-05-18']['status'] == 'done'
+
+
+def test_manifest_keyed_by_date_across_encodings(source_dir):
+    """测试已导入的每日文件改为压缩存放后不重新导入，清单按日期记录当前文件名"""
+    manifest = IngestManifest(source_dir / '.ingest_manifest.json')
+    ingest_files(RecordingSink(), find_source_files(source_dir), manifest=manifest)
+
+    plain = source_dir / 'daily_prices_20250517.csv'
+    with open_text(source_dir / 'daily_prices_20250517.csv.zst', 'w', newline='') as f:
+        f.write(plain.read_text(encoding='utf-8'))
+    plain.unlink()
+
+    sink = RecordingSink()
+    manifest = IngestManifest(source_dir / '.ingest_manifest.json')
+    report = ingest_files(sink, find_source_files(source_dir), manifest=manifest)
+
+    assert sink.inserts == []
+    assert report['skipped'] == 3
+    assert manifest.files['2025-05-17']['file'] == 'daily_prices_20250517.csv.zst'
+
+
+def test_manifest_reads_file_name_keys(source_dir):
+    """测试旧版以文件名为键的清单按日期读取"""
+    path = source_dir / '.ingest_manifest.json'
+    path.write_text('{"files": {"daily_prices_20250517.csv": {"status": "done"}}, "watermarks": {}}',
+                    encoding='utf-8')
+    assert list(IngestManifest(path).files) == ['2025-05-17']
+
+
+def test_find_source_files_rejects_duplicate_encodings(source_dir):
+    """测试同一天存在多种编码的价格文件时报错"""
+    plain = source_dir / 'daily_prices_20250518.csv'
+    with open_text(source_dir / 'daily_prices_20250518.csv.gz', 'w', newline='') as f:
+        f.write(plain.read_text(encoding='utf-8'))
+    with pytest.raises(ValueError, match='daily_prices_20250518.csv, daily_prices_20250518.csv.gz'):
+        find_source_files(source_dir)
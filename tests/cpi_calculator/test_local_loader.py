@@ -0,0 +1,65 @@
+# tests/cpi_calculator/test_local_loader.py
+import pytest
+import pandas as pd
+
+from src.cpi_calculator.loader import LocalDataLoader
+
+
+PRICE_HEADER = 'product_id,category_id,name,price,change_date\n'
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """创建包含三天价格文件和分类文件的临时目录"""
+    for day, price in [('20250517', 3.2), ('20250518', 3.3), ('20250519', 3.4)]:
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        (tmp_path / f'daily_prices_{day}.csv').write_text(
+            PRICE_HEADER
+            + f'290471015057,1101010001,大米_195,{price},{iso}\n'
+            + f'959716720904,1101010002,面粉_8,4.81,{iso}\n',
+            encoding='utf-8'
+        )
+    # 与日期模式不匹配的文件应被忽略
+    (tmp_path / 'daily_prices.csv').write_text(PRICE_HEADER, encoding='utf-8')
+    (tmp_path / 'categories.csv').write_text(
+        '食品,1101000000,1,0.1869,null,null\n'
+        '粮食,1101010000,2,0.0075,null,1101000000\n'
+        '大米,1101010001,3,0.0061,3.67,1101010000\n',
+        encoding='utf-8'
+    )
+    return tmp_path
+
+
+def test_select_price_files_by_date(data_dir):
+    """测试按文件名日期筛选"""
+    loader = LocalDataLoader(data_dir)
+    paths = loader._select_price_files('2025-05-18', '2025-05-19')
+    assert [p.name for p in paths] == ['daily_prices_20250518.csv', 'daily_prices_20250519.csv']
+
+
+def test_load_price_data(data_dir):
+    """测试并行加载价格数据"""
+    loader = LocalDataLoader(data_dir, max_workers=2)
+    df = loader.load_price_data('2025-05-17', '2025-05-18')
+
+    assert len(df) == 4
+    assert list(df.columns) == ['product_id', 'category_id', 'name', 'price', 'date']
+    assert df['product_id'].dtype == 'int64'
+    assert df['date'].min() == pd.Timestamp('2025-05-17')
+    assert df['date'].max() == pd.Timestamp('2025-05-18')
+
+
+def test_load_price_data_empty_range(data_dir):
+    """测试范围内没有文件时返回空表"""
+    df = LocalDataLoader(data_dir).load_price_data('2024-01-01', '2024-01-31')
+    assert df.empty
+    assert 'date' in df.columns
+
+
+def test_load_category_mapping(data_dir):
+    """测试读取无表头的分类文件"""
+    df = LocalDataLoader(data_dir).load_category_mapping()
+
+    assert len(df) == 3
+    assert df['parent'].isna().sum() == 1
+    assert df.loc[df['id'] == 1101010001, 'parent'].iloc[0] == 1101010000
@@ -0,0 +1,77 @@
+# tests/cpi_calculator/test_parquet_store.py
+import pytest
+import pyarrow.parquet as pq
+
+from src.cpi_calculator.parquet_store import (
+    convert_daily_csv, compact_dataset, detect_granularity, read_price_dataset
+)
+
+
+@pytest.fixture
+def csv_paths(tmp_path):
+    """创建跨月的四个每日价格文件"""
+    paths = []
+    for day in ['20250130', '20250131', '20250201', '20250202']:
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        path = tmp_path / f'daily_prices_{day}.csv'
+        path.write_text(
+            'product_id,category_id,name,price,change_date\n'
+            f'3,1101010002,面粉_3,4.81,{iso}\n'
+            f'1,1101010001,大米_1,3.20,{iso}\n'
+            f'2,1101010001,大米_2,3.41,{iso}\n',
+            encoding='utf-8'
+        )
+        paths.append(path)
+    return paths
+
+
+def test_convert_daily_partitions(tmp_path, csv_paths):
+    """测试按日分区写入且分区内按分类、商品排序"""
+    dataset = tmp_path / 'dataset'
+    written = convert_daily_csv(csv_paths, dataset)
+
+    assert len(written) == 4
+    assert detect_granularity(dataset) == 'day'
+    part = pq.read_table(dataset / 'date=2025-01-30' / 'part-0.parquet')
+    assert 'date' not in part.column_names
+    assert part.column('product_id').to_pylist() == [1, 2, 3]
+
+
+def test_read_prunes_by_date_and_columns(tmp_path, csv_paths):
+    """测试日期范围与列选择下推"""
+    dataset = tmp_path / 'dataset'
+    convert_daily_csv(csv_paths, dataset)
+
+    table = read_price_dataset(dataset, '2025-02-01', '2025-02-28', columns=['product_id', 'price', 'date'])
+    assert table.column_names == ['product_id', 'price', 'date']
+    assert table.num_rows == 6
+    assert {d.isoformat() for d in table.column('date').to_pylist()} == {'2025-02-01', '2025-02-02'}
+
+
+def test_compact_to_monthly(tmp_path, csv_paths):
+    """测试按日分区压实为按月分区"""
+    dataset = tmp_path / 'dataset'
+    convert_daily_csv(csv_paths, dataset)
+    written = compact_dataset(dataset)
+
+    assert sorted(p.name for p in written) == ['month=2025-01', 'month=2025-02']
+    assert detect_granularity(dataset) == 'month'
+    assert not list(dataset.glob('date=*'))
+
+    table = read_price_dataset(dataset, '2025-01-31', '2025-02-01')
+    assert table.num_rows == 6
+
+
+def test_convert_into_monthly_replaces_same_day(tmp_path, csv_paths):
+    """测试向按月数据集重复写入同一天时不会产生重复数据"""
+    dataset = tmp_path / 'dataset'
+    convert_daily_csv(csv_paths, dataset, granularity='month')
+    convert_daily_csv(csv_paths[:1], dataset)
+
+    table = read_price_dataset(dataset, '2025-01-01', '2025-01-31')
+    assert table.num_rows == 6
+
+
+def test_read_empty_dataset(tmp_path):
+    """测试数据集不存在时返回空表"""
+    assert read_price_dataset(tmp_path / 'missing', '2025-01-01', '2025-01-31').num_rows == 0
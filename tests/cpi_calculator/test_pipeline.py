@@ -0,0 +1,130 @@
+# tests/cpi_calculator/test_pipeline.py
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.cpi_calculator.calculator import CPICalculator
+from src.cpi_calculator.loader import LocalDataLoader
+from src.cpi_calculator.pipeline import Pipeline, PipelineCancelled, prefetch
+from src.cpi_calculator.result_store import ResultStore
+
+
+def test_independent_stages_run_concurrently():
+    """测试互不依赖的阶段同时执行，依赖结果按声明顺序传入"""
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline()
+    pipeline.add('prices', lambda: barrier.wait() is not None and 'prices')
+    pipeline.add('categories', lambda: barrier.wait() is not None and 'categories')
+    pipeline.add('indices', lambda *args: args, 'categories', 'prices')
+    assert pipeline.run()['indices'] == ('categories', 'prices')
+
+
+def test_failure_skips_dependents():
+    """测试阶段失败时异常上抛，依赖它的阶段不执行"""
+    downstream = MagicMock()
+    pipeline = Pipeline()
+    pipeline.add('prices', lambda: 1 / 0)
+    pipeline.add('indices', downstream, 'prices')
+    with pytest.raises(ZeroDivisionError):
+        pipeline.run()
+    downstream.assert_not_called()
+
+
+def test_failure_cancels_streaming_stage():
+    """测试阶段失败时正在消费 prefetch 的流式阶段收到取消，数据源被关闭，失败不等待整个流读完"""
+    closed, streaming = threading.Event(), threading.Event()
+
+    def slow_source():
+        try:
+            for i in range(1000):
+                streaming.set()
+                time.sleep(0.05)
+                yield i
+        finally:
+            closed.set()
+
+    def fail():
+        streaming.wait(5)
+        raise ZeroDivisionError
+
+    pipeline = Pipeline()
+    pipeline.add('prices', lambda: sum(prefetch(slow_source(), cancel=pipeline.cancelled)))
+    pipeline.add('categories', fail)
+    started = time.perf_counter()
+    with pytest.raises(ZeroDivisionError):
+        pipeline.run()
+    assert pipeline.cancelled.is_set()
+    assert closed.wait(2)
+    assert time.perf_counter() - started < 5
+
+
+def test_prefetch_cancel():
+    """测试取消事件置位后 prefetch 抛出 PipelineCancelled"""
+    cancel = threading.Event()
+    items = prefetch(iter(range(100)), max_buffered=1, cancel=cancel)
+    assert next(items) == 0
+    cancel.set()
+    with pytest.raises(PipelineCancelled):
+        list(items)
+
+
+def test_unknown_dependency_rejected():
+    with pytest.raises(ValueError):
+        Pipeline().add('indices', print, 'prices')
+
+
+def test_prefetch_order_and_errors():
+    """测试预取保持顺序并转发生产者的异常"""
+    assert list(prefetch(iter(range(100)), max_buffered=2)) == list(range(100))
+
+    def broken():
+        yield 1
+        raise RuntimeError('连接中断')
+
+    items = prefetch(broken())
+    assert next(items) == 1
+    with pytest.raises(RuntimeError):
+        next(items)
+
+
+def test_prefetch_closes_source_on_early_exit():
+    """测试消费者提前退出时关闭源生成器"""
+    closed = threading.Event()
+
+    def source():
+        try:
+            yield from range(1000)
+        finally:
+            closed.set()
+
+    items = prefetch(source(), max_buffered=1)
+    assert next(items) == 0
+    items.close()
+    assert closed.is_set()
+
+
+def test_main_pipeline_with_local_loader(tmp_path):
+    """测试主流程流水线：本地数据计算、保存结果并输出报告"""
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('plotly')
+    from src.cpi_calculator.__main__ import build_pipeline
+
+    for day, prices in (('20250517', (10.0, 20.0)), ('20250518', (11.0, 20.0))):
+        lines = ['product_id,category_id,name,price,change_date']
+        lines += [f'{pid},{cid},商品_{pid},{price},2025-05-{day[-2:]}'
+                  for pid, cid, price in ((1, 11, prices[0]), (2, 12, prices[1]))]
+        (tmp_path / f'daily_prices_{day}.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (tmp_path / 'categories.csv').write_text('食品,1,1,1.0,null,null\n粮食,11,2,0.4,null,1\n油脂,12,2,0.6,null,1\n',
+                                             encoding='utf-8')
+    visualizer = MagicMock()
+    result_store = ResultStore(tmp_path / 'results')
+
+    results = build_pipeline(LocalDataLoader(data_dir=tmp_path), CPICalculator(db_config={}), result_store,
+                             visualizer, '2025-05-17', '2025-05-18', CPICalculator.FORMULA,
+                             str(tmp_path / 'report.html')).run()
+
+    assert results['indices']['index'].tolist() == pytest.approx([1.1, 1.0])
+    headline = visualizer.plot_cpi_trend.call_args.args[0]
+    assert headline['cpi_index'].tolist() == pytest.approx([0.4 * 1.1 + 0.6 * 1.0])
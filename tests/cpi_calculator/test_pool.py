@@ -0,0 +1,151 @@
+# tests/cpi_calculator/test_pool.py
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from src.cpi_calculator.pool import ConnectionPool, PoolTimeoutError, get_clickhouse_pool, close_all_pools
+
+
+def make_pool(**kwargs):
+    """创建使用模拟连接的连接池，返回 (连接池, 已创建的连接列表)"""
+    created = []
+
+    def factory():
+        conn = MagicMock()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(factory, **kwargs), created
+
+
+def test_reuses_released_connection():
+    """测试归还的连接被复用，不重复建立"""
+    pool, created = make_pool(min_size=1, max_size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert len(created) == 1
+
+
+def test_warm_up_creates_connections_outside_lock():
+    """测试预热的 min_size 个连接在锁外创建，创建期间其他线程可以获取连接池的锁"""
+    pool = None
+    lock_free = []
+
+    def try_lock():
+        acquired = pool._lock.acquire(blocking=False)
+        lock_free.append(acquired)
+        if acquired:
+            pool._lock.release()
+
+    def factory():
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        return MagicMock()
+
+    pool = ConnectionPool(factory, min_size=3, max_size=5)
+    with pool.connection():
+        assert pool.size == 3
+    assert lock_free == [True, True, True]
+
+
+def test_concurrent_checkouts_get_distinct_connections():
+    """测试并发借用获得不同连接，且不超过最大连接数"""
+    pool, created = make_pool(min_size=0, max_size=3)
+    barrier = threading.Barrier(3)
+    used = []
+
+    def worker():
+        with pool.connection() as conn:
+            used.append(conn)
+            barrier.wait(timeout=1)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(c) for c in used}) == 3
+    assert pool.size == 3
+
+
+def test_checkout_timeout_when_exhausted():
+    """测试连接全部借出时等待超时"""
+    pool, _ = make_pool(min_size=0, max_size=1)
+    conn = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    pool.release(conn)
+
+
+def test_failed_query_discards_connection():
+    """测试查询出错时丢弃连接"""
+    pool, created = make_pool(min_size=0, max_size=2)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError('socket closed')
+
+    assert pool.size == 0
+    created[0].disconnect.assert_called_once()
+
+
+def test_unhealthy_idle_connection_is_replaced():
+    """测试空闲连接健康检查失败后重新创建"""
+    pool, created = make_pool(min_size=0, max_size=2, health_check_interval=0,
+                              health_check=lambda conn: conn is not created[0])
+    with pool.connection():
+        pass
+    time.sleep(0.01)
+
+    with pool.connection() as conn:
+        assert conn is created[1]
+    assert pool.size == 1
+
+
+def test_idle_connections_evicted_down_to_min_size():
+    """测试空闲超时的连接被回收，但保留最少连接数"""
+    pool, _ = make_pool(min_size=1, max_size=3, idle_timeout=0.01)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    time.sleep(0.02)
+
+    with pool.connection():
+        pass
+
+    assert pool.size == 1
+
+
+def test_shared_pool_per_config():
+    """测试相同配置在进程内共享同一个连接池"""
+    conf = {'host': 'localhost', 'port': 9000}
+    try:
+        assert get_clickhouse_pool(dict(conf)) is get_clickhouse_pool(dict(conf))
+        assert get_clickhouse_pool(conf) is not get_clickhouse_pool({**conf, 'port': 9001})
+    finally:
+        close_all_pools()
+
+
+def test_shared_pool_warns_on_different_kwargs(caplog):
+    """测试共享连接池已存在时传入不同参数记录警告并沿用已有连接池"""
+    conf = {'host': 'localhost', 'port': 9000}
+    try:
+        pool = get_clickhouse_pool(conf, min_size=3, max_size=10)
+        assert get_clickhouse_pool(conf) is pool
+        assert get_clickhouse_pool(conf, min_size=3, max_size=10) is pool
+        assert not caplog.records
+        assert get_clickhouse_pool(conf, min_size=0, max_size=4) is pool
+        assert pool.max_size == 10
+        assert '忽略' in caplog.text
+    finally:
+        close_all_pools()
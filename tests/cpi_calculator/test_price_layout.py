@@ -0,0 +1,88 @@
+# tests/cpi_calculator/test_price_layout.py
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.cpi_calculator.credentials import clear_credentials_cache
+from src.cpi_calculator.loader import SecureOSSDataLoader, price_object_key, price_path_pattern
+from src.cpi_calculator.pool import ConnectionPool
+
+
+OSS_CONF = {'endpoint': 'oss-test', 'bucket': 'test-bucket', 'sts_role_arn': 'role'}
+
+
+@pytest.fixture
+def ch_client():
+    """模拟的 ClickHouse 客户端"""
+    return MagicMock()
+
+
+@pytest.fixture
+def loader(ch_client):
+    """创建依赖全部被模拟的加载器"""
+    with patch('src.cpi_calculator.credentials.StsClient') as sts, \
+            patch('src.cpi_calculator.loader.OssClient'):
+        sts.return_value.assume_role.return_value = MagicMock(
+            access_key_id='ak', access_key_secret='sk', security_token='token', expiration=None
+        )
+        loader = SecureOSSDataLoader(OSS_CONF, {'host': 'localhost'})
+        loader.ch_pool = ConnectionPool(lambda: ch_client)
+        yield loader
+    clear_credentials_cache()
+
+
+def test_price_object_key():
+    """测试每日对象键布局"""
+    assert price_object_key('2025-05-17') == 'data/prices/date=2025-05-17/prices.csv'
+
+
+def test_price_path_pattern_single_day():
+    """测试单日范围不使用通配模式"""
+    assert price_path_pattern('2025-05-17', '2025-05-17') == 'data/prices/date=2025-05-17/prices.csv'
+
+
+def test_price_path_pattern_range():
+    """测试跨月范围只列出请求的日期"""
+    pattern = price_path_pattern('2025-01-30', '2025-02-02')
+    assert pattern == 'data/prices/date={2025-01-30,2025-01-31,2025-02-01,2025-02-02}/prices.csv'
+
+
+def test_price_path_pattern_full_months():
+    """测试整月使用月份前缀通配，首尾不完整的月份逐日列出"""
+    assert price_path_pattern('2025-01-01', '2025-01-31') == 'data/prices/date=2025-01*/prices.csv'
+    pattern = price_path_pattern('2025-01-30', '2025-04-01')
+    assert pattern == 'data/prices/date={2025-01-30,2025-01-31,2025-02,2025-03,2025-04-01}*/prices.csv'
+    # 默认主流程范围 762 天只需 25 个备选项
+    pattern = price_path_pattern('2023-01-01', '2025-01-31')
+    assert pattern.count(',') + 1 == 25
+
+
+def test_price_path_pattern_invalid_range():
+    """测试开始日期晚于结束日期"""
+    with pytest.raises(ValueError):
+        price_path_pattern('2025-02-02', '2025-01-30')
+
+
+def test_load_price_data_queries_partitioned_objects(loader, ch_client):
+    """测试查询只指向请求范围内的对象"""
+    ch_client.execute.return_value = ([], [('product_id', 'UInt64'), ('category_id', 'UInt64'),
+                                           ('price', 'Float64'), ('date', 'Date')])
+    loader.load_price_data('2025-05-17', '2025-05-18')
+
+    query, params = ch_client.execute.call_args.args
+    assert 'https://test-bucket.oss-test/data/prices/date={2025-05-17,2025-05-18}/prices.csv' in query
+    assert 'AccessKeyId=ak' in query
+    assert params == {'start': '2025-05-17', 'end': '2025-05-18'}
+
+
+def test_upload_price_files(loader, tmp_path):
+    """测试按分区布局上传每日文件"""
+    path = tmp_path / 'daily_prices_20250517.csv'
+    path.write_text('product_id,category_id,name,price,change_date\n', encoding='utf-8')
+
+    keys = loader.upload_price_files([path])
+
+    assert keys == ['data/prices/date=2025-05-17/prices.csv']
+    loader.oss_client.put_object_from_file.assert_called_once_with(keys[0], str(path))
+
+    with pytest.raises(ValueError):
+        loader.upload_price_files([tmp_path / 'prices.csv'])
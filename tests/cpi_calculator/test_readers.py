@@ -0,0 +1,50 @@
+# tests/cpi_calculator/test_readers.py
+import pyarrow as pa
+
+from src.cpi_calculator.readers import read_categories, read_prices, read_products, to_pandas
+
+
+def test_read_prices_declared_types(tmp_path):
+    """测试价格文件按声明类型读取，名称字典编码、日期为 date32"""
+    path = tmp_path / 'daily_prices_20250517.csv'
+    path.write_text(
+        'product_id,category_id,name,price,change_date\n'
+        '945831417949,1101010001,大米_1,3.2,2025-05-17\n'
+        '157256540858,1101010001,大米_1,3.1,2025-05-17\n',
+        encoding='utf-8'
+    )
+    table = read_prices(path)
+
+    assert table.schema.field('name').type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field('change_date').type == pa.date32()
+    df = to_pandas(table)
+    assert str(df['name'].dtype) == 'category'
+    assert str(df['change_date'].dtype).startswith('datetime64')
+
+
+def test_read_prices_selected_columns(tmp_path):
+    """测试只读取需要的列"""
+    path = tmp_path / 'daily_prices_20250517.csv'
+    path.write_text('product_id,category_id,name,price,change_date\n1,2,a,3.0,2025-05-17\n', encoding='utf-8')
+    assert read_prices(path, columns=['product_id', 'price']).column_names == ['product_id', 'price']
+
+
+def test_read_products(tmp_path):
+    """测试商品表读取"""
+    path = tmp_path / 'products.csv'
+    path.write_text('product_id,category_id,name,weight,price,change_count\n1,2,a,0.5,3.06,0\n', encoding='utf-8')
+    table = read_products(path)
+    assert table.schema.field('change_count').type == pa.int32()
+    assert table.schema.field('name').type == pa.string()
+
+
+def test_read_categories_null_literals(tmp_path):
+    """测试无表头分类文件与字面量 null"""
+    path = tmp_path / 'categories.csv'
+    path.write_text('食品,1101000000,1,0.1869,null,null\n大米,1101010001,3,0.0061,3.67,1101010000\n',
+                    encoding='utf-8')
+    table = read_categories(path)
+
+    assert table.column_names == ['name', 'id', 'hierarchy', 'weight', 'price', 'parent']
+    assert table.column('parent').to_pylist() == [None, 1101010000]
+    assert table.column('price').null_count == 1
@@ -0,0 +1,71 @@
+# tests/cpi_calculator/test_result_store.py
+import re
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+from src.cpi_calculator.pool import ConnectionPool
+from src.cpi_calculator.result_store import ClickHouseResultSink, ResultStore, index_frame
+
+
+def _run(day, headline, category_index):
+    categories = pd.DataFrame({'category_id': [1101010001], 'level': [3], 'index': [category_index]})
+    return index_frame(day, headline, categories)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(tmp_path / 'results')
+
+
+def test_append_and_read_by_partition(store):
+    """测试按月分区写入，按日期与层级读取"""
+    store.append(_run('2025-01-31', 1.01, 0.99), formula='jevons', run_id='jan')
+    store.append(_run('2025-02-28', 1.02, 1.03), formula='jevons', run_id='feb')
+
+    assert sorted(p.name for p in store.root.iterdir()) == ['month=2025-01', 'month=2025-02']
+    february = store.read('2025-02-01', '2025-02-28').to_pylist()
+    assert [(r['category_id'], r['level'], r['cpi_index']) for r in february] == [
+        (0, 0, 1.02), (1101010001, 3, 1.03)
+    ]
+    assert store.read(level=3)['cpi_index'].to_pylist() == [0.99, 1.03]
+
+
+def test_rerun_keeps_latest(store):
+    """测试重复计算同一天时读取最新一次运行的结果，历史运行仍可读取"""
+    store.append(_run('2025-01-31', 1.01, 0.99), formula='jevons', run_id='first')
+    store.append(_run('2025-01-31', 1.05, 0.98), formula='jevons', run_id='second')
+    store.append(_run('2025-01-31', 2.00, 2.00), formula='dutot', run_id='other')
+
+    latest = store.read(formula='jevons')
+    assert latest['run_id'].to_pylist() == ['second', 'second']
+    assert store.read(formula='jevons', latest=False).num_rows == 4
+
+    headline = store.headline(formula='jevons')
+    assert list(headline.columns) == ['date', 'cpi_index']
+    assert headline['cpi_index'].tolist() == [1.05]
+
+
+def test_read_empty_store(tmp_path):
+    """测试尚无结果时返回空表"""
+    assert ResultStore(tmp_path / 'missing').read().num_rows == 0
+
+
+def test_clickhouse_sink_replacing_merge_tree(store):
+    """测试同步写入 ClickHouse 结果表，读取使用 FINAL"""
+    client = MagicMock(spec=['execute'])
+    client.execute.return_value = ([], [])
+    sink = ClickHouseResultSink(ConnectionPool(lambda: client, min_size=0))
+    assert 'ReplacingMergeTree(computed_at)' in sink.ddl()
+    # INDEX 是 ClickHouse 关键字，列名不能是 index
+    assert 'cpi_index Float64' in sink.ddl()
+    assert not re.search(r'^\s*index\b', sink.ddl(), flags=re.IGNORECASE | re.MULTILINE)
+
+    ResultStore(store.root, clickhouse=sink).append(_run('2025-01-31', 1.01, 0.99), formula='jevons')
+    insert_query, columns = client.execute.call_args.args
+    assert insert_query.startswith('INSERT INTO cpi_result (date, category_id, level, cpi_index,')
+    assert len(columns[0]) == 2
+
+    sink.read('2025-01-01', '2025-01-31', formula='jevons')
+    assert 'FROM cpi_result FINAL' in client.execute.call_args.args[0]
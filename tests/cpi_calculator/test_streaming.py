@@ -0,0 +1,108 @@
+# tests/cpi_calculator/test_streaming.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.cpi_calculator.calculator import CPICalculator
+from src.cpi_calculator.columnar import PRICE_SCHEMA
+from src.cpi_calculator.credentials import clear_credentials_cache
+from src.cpi_calculator.loader import LocalDataLoader, ParquetDataLoader, SecureOSSDataLoader
+from src.cpi_calculator.parquet_store import convert_daily_csv
+from src.cpi_calculator.pool import ConnectionPool
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """创建两天价格文件与三级分类文件"""
+    prices = {
+        '20250517': [(1, 11, 10.0), (2, 11, 20.0), (3, 12, 30.0)],
+        '20250518': [(1, 11, 11.0), (2, 11, 22.0), (3, 12, 30.0)],
+    }
+    for day, rows in prices.items():
+        iso = f'{day[:4]}-{day[4:6]}-{day[6:]}'
+        lines = ['product_id,category_id,name,price,change_date']
+        lines += [f'{pid},{cid},商品_{pid},{price},{iso}' for pid, cid, price in rows]
+        (tmp_path / f'daily_prices_{day}.csv').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (tmp_path / 'categories.csv').write_text(
+        '食品,1,1,1.0,null,null\n'
+        '粮食,11,2,0.4,null,1\n'
+        '油脂,12,2,0.6,null,1\n',
+        encoding='utf-8'
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def calculator():
+    """创建不连接数据库的计算器"""
+    return CPICalculator({
+        'CLICKHOUSE_HOST': 'localhost', 'CLICKHOUSE_PORT': 9000,
+        'CLICKHOUSE_USER': 'default', 'CLICKHOUSE_PASSWORD': '',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://'
+    })
+
+
+def test_local_iter_price_batches(data_dir):
+    """测试本地加载器按批次产出且每批不超过 batch_rows"""
+    batches = list(LocalDataLoader(data_dir).iter_price_batches('2025-05-17', '2025-05-18', batch_rows=2))
+
+    assert [b.num_rows for b in batches] == [2, 1, 2, 1]
+    assert 'date' in batches[0].schema.names
+
+
+def test_parquet_iter_price_batches(data_dir, tmp_path):
+    """测试分区数据集按批次读取"""
+    dataset = tmp_path / 'dataset'
+    convert_daily_csv(sorted(data_dir.glob('daily_prices_*.csv')), dataset)
+    loader = ParquetDataLoader(dataset, data_dir=data_dir)
+
+    batches = list(loader.iter_price_batches('2025-05-18', '2025-05-18', batch_rows=2, columns=['product_id', 'price']))
+    assert sum(b.num_rows for b in batches) == 3
+    assert batches[0].schema.names == ['product_id', 'price']
+
+
+def test_oss_iter_price_batches_streams_blocks():
+    """测试 ClickHouse 按数据块流式返回列式结果，超过批次大小的数据块被拆分"""
+    client = MagicMock()
+    day = pd.Timestamp('2025-05-17').date()
+    blocks = [pa.record_batch({'product_id': pa.array(ids, pa.uint64()), 'category_id': pa.array([11] * len(ids)),
+                               'price': pa.array([1.0] * len(ids)), 'date': pa.array([day] * len(ids))})
+              for ids in ([0, 1], [2, 3, 4], [])]
+    client.query_arrow_stream.return_value = pa.RecordBatchReader.from_batches(blocks[0].schema, blocks)
+
+    with patch('src.cpi_calculator.credentials.StsClient') as sts:
+        sts.return_value.assume_role.return_value = MagicMock(expiration=None)
+        loader = SecureOSSDataLoader({'endpoint': 'e', 'bucket': 'b', 'sts_role_arn': ''}, {'host': 'localhost'})
+        loader.ch_pool = ConnectionPool(lambda: client)
+        batches = list(loader.iter_price_batches('2025-05-17', '2025-05-17', batch_rows=2))
+    clear_credentials_cache()
+
+    assert [b.num_rows for b in batches] == [2, 2, 1]
+    assert all(b.schema == PRICE_SCHEMA for b in batches)
+    assert client.query_arrow_stream.call_args.kwargs['settings'] == {'max_block_size': 2}
+
+
+def test_compute_cpi_from_batches(calculator, data_dir):
+    """测试流式计算结果与几何平均加权口径一致"""
+    loader = LocalDataLoader(data_dir)
+    cpi = calculator.compute_cpi_from_batches(
+        loader.iter_price_batches('2025-05-17', '2025-05-18', batch_rows=1),
+        loader.load_category_mapping(),
+        '2025-05-17', '2025-05-18'
+    )
+
+    # 分类 11 两个商品均上涨 10%，分类 12 价格不变
+    assert np.isclose(cpi, 1.1 * 0.4 + 1.0 * 0.6)
+
+
+def test_compute_cpi_from_batches_without_report_period(calculator, data_dir):
+    """测试缺少报告期数据时返回 None"""
+    loader = LocalDataLoader(data_dir)
+    cpi = calculator.compute_cpi_from_batches(
+        loader.iter_price_batches('2025-05-17', '2025-05-17'),
+        loader.load_category_mapping(),
+        '2025-05-17', '2025-05-20'
+    )
+    assert cpi is None
@@ -0,0 +1,64 @@
+# tests/cpi_calculator/test_validation.py
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.cpi_calculator.validation import ValidationError, check_prices, validate_categories, validate_prices
+
+CATEGORIES = pd.DataFrame({
+    'name': ['食品', '粮食', '大米', '油脂'],
+    'id': [1, 11, 111, 12],
+    'hierarchy': [1, 2, 3, 2],
+    'weight': [1.0, 0.4, 0.4, 0.6],
+    'parent': [None, 1, 11, 1],
+})
+
+
+def make_prices(rows):
+    return pa.table({
+        'product_id': pa.array([r[0] for r in rows], pa.int64()),
+        'category_id': pa.array([r[1] for r in rows], pa.int64()),
+        'price': pa.array([r[2] for r in rows], pa.float64()),
+        'date': pa.array([datetime.date(2025, 5, 17)] * len(rows), pa.date32()),
+    })
+
+
+def test_valid_prices_pass():
+    """测试合法数据返回空报告"""
+    report = validate_prices(make_prices([(1, 111, 3.2), (2, 12, 9.9)]), CATEGORIES)
+    assert report == {'rows': 2, 'ok': True, 'violations': {}}
+
+
+def test_price_violations_reported():
+    """测试负价格、重复主键、未知分类与非末级分类"""
+    report = validate_prices(make_prices([
+        (1, 111, -1.0),
+        (2, 111, 1.0), (2, 111, 1.0),
+        (3, 999, 1.0),
+        (4, 11, 1.0),
+        (None, 12, 1.0),
+    ]), CATEGORIES)
+
+    counts = {name: v['count'] for name, v in report['violations'].items()}
+    assert counts == {'null_product_id': 1, 'negative_price': 1, 'duplicate_key': 2,
+                      'unknown_category': 1, 'non_leaf_category': 1}
+    assert report['violations']['negative_price']['sample'][0]['product_id'] == 1
+
+
+def test_category_hierarchy_checks():
+    """测试父分类缺失与层级不一致"""
+    categories = pd.concat([CATEGORIES, pd.DataFrame({
+        'name': ['孤儿', '错层'], 'id': [21, 13], 'hierarchy': [2, 3], 'weight': [0.1, 0.1], 'parent': [2, 1],
+    })], ignore_index=True)
+    counts = {name: v['count'] for name, v in validate_categories(categories)['violations'].items()}
+    assert counts == {'unknown_parent': 1, 'hierarchy_mismatch': 1}
+
+
+def test_check_prices_allow():
+    """测试允许的检查项不报错，其余违规抛出 ValidationError"""
+    prices = make_prices([(1, 111, 1.0), (1, 111, 1.0)])
+    assert check_prices(prices, allow=('duplicate_key',))['violations']
+    with pytest.raises(ValidationError, match='duplicate_key=2'):
+        check_prices(prices)
@@ -1,4 +1,6 @@
+import csv
 import random
+from src.cpi_calculator.compression import open_text
 from src.data_generator.price_generator import Product,PriceGenerator
 from datetime import datetime, timedelta
 
@@ -80,3 +82,12 @@ def test_adjust_prices_actually_changes_price(capsys):
 
     # 恢复原始 random.random
     random.random = original_random
+
+
+def test_price_generator_exports_compressed(tmp_path):
+    """测试生成器按扩展名压缩导出"""
+    path = tmp_path / 'daily_prices.csv.zst'
+    generator = PriceGenerator([Product(1, 0.5, 3.0)])
+    generator.export_to_csv([{'date': '2025-05-17', 'products': [Product(1, 0.5, 3.0)]}], path)
+    with open_text(path, newline='') as f:
+        assert list(csv.reader(f)) == [['Date', 'Product ID', 'Price', 'Weight'], ['2025-05-17', '1', '3.0', '0.5']]